@@ -0,0 +1,333 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from adapter.selfheal.shared_state import file_lock
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_DIR = Path(os.getcwd() + "/test_artifacts")
+ARTIFACT_DIR.mkdir(exist_ok=True)
+
+COMPRESSED_SUFFIX = ".gz"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+@dataclass
+class FailureRecord:
+    failure_id: str
+    test_name: Optional[str]
+    ts: float
+    blobs: Dict[str, str] = field(default_factory=dict)  # kind -> relative path
+
+
+class ArtifactStore:
+    """
+    Content-addressed artifact storage.
+
+    Blobs are stored once per content hash under ``blobs/<aa>/<hash><suffix>``
+    and optionally gzip-compressed. ``manifest.jsonl`` maps failure ids to the
+    blobs captured for them, so identical DOMs and snapshots captured by
+    different failures share one file.
+
+    The manifest doubles as the retention index: it records when each failure
+    was captured, by which test, and the stored size of every blob, so
+    eviction never needs to scan the blob directory.
+
+    Several processes (xdist workers) may share one store: manifest appends
+    and compaction hold a file lock, and eviction re-reads the manifest
+    under that lock so failures recorded by other workers are kept. A put
+    that would reuse a blob checks under the same lock that it is still on
+    disk, since another worker may have evicted it.
+    """
+
+    def __init__(self, root: Path, max_workers: int = 2):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.manifest_path = self.root / "manifest.jsonl"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="artifact-writer"
+        )
+        self._pending: Dict[Path, Future] = {}
+        # Insertion order is capture order, so the oldest failure is first
+        self._failures: "OrderedDict[str, FailureRecord]" = OrderedDict()
+        self._blob_bytes: Dict[str, int] = {}
+        self._blob_refs: Dict[str, int] = {}
+        self._listeners: List[Callable[["ArtifactStore"], None]] = []
+        self._load_manifest()
+
+    def _load_manifest(self):
+        self._failures.clear()
+        self._blob_bytes.clear()
+        self._blob_refs.clear()
+        if not self.manifest_path.exists():
+            return
+        with self.manifest_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "failure_id" in entry:
+                    self._index_failure_blob(
+                        entry["failure_id"],
+                        entry["kind"],
+                        entry["blob"],
+                        entry.get("test_name"),
+                        entry.get("ts", 0.0),
+                    )
+                elif "bytes" in entry:
+                    self._blob_bytes[entry["blob"]] = entry["bytes"]
+
+    def _index_failure_blob(
+        self, failure_id: str, kind: str, rel: str, test_name, ts: float
+    ):
+        record = self._failures.get(failure_id)
+        if record is None:
+            record = self._failures[failure_id] = FailureRecord(
+                failure_id, test_name, ts
+            )
+        previous = record.blobs.get(kind)
+        if previous == rel:
+            return
+        if previous is not None:
+            self._blob_refs[previous] -= 1
+        record.blobs[kind] = rel
+        self._blob_refs[rel] = self._blob_refs.get(rel, 0) + 1
+
+    def blob_path(self, digest: str, suffix: str) -> Path:
+        return self.blob_dir / digest[:2] / f"{digest}{suffix}"
+
+    def put(
+        self,
+        failure_id: str,
+        kind: str,
+        data: bytes,
+        *,
+        suffix: str = "",
+        compress: bool = True,
+        test_name: Optional[str] = None,
+        background: bool = True,
+    ) -> str:
+        """
+        Stores ``data`` for ``failure_id`` and returns the blob path.
+
+        Only hashing runs on the calling thread when ``background`` is set;
+        compression and the write happen on the writer pool. Readers going
+        through :meth:`read_bytes` wait for a pending write of the same blob.
+        """
+        digest = content_hash(data)
+        if compress:
+            suffix += COMPRESSED_SUFFIX
+        path = self.blob_path(digest, suffix)
+        rel = str(path.relative_to(self.root))
+        ts = time.time()
+        future = None
+        # Decided under the manifest lock that eviction deletes under: another
+        # worker may have deleted a blob this process still has indexed
+        with self._lock, file_lock(self.manifest_path):
+            is_new = path not in self._pending and not path.exists()
+            if not is_new and path not in self._pending and rel not in self._blob_bytes:
+                # Blob survived from a run, or came from a worker, whose size
+                # record this process has not seen
+                self._blob_bytes[rel] = path.stat().st_size
+                self._write_manifest({"blob": rel, "bytes": self._blob_bytes[rel]})
+            if is_new:
+                if background:
+                    future = self._pool.submit(self._write_blob, path, data, compress)
+                    self._pending[path] = future
+                else:
+                    self._blob_bytes[rel] = self._write_blob(path, data, compress)
+                    self._write_manifest({"blob": rel, "bytes": self._blob_bytes[rel]})
+            self._index_failure_blob(failure_id, kind, rel, test_name, ts)
+            self._write_manifest(
+                {
+                    "failure_id": failure_id,
+                    "kind": kind,
+                    "blob": rel,
+                    "raw_bytes": len(data),
+                    "test_name": test_name,
+                    "ts": ts,
+                }
+            )
+        if future is not None:
+            # Outside the manifest lock: an already finished write runs its
+            # callback, which records the size under that lock, right here
+            future.add_done_callback(lambda f, p=path, r=rel: self._written(p, r, f))
+        self._notify()
+        return str(path)
+
+    def put_text(self, failure_id: str, kind: str, text: str, **kwargs) -> str:
+        return self.put(failure_id, kind, text.encode("utf-8"), **kwargs)
+
+    @staticmethod
+    def _write_blob(path: Path, data: bytes, compress: bool) -> int:
+        if compress:
+            data = gzip.compress(data, compresslevel=6, mtime=0)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return len(data)
+
+    def _written(self, path: Path, rel: str, future: Future):
+        with self._lock:
+            self._pending.pop(path, None)
+            if future.exception() is None:
+                self._record_size(rel, future.result())
+        if future.exception() is not None:
+            logger.error("Failed to write artifact %s: %s", path, future.exception())
+
+    def _record_size(self, rel: str, size: int):
+        self._blob_bytes[rel] = size
+        self._append_manifest({"blob": rel, "bytes": size})
+
+    def _append_manifest(self, entry: dict):
+        with file_lock(self.manifest_path):
+            self._write_manifest(entry)
+
+    def _write_manifest(self, entry: dict):
+        # Callers hold the manifest lock
+        with self.manifest_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def artifacts_for(self, failure_id: str) -> Dict[str, str]:
+        """
+        Returns ``{kind: absolute blob path}`` recorded for a failure.
+        """
+        with self._lock:
+            record = self._failures.get(failure_id)
+            blobs = dict(record.blobs) if record else {}
+        return {kind: str(self.root / rel) for kind, rel in blobs.items()}
+
+    def read_bytes(self, path: str | Path) -> bytes:
+        path = Path(path)
+        with self._lock:
+            pending = self._pending.get(path)
+        if pending is not None:
+            pending.result()
+        data = path.read_bytes()
+        if path.suffix == COMPRESSED_SUFFIX:
+            data = gzip.decompress(data)
+        return data
+
+    def read_text(self, path: str | Path) -> str:
+        return self.read_bytes(path).decode("utf-8")
+
+    # --- Retention support ---
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(self._blob_bytes.get(rel, 0) for rel in self._blob_refs)
+
+    def failures(self) -> List[FailureRecord]:
+        """
+        Failure records, oldest first.
+        """
+        with self._lock:
+            return list(self._failures.values())
+
+    def add_listener(self, listener: Callable[["ArtifactStore"], None]):
+        self._listeners.append(listener)
+
+    def _notify(self):
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception:
+                logger.exception("Artifact store listener failed")
+
+    def evict(self, failure_ids: Iterable[str]) -> int:
+        """
+        Drops failures from the index and deletes blobs no other failure
+        references. Returns the number of bytes freed.
+        """
+        freed = 0
+        with self._lock, file_lock(self.manifest_path):
+            # Pick up failures and blobs other workers recorded meanwhile
+            self._load_manifest()
+            for failure_id in failure_ids:
+                record = self._failures.get(failure_id)
+                if record is None or any(
+                    self.root / rel in self._pending for rel in record.blobs.values()
+                ):
+                    # Still being written; leave it for the next pass
+                    continue
+                del self._failures[failure_id]
+                for rel in record.blobs.values():
+                    self._blob_refs[rel] -= 1
+                    if self._blob_refs[rel] > 0:
+                        continue
+                    del self._blob_refs[rel]
+                    freed += self._blob_bytes.pop(rel, 0)
+                    (self.root / rel).unlink(missing_ok=True)
+            self._compact_manifest()
+        return freed
+
+    def _compact_manifest(self):
+        tmp = self.manifest_path.with_suffix(".jsonl.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for record in self._failures.values():
+                for kind, rel in record.blobs.items():
+                    f.write(
+                        json.dumps(
+                            {
+                                "failure_id": record.failure_id,
+                                "kind": kind,
+                                "blob": rel,
+                                "test_name": record.test_name,
+                                "ts": record.ts,
+                            }
+                        )
+                        + "\n"
+                    )
+            for rel in self._blob_refs:
+                if rel in self._blob_bytes:
+                    f.write(
+                        json.dumps({"blob": rel, "bytes": self._blob_bytes[rel]})
+                        + "\n"
+                    )
+        os.replace(tmp, self.manifest_path)
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        Runs housekeeping work on the writer pool.
+        """
+        return self._pool.submit(fn, *args)
+
+    def wait_for_pending_writes(self, timeout: Optional[float] = None):
+        with self._lock:
+            pending = list(self._pending.values())
+        if pending:
+            wait(pending, timeout=timeout)
+
+
+store = ArtifactStore(ARTIFACT_DIR)
+atexit.register(store.wait_for_pending_writes, 30)
+
+
+def read_artifact_text(path: str | Path) -> str:
+    """
+    Reads an artifact written by the store, transparently decompressing it.
+    """
+    return store.read_text(path)
+
+
+def wait_for_pending_writes(timeout: Optional[float] = None):
+    store.wait_for_pending_writes(timeout)
@@ -0,0 +1,418 @@
+"""
+Baseline a11y snapshots from passing runs, diffed by Merkle hashes.
+
+With HEALER_BASELINE set, every locator that resolves records the page's
+aria snapshot (stored once per content hash) and the element it hit,
+keyed by URL and locator. When that locator later breaks, the current
+snapshot is diffed against its baseline: each subtree carries a hash of
+its label and its children's hashes, so equal subtrees are skipped
+without descending and the diff costs time proportional to what changed.
+The changed subtrees, with their ancestors and the region around the
+element the locator used to hit, become the snapshot the transformer
+searches and the LLM is shown.
+
+Index entries expire after ``ttl_s``; the full retention pass deletes the
+snapshots no live entry references, so the baseline directory does not
+outgrow the set of recorded (URL, locator) pairs.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import yaml
+
+from adapter.selfheal.artifact_store import (
+    ARTIFACT_DIR,
+    ArtifactStore,
+    content_hash,
+    read_artifact_text,
+    store,
+)
+from adapter.selfheal.locator_parser import parse_playwright_locator
+from adapter.selfheal.models import LocatorStep, as_core, render_chain
+from adapter.selfheal.retention import retention
+from adapter.selfheal.shared_state import shared_state, shared_state_enabled
+from rule_engine.models import FailureContext
+
+logger = logging.getLogger(__name__)
+
+BASELINE_DIR = ARTIFACT_DIR / "baselines"
+NAMESPACE = "baseline"
+SNAPSHOT_SUFFIX = ".yaml.gz"
+
+
+def baseline_enabled() -> bool:
+    return os.getenv("HEALER_BASELINE", "0").lower() in ("1", "true", "yes")
+
+
+# --- Merkle trees over aria snapshots ---
+
+
+@dataclass(frozen=True, eq=False)
+class TreeNode:
+    """
+    One snapshot entry: ``key`` is e.g. ``button "Save"`` or ``text``,
+    ``value`` the inline value of ``key: value`` entries.
+    """
+
+    key: str
+    value: Optional[str]
+    children: Tuple["TreeNode", ...]
+    digest: bytes
+
+    @property
+    def label(self) -> str:
+        return self.key if self.value is None else f"{self.key}: {self.value}"
+
+    def to_yaml(self) -> Any:
+        if self.children:
+            return {self.key: [child.to_yaml() for child in self.children]}
+        if self.value is not None:
+            return {self.key: self.value}
+        return self.key
+
+
+def _node(key: str, value: Optional[str], children: Tuple[TreeNode, ...]) -> TreeNode:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([key, value]).encode("utf-8"))
+    for child in children:
+        h.update(child.digest)
+    return TreeNode(key, value, children, h.digest())
+
+
+def _entries(item) -> List[TreeNode]:
+    if isinstance(item, dict):
+        nodes = []
+        for key, value in item.items():
+            if isinstance(value, list):
+                children = tuple(n for entry in value for n in _entries(entry))
+                nodes.append(_node(str(key), None, children))
+            else:
+                nodes.append(_node(str(key), None if value is None else str(value), ()))
+        return nodes
+    if isinstance(item, list):
+        return [n for entry in item for n in _entries(entry)]
+    if item is None:
+        return []
+    return [_node(str(item), None, ())]
+
+
+def build_tree(snapshot) -> TreeNode:
+    """
+    The Merkle tree of a loaded aria snapshot, under an unlabeled root.
+    """
+    return _node("", None, tuple(_entries(snapshot)))
+
+
+@dataclass
+class SnapshotDiff:
+    # (ancestors, node) of every added or modified subtree of the current tree
+    changed: List[Tuple[Tuple[TreeNode, ...], TreeNode]]
+    # Baseline subtrees with no counterpart in the current tree
+    removed: List[TreeNode]
+    visited: int = 0
+
+
+def diff_trees(baseline: TreeNode, current: TreeNode) -> SnapshotDiff:
+    result = SnapshotDiff(changed=[], removed=[])
+    _diff(baseline, current, (), result)
+    return result
+
+
+def _diff(
+    baseline: TreeNode,
+    current: TreeNode,
+    ancestors: Tuple[TreeNode, ...],
+    result: SnapshotDiff,
+):
+    result.visited += 1
+    if baseline.digest == current.digest:
+        return
+    if not (baseline.children or current.children):
+        result.changed.append((ancestors, current))
+        result.removed.append(baseline)
+        return
+
+    # Unchanged children pair up by hash and are not descended into
+    by_digest: Dict[bytes, List[TreeNode]] = {}
+    for child in baseline.children:
+        by_digest.setdefault(child.digest, []).append(child)
+    unmatched = []
+    for child in current.children:
+        same = by_digest.get(child.digest)
+        if same:
+            same.pop()
+        else:
+            unmatched.append(child)
+
+    # Changed children pair up by label and are diffed recursively
+    by_label: Dict[str, List[TreeNode]] = {}
+    for same in by_digest.values():
+        for child in same:
+            by_label.setdefault(child.label, []).append(child)
+    path = ancestors + (current,)
+    for child in unmatched:
+        counterpart = by_label.get(child.label)
+        if counterpart:
+            _diff(counterpart.pop(0), child, path, result)
+        else:
+            result.changed.append((path, child))
+    for left in by_label.values():
+        result.removed.extend(left)
+
+
+def find_path(root: TreeNode, target: str) -> Optional[Tuple[TreeNode, ...]]:
+    """
+    The path from ``root`` to the first node whose label is ``target``.
+    """
+    stack = [(root, (root,))]
+    while stack:
+        node, path = stack.pop()
+        if node.label == target:
+            return path
+        for child in reversed(node.children):
+            stack.append((child, path + (child,)))
+    return None
+
+
+def _follow(root: TreeNode, path: Tuple[TreeNode, ...]) -> Tuple[TreeNode, ...]:
+    """
+    The longest prefix of a baseline ``path`` (root first) that still
+    exists, by label, in the tree under ``root``.
+    """
+    followed = (root,)
+    node = root
+    for step in path[1:]:
+        node = next((c for c in node.children if c.label == step.label), None)
+        if node is None:
+            break
+        followed += (node,)
+    return followed
+
+
+def pruned_snapshot(
+    root: TreeNode, regions: List[Tuple[Tuple[TreeNode, ...], TreeNode]]
+) -> list:
+    """
+    The snapshot with only ``regions`` (kept whole) and their ancestors, in
+    the original order and format.
+    """
+    whole: Set[int] = {id(node) for _, node in regions}
+    on_path: Set[int] = {id(a) for ancestors, _ in regions for a in ancestors}
+
+    def prune(node: TreeNode):
+        if id(node) in whole:
+            return node.to_yaml()
+        kept = [
+            prune(child)
+            for child in node.children
+            if id(child) in whole or id(child) in on_path
+        ]
+        return {node.key: kept}
+
+    return [
+        prune(child)
+        for child in root.children
+        if id(child) in whole or id(child) in on_path
+    ]
+
+
+# --- Recording and lookup ---
+
+
+def locator_key(expression: str) -> str:
+    """
+    Canonical form of a locator expression, equal for a locator built
+    through HealingPage and the same locator parsed from an error.
+    """
+    try:
+        return as_core(parse_playwright_locator(expression)).canonical
+    except ValueError:
+        return expression
+
+
+def call_expression(method: str, args, kwargs) -> str:
+    return render_chain(
+        (LocatorStep(method=method, args=tuple(args), kwargs=tuple(kwargs.items())),)
+    )
+
+
+def _target_label(element_snapshot: str) -> Optional[str]:
+    # `- button "Save":` (with children) or `- text: Hello`
+    first = element_snapshot.strip().splitlines()[0] if element_snapshot else ""
+    first = first.strip().removeprefix("- ").strip()
+    return first.removesuffix(":") or None
+
+
+class BaselineStore:
+    """
+    Baseline snapshots under ``directory``, content-addressed, with the
+    (URL, locator) index in the shared state so all workers and later runs
+    see it. Each locator is recorded at most once per process.
+    """
+
+    def __init__(self, directory: Path = BASELINE_DIR, ttl_s: float = 30 * 86400):
+        self.directory = Path(directory)
+        self.ttl_s = ttl_s
+        self._recorded: Set[str] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url: Optional[str], locator: str) -> str:
+        return json.dumps([url or "", locator])
+
+    def snapshot_path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}{SNAPSHOT_SUFFIX}"
+
+    def record(self, page, locator, expression: str):
+        """
+        Records the page state at a successful resolution of ``locator``.
+        Runs on the test thread; the snapshot write happens in background.
+        """
+        if not baseline_enabled():
+            return
+        url = page.url
+        key = self._key(url, locator_key(expression))
+        with self._lock:
+            if key in self._recorded:
+                return
+            self._recorded.add(key)
+        try:
+            snapshot = page.locator("body").aria_snapshot()
+            element = locator.first.aria_snapshot(timeout=1000)
+        except Exception as e:
+            logger.debug("No baseline for %s: %s", expression, e)
+            return
+        data = snapshot.encode("utf-8")
+        digest = content_hash(data)
+        path = self.snapshot_path(digest)
+        if not path.exists():
+            store.submit(ArtifactStore._write_blob, path, data, True)
+        entry = {"digest": digest, "target": _target_label(element), "ts": time.time()}
+        shared_state.put(NAMESPACE, key, json.dumps(entry), self.ttl_s)
+
+    def lookup(self, url: Optional[str], expression: str) -> Optional[dict]:
+        raw = shared_state.get(NAMESPACE, self._key(url, locator_key(expression)))
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        if not self.snapshot_path(entry["digest"]).exists():
+            return None
+        return entry
+
+    def prune(self, grace_s: float = 3600) -> int:
+        """
+        Deletes snapshots no live index entry references. Snapshots written
+        in the last ``grace_s`` are kept, as another worker's entry for them
+        may not be visible yet. Returns the number of bytes freed.
+        """
+        if not shared_state_enabled() or not self.directory.is_dir():
+            # Without the index every snapshot looks unreferenced
+            return 0
+        live = {
+            json.loads(raw)["digest"]
+            for raw in shared_state.values(NAMESPACE).values()
+        }
+        cutoff = time.time() - grace_s
+        freed = 0
+        for path in self.directory.glob(f"*/*{SNAPSHOT_SUFFIX}"):
+            if path.name.removesuffix(SNAPSHOT_SUFFIX) in live:
+                continue
+            try:
+                stat = path.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                path.unlink()
+            except OSError:
+                continue
+            freed += stat.st_size
+        if freed:
+            logger.info("Pruned %.1f MB of unreferenced baselines", freed / 1048576)
+        return freed
+
+
+baselines = BaselineStore()
+retention.add_pruner(baselines.prune)
+
+
+@lru_cache(maxsize=32)
+def _tree(path: str) -> TreeNode:
+    return build_tree(yaml.safe_load(read_artifact_text(path)))
+
+
+@dataclass(frozen=True)
+class BaselineScope:
+    snapshot: list  # the pruned snapshot, loaded
+    text: str  # the same as YAML, for prompts
+    target: Optional[str]  # what the locator hit in the baseline
+    changed: int
+    removed: Tuple[str, ...]  # labels of baseline subtrees now gone
+    visited: int
+
+
+@lru_cache(maxsize=64)
+def _scope(current_path: str, baseline_path: str, target: Optional[str]):
+    baseline, current = _tree(baseline_path), _tree(current_path)
+    diff = diff_trees(baseline, current)
+    if not diff.changed and not diff.removed:
+        return None
+
+    regions = list(diff.changed)
+    if target:
+        # The region around where the element used to be
+        path = find_path(baseline, target)
+        if path is not None:
+            followed = _follow(current, path)
+            if len(followed) > 1:
+                regions.append((followed[:-1], followed[-1]))
+    snapshot = pruned_snapshot(current, regions)
+    if not snapshot:
+        return None
+    return BaselineScope(
+        snapshot=snapshot,
+        text=yaml.safe_dump(snapshot, sort_keys=False, allow_unicode=True),
+        target=target,
+        changed=len(diff.changed),
+        removed=tuple(node.label for node in diff.removed),
+        visited=diff.visited,
+    )
+
+
+def baseline_scope(context: FailureContext) -> Optional[BaselineScope]:
+    """
+    The changed part of the failure's a11y snapshot relative to the
+    baseline of its locator, or None to search the whole snapshot.
+    """
+    original = context.failure.original_locator
+    if not baseline_enabled() or original is None:
+        return None
+    if not context.artifacts.a11y_snapshot:
+        return None
+    entry = baselines.lookup(context.url, original.to_playwright())
+    if entry is None:
+        return None
+    try:
+        scope = _scope(
+            str(context.artifacts.a11y_snapshot),
+            str(baselines.snapshot_path(entry["digest"])),
+            entry.get("target"),
+        )
+    except (OSError, yaml.YAMLError) as e:
+        logger.warning("Baseline diff failed: %s", e)
+        return None
+    if scope is not None:
+        logger.info(
+            "Baseline diff: %s changed and %s removed subtrees (%s nodes visited)",
+            scope.changed,
+            len(scope.removed),
+            scope.visited,
+        )
+    return scope
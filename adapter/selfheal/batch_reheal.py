@@ -0,0 +1,327 @@
+"""
+Offline re-heal of captured failures.
+
+Runs the heal pipeline (rule evaluation, deterministic transform, DOM
+index, optional LLM and scoring) over saved failure artifacts without a
+browser, spread over a process pool, and writes one report of proposed
+heals. Without a page, uniqueness is estimated from the captured DOM.
+
+    python main.py reheal test_artifacts --out reheal.csv --format csv
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from adapter.selfheal.artifact_store import ArtifactStore, read_artifact_text
+from adapter.selfheal.bundle import BUNDLE_SUFFIX, load_bundle, replay_bundle
+from adapter.selfheal.candidate_sources import (
+    dom_index_source,
+    llm_source,
+    meets_threshold,
+    transformer_source,
+)
+from adapter.selfheal.canonicalize import dedupe_candidates
+from adapter.selfheal.dom_index import dom_index_cache
+from adapter.selfheal.models import CoreLocator, ErrorInfo
+from adapter.selfheal.orchestrator import get_rule_decision
+from adapter.selfheal.reporter import classify_failure
+from adapter.selfheal.locator_parser import parse_playwright_error
+from adapter.selfheal.score_engine import rank_locators
+from analyzer.model_router import model_router
+from rule_engine.models import Artifact, Failure, FailureContext
+
+logger = logging.getLogger(__name__)
+
+REPORT_FIELDS = (
+    "failure_id",
+    "test_name",
+    "url",
+    "error_type",
+    "failure_type",
+    "original_locator",
+    "rule_id",
+    "decision",
+    "proposed_locator",
+    "rank",
+    "confidence",
+    "source",
+    "dom_matches",
+    "auto_accept",
+    "candidate_count",
+    "candidate_sources",
+    "matches_recording",
+    "elapsed_ms",
+    "error",
+)
+
+# File name stems recognised in hand-assembled failure directories
+BUNDLE_FILES = {"error": "error", "a11y": "a11y", "dom": "dom"}
+
+
+@dataclass
+class OfflineFailure:
+    failure_id: str
+    test_name: Optional[str]
+    artifacts: Dict[str, str]  # kind -> path
+
+
+def _from_store(root: Path) -> List[OfflineFailure]:
+    artifact_store = ArtifactStore(root, max_workers=1)
+    return [
+        OfflineFailure(
+            record.failure_id,
+            record.test_name,
+            artifact_store.artifacts_for(record.failure_id),
+        )
+        for record in artifact_store.failures()
+    ]
+
+
+def _from_directories(root: Path) -> List[OfflineFailure]:
+    failures = [
+        OfflineFailure(path.name.split(".", 1)[0], None, {"bundle": str(path)})
+        for path in sorted(root.glob(f"*{BUNDLE_SUFFIX}*"))
+    ]
+    for directory in sorted(p for p in root.iterdir() if p.is_dir()):
+        artifacts = {}
+        for path in directory.iterdir():
+            kind = BUNDLE_FILES.get(path.name.split(".", 1)[0])
+            if kind:
+                artifacts[kind] = str(path)
+        if "error" in artifacts or "bundle" in artifacts:
+            failures.append(OfflineFailure(directory.name, None, artifacts))
+    return failures
+
+
+def discover_failures(root: Path) -> List[OfflineFailure]:
+    """
+    Reads an artifact store directory (``manifest.jsonl``) or a directory
+    of bundle files and per-failure folders holding ``error.json``,
+    ``a11y.yaml`` and ``dom.html`` (optionally gzipped).
+    """
+    root = Path(root)
+    if (root / "manifest.jsonl").exists():
+        return _from_store(root)
+    return _from_directories(root)
+
+
+def _load_error(path: str) -> tuple[ErrorInfo, Optional[str]]:
+    payload = json.loads(read_artifact_text(path))
+    error = ErrorInfo(
+        type=payload.get("type", ""),
+        subtype=payload.get("subtype"),
+        message=payload.get("message", ""),
+    )
+    return error, payload.get("url")
+
+
+def _llm_candidates(context: FailureContext) -> List[CoreLocator]:
+    # No page to validate against: stop at the first confident tier
+    batches = llm_source(context, threading.Event())
+    locators: List[CoreLocator] = []
+    try:
+        for batch in batches:
+            locators.extend(batch)
+            if not model_router.needs_escalation([l.confidence for l in batch]):
+                break
+    finally:
+        batches.close()
+    return locators
+
+
+def _replay_row(row: dict, path: str, use_llm: bool):
+    """
+    Bundles replay through the live pipeline against their recorded page,
+    so candidates are validated with the counts the browser returned.
+    """
+    bundle = load_bundle(path)
+    result = replay_bundle(bundle, use_llm=use_llm)
+    healed: Optional[CoreLocator] = result.get("healed_locator")
+    validations = result.get("validations") or []
+    row.update(
+        test_name=row["test_name"] or bundle.get("test_name"),
+        url=bundle.get("url"),
+        error_type=bundle["error"]["type"],
+        failure_type=bundle["failure_type"],
+        original_locator=result.get("original_locator"),
+        rule_id=result.get("rule_id"),
+        decision=result.get("decision"),
+        candidate_count=len(validations) if "validations" in result else None,
+        candidate_sources=",".join(result.get("candidate_sources") or []),
+        matches_recording=result["replay"]["matches_recording"],
+    )
+    if healed is not None:
+        row.update(
+            proposed_locator=healed.to_playwright(),
+            rank=healed.rank,
+            confidence=healed.confidence,
+            source=healed.source,
+            auto_accept=meets_threshold(healed),
+        )
+
+
+def reheal_one(failure: OfflineFailure, use_llm: bool = False) -> dict:
+    """
+    Re-heals one failure; runs in a worker process and never raises.
+    """
+    start = time.perf_counter()
+    row = {field: None for field in REPORT_FIELDS}
+    row.update(failure_id=failure.failure_id, test_name=failure.test_name)
+    try:
+        if "bundle" in failure.artifacts:
+            _replay_row(row, failure.artifacts["bundle"], use_llm)
+            return row
+        if "error" not in failure.artifacts:
+            raise ValueError("No error details captured for this failure")
+        error, url = _load_error(failure.artifacts["error"])
+        original = parse_playwright_error(error.message)
+        context = FailureContext(
+            tool="playwright",
+            page=None,
+            test_type="REGRESSION",
+            test_name=failure.test_name,
+            environment="OFFLINE",
+            failure=Failure(
+                failure.failure_id, classify_failure(error), error, original
+            ),
+            artifacts=Artifact(
+                failure.artifacts.get("dom"), failure.artifacts.get("a11y"), None
+            ),
+            url=url,
+        )
+        row.update(
+            url=url,
+            error_type=error.type,
+            failure_type=context.failure.type,
+            original_locator=original.to_playwright() if original else None,
+        )
+
+        rule = get_rule_decision(context)
+        row.update(rule_id=rule.get("rule_id"), decision=rule["decision"])
+        if rule["decision"] != "ALLOW" or original is None:
+            return row
+
+        candidates: List[CoreLocator] = []
+        if context.artifacts.a11y_snapshot:
+            candidates += transformer_source(context, threading.Event())
+        if context.artifacts.dom_snapshot:
+            candidates += dom_index_source(context, threading.Event())
+        if use_llm and context.artifacts.a11y_snapshot:
+            candidates += _llm_candidates(context)
+        candidates = dedupe_candidates(candidates)
+        row.update(
+            candidate_count=len(candidates),
+            candidate_sources=",".join(
+                sorted({c.source for c in candidates if c.source})
+            ),
+        )
+        if not candidates:
+            return row
+
+        index = (
+            dom_index_cache.get(context.artifacts.dom_snapshot)
+            if context.artifacts.dom_snapshot
+            else None
+        )
+        best, best_matches = None, None
+        for loc in rank_locators(candidates):
+            matches = index.count_matches(loc) if index else None
+            # Skip candidates the captured DOM shows to be ambiguous or absent
+            if matches is not None and matches != 1:
+                continue
+            best, best_matches = loc, matches
+            break
+        if best is not None:
+            row.update(
+                proposed_locator=best.to_playwright(),
+                rank=best.rank,
+                confidence=best.confidence,
+                source=best.source,
+                dom_matches=best_matches,
+                auto_accept=meets_threshold(best),
+            )
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        row["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return row
+
+
+def reheal_all(
+    failures: List[OfflineFailure],
+    workers: Optional[int] = None,
+    use_llm: bool = False,
+) -> List[dict]:
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(failures) <= 1:
+        return [reheal_one(f, use_llm) for f in failures]
+    chunksize = max(1, len(failures) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(
+            pool.map(
+                reheal_one,
+                failures,
+                [use_llm] * len(failures),
+                chunksize=chunksize,
+            )
+        )
+
+
+def summarize(rows: Iterable[dict]) -> dict:
+    rows = list(rows)
+    return {
+        "failures": len(rows),
+        "allowed": sum(1 for r in rows if r["decision"] == "ALLOW"),
+        "proposed": sum(1 for r in rows if r["proposed_locator"]),
+        "auto_accept": sum(1 for r in rows if r["auto_accept"]),
+        "errors": sum(1 for r in rows if r["error"]),
+    }
+
+
+def write_report(rows: List[dict], out: Optional[Path], fmt: str = "json"):
+    """
+    Writes the report to ``out``, or to stdout when ``out`` is None.
+    """
+    handle = open(out, "w", encoding="utf-8", newline="") if out else None
+    stream = handle or sys.stdout
+    try:
+        if fmt == "csv":
+            writer = csv.DictWriter(stream, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump({"summary": summarize(rows), "heals": rows}, stream, indent=2)
+            stream.write("\n")
+    finally:
+        if handle:
+            handle.close()
+
+
+def run(
+    directory: Path,
+    out: Optional[Path] = None,
+    fmt: str = "json",
+    workers: Optional[int] = None,
+    use_llm: bool = False,
+) -> List[dict]:
+    failures = discover_failures(directory)
+    logger.info("Re-healing %s failures from %s", len(failures), directory)
+    start = time.perf_counter()
+    rows = reheal_all(failures, workers=workers, use_llm=use_llm)
+    logger.info(
+        "Re-healed %s failures in %.1fs: %s",
+        len(rows),
+        time.perf_counter() - start,
+        summarize(rows),
+    )
+    write_report(rows, out, fmt)
+    return rows
@@ -0,0 +1,419 @@
+"""
+Self-contained failure bundles and browserless replay.
+
+A bundle is one gzip-compressed JSON document holding everything a heal
+read from the browser: the exception, the parsed original locator, the
+DOM and accessibility snapshot, the URL, the rule-set fingerprint, the
+match count the page returned for every validated candidate and the
+in-page facts collected about an ambiguous locator's matches. Replaying a
+bundle runs ``manage_failure`` against a ``RecordedPage`` that answers
+locator queries from those counts, so production failures become fast,
+deterministic regression and performance tests.
+
+Bundles in the artifact store refer to the DOM and accessibility snapshot
+blobs of their failure by path and hash instead of copying them, so the
+snapshots stay deduplicated; ``load_bundle`` resolves the references and
+``write_bundle_file`` exports a bundle with the snapshots inlined.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import asdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+
+import yaml
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from adapter.selfheal.artifact_store import content_hash, read_artifact_text, store
+from adapter.selfheal.models import ErrorInfo, LocatorDescriptor
+from adapter.selfheal.retry import build_locator
+from rule_engine.models import Artifact, Failure, FailureContext
+from rule_engine.rule_loader import RULES_PATH
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_VERSION = 2
+BUNDLE_SUFFIX = ".bundle.json"
+SCOPE_ENTRY_METHODS = {"locator", "frame_locator"}
+
+
+def bundles_enabled() -> bool:
+    return os.getenv("HEALER_BUNDLES", "1").lower() not in ("0", "false", "no")
+
+
+@lru_cache(maxsize=4)
+def rules_fingerprint(path: Path = RULES_PATH) -> Dict[str, Any]:
+    data = Path(path).read_bytes()
+    return {
+        "version": str((yaml.safe_load(data) or {}).get("version")),
+        "hash": content_hash(data),
+    }
+
+
+class _Chain:
+    """
+    Records the locator chain applied to it, e.g. by ``build_locator``;
+    ``str()`` gives the key counts are recorded and looked up by.
+    """
+
+    def __init__(self, parts: tuple = ()):
+        self.parts = parts
+
+    def _extend(self, parts: tuple) -> "_Chain":
+        return _Chain(parts)
+
+    def __getattr__(self, method: str):
+        if method.startswith("__"):
+            raise AttributeError(method)
+        return self._extend(self.parts + ((method,),))
+
+    def __call__(self, *args, **kwargs):
+        method = self.parts[-1][0]
+        return self._extend(self.parts[:-1] + ((method, args, kwargs),))
+
+    def __str__(self) -> str:
+        return ".".join(
+            call_key(*part) if len(part) > 1 else json.dumps([part[0]])
+            for part in self.parts
+        )
+
+
+def call_key(method: str, args, kwargs) -> str:
+    return json.dumps([method, list(args), sorted(kwargs.items())], default=str)
+
+
+def locator_key(loc: LocatorDescriptor) -> str:
+    return str(build_locator(_Chain(), loc))
+
+
+# --- Recording ---
+
+
+def build_bundle(
+    ctx: FailureContext, exception: BaseException, result: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Collects the bundle fields that live in memory. Runs on the test
+    thread; the artifact references are made by the writer.
+    """
+    counts = {}
+    for validation in result.get("validations") or []:
+        try:
+            key = locator_key(validation.locator)
+        except ValueError:
+            continue
+        counts[key] = {"count": validation.count, "error": validation.error}
+    evaluations = {}
+    original = ctx.failure.original_locator
+    if result.get("match_facts") and original is not None:
+        evaluations[locator_key(original)] = result["match_facts"]
+    healed = result.get("healed_locator")
+    return {
+        "version": BUNDLE_VERSION,
+        "recorded_at": time.time(),
+        "failure_id": ctx.failure.id,
+        "test_name": ctx.test_name,
+        "test_type": ctx.test_type,
+        "tool": ctx.tool,
+        "environment": ctx.environment,
+        "url": ctx.url,
+        "exception": {
+            "type": type(exception).__name__,
+            "name": getattr(exception, "name", None),
+            "message": getattr(exception, "message", None) or str(exception),
+        },
+        "error": asdict(ctx.failure.error),
+        "failure_type": ctx.failure.type,
+        "original_locator": (
+            ctx.failure.original_locator.model_dump()
+            if ctx.failure.original_locator
+            else None
+        ),
+        "rules": rules_fingerprint(),
+        "candidate_counts": counts,
+        "evaluations": evaluations,
+        "outcome": {
+            "decision": result.get("decision"),
+            "rule_id": result.get("rule_id"),
+            "healed_locator": healed.to_playwright() if healed else None,
+            "timings": result.get("timings"),
+        },
+        # Artifact paths, turned into blob references by the writer
+        "artifacts": {
+            "dom": ctx.artifacts.dom_snapshot,
+            "a11y": ctx.artifacts.a11y_snapshot,
+        },
+    }
+
+
+def artifact_ref(path: str) -> Dict[str, Any]:
+    """
+    Refers to a stored artifact by its blob path, relative to the store
+    root, and content hash. An artifact outside the store is inlined.
+    """
+    try:
+        rel = Path(path).relative_to(store.root)
+    except ValueError:
+        return {"text": read_artifact_text(path)}
+    return {"blob": rel.as_posix(), "hash": rel.name.split(".", 1)[0]}
+
+
+def resolve_artifact(ref: Any, root: Path) -> Optional[str]:
+    """
+    The text of a bundle artifact: inline (version 1 bundles and exported
+    ones) or read from the blob a reference points to under ``root``. A
+    blob that retention evicted or whose content changed resolves to None.
+    """
+    if ref is None or isinstance(ref, str):
+        return ref
+    if "text" in ref:
+        return ref["text"]
+    path = root / ref["blob"]
+    try:
+        data = store.read_bytes(path)
+    except OSError as e:
+        logger.warning("Bundle artifact %s is unavailable: %s", ref["blob"], e)
+        return None
+    if content_hash(data) != ref["hash"]:
+        logger.warning("Bundle artifact %s does not match its hash", ref["blob"])
+        return None
+    return data.decode("utf-8")
+
+
+class BundleWriter:
+    """
+    Serializes bundles on its own thread, so compressing and writing them
+    stays off the test thread.
+    """
+
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bundle")
+        self._futures = set()
+
+    def save(self, bundle: Dict[str, Any]):
+        future = self._pool.submit(self._write, bundle)
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+
+    @staticmethod
+    def _write(bundle: Dict[str, Any]) -> Optional[str]:
+        try:
+            bundle["artifacts"] = {
+                kind: artifact_ref(path) if path else None
+                for kind, path in bundle["artifacts"].items()
+            }
+            data = json.dumps(bundle, separators=(",", ":")).encode("utf-8")
+            return store.put(
+                bundle["failure_id"],
+                "bundle",
+                data,
+                suffix=BUNDLE_SUFFIX,
+                test_name=bundle["test_name"],
+                background=False,
+            )
+        except Exception:
+            logger.exception("Unable to write bundle for %s", bundle["failure_id"])
+            return None
+
+    def flush(self, timeout: Optional[float] = None):
+        wait(list(self._futures), timeout=timeout)
+
+
+bundle_writer = BundleWriter()
+
+
+def save_bundle(ctx: FailureContext, exception: BaseException, result: Dict):
+    if not bundles_enabled():
+        return
+    try:
+        bundle_writer.save(build_bundle(ctx, exception, result))
+    except Exception:
+        logger.exception("Unable to build failure bundle")
+
+
+def load_bundle(path: str | Path) -> Dict[str, Any]:
+    """
+    Reads a bundle and resolves its artifact references against the store
+    it was written to, or the default store for a bundle outside one.
+    """
+    path = Path(path).resolve()
+    data = path.read_bytes()
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    bundle = json.loads(data)
+    # Stored bundles live at <root>/blobs/<xx>/<digest>.bundle.json.gz
+    root = path.parents[2] if path.parent.parent.name == "blobs" else store.root
+    bundle["artifacts"] = {
+        kind: resolve_artifact(ref, root)
+        for kind, ref in (bundle.get("artifacts") or {}).items()
+    }
+    return bundle
+
+
+def write_bundle_file(bundle: Dict[str, Any], path: str | Path):
+    """
+    Exports a bundle loaded with ``load_bundle`` as a standalone file, e.g.
+    to check in as a fixture; its artifacts are inlined.
+    """
+    data = json.dumps(bundle, separators=(",", ":")).encode("utf-8")
+    Path(path).write_bytes(gzip.compress(data))
+
+
+# --- Replay ---
+
+
+class RecordedLocator(_Chain):
+    def __init__(self, page: "RecordedPage", parts: tuple = ()):
+        super().__init__(parts)
+        self._page = page
+
+    def _extend(self, parts: tuple) -> "RecordedLocator":
+        return RecordedLocator(self._page, parts)
+
+    @property
+    def key(self) -> str:
+        return str(self)
+
+    def wait_for(self, timeout: Optional[float] = None, state: Optional[str] = None):
+        if self.count() == 0:
+            raise PlaywrightTimeoutError(
+                f"Timeout {timeout}ms exceeded waiting for recorded locator {self.key}"
+            )
+
+    def count(self) -> int:
+        return self._page.count(self.parts)
+
+    def evaluate_all(self, expression: str, arg=None):
+        return self._page.evaluate_all(self.parts)
+
+
+class RecordedPage:
+    """
+    Answers locator queries with the match counts recorded in a bundle.
+    Candidates the live page never saw fall back to the DOM index, or to
+    zero matches when the index cannot tell.
+    """
+
+    def __init__(self, bundle: Dict[str, Any], dom_path: Optional[str] = None):
+        self.url = bundle.get("url")
+        self._counts = {
+            key: entry["count"] for key, entry in bundle["candidate_counts"].items()
+        }
+        self._evaluations = bundle.get("evaluations") or {}
+        self._dom_path = dom_path
+        self.unrecorded: List[str] = []
+
+    def evaluate_all(self, parts: tuple) -> list:
+        key = str(_Chain(parts))
+        if key not in self._evaluations:
+            self.unrecorded.append(key)
+            return []
+        return self._evaluations[key]
+
+    def count(self, parts: tuple) -> int:
+        key = str(_Chain(parts))
+        if key in self._counts:
+            return self._counts[key]
+        # .first/.last/.nth of a recorded locator follow from its count
+        method = parts[-1][0]
+        if len(parts) > 1 and method in ("first", "last", "nth"):
+            base = self.count(parts[:-1])
+            if method == "nth" and len(parts[-1]) > 1 and parts[-1][1]:
+                index = parts[-1][1][0]
+                return int(base > index) if index >= 0 else min(base, 1)
+            return min(base, 1)
+        self.unrecorded.append(key)
+        return self._fallback_count(parts) if len(parts) == 1 else 0
+
+    def _fallback_count(self, parts: tuple) -> int:
+        if not self._dom_path or len(parts[0]) == 1:
+            return 0
+        from adapter.selfheal.dom_index import dom_index_cache
+
+        method, args, kwargs = parts[0]
+        strategy = {
+            "get_by_test_id": "test_id",
+            "get_by_label": "label",
+            "get_by_placeholder": "placeholder",
+            "get_by_text": "text",
+            "locator": "css",
+        }.get(method)
+        if strategy is None or not args:
+            return 0
+        loc = LocatorDescriptor(
+            strategy=strategy, value=args[0], exact=kwargs.get("exact", False)
+        )
+        count = dom_index_cache.get(self._dom_path).count_matches(loc)
+        return count or 0
+
+    def __getattr__(self, method: str):
+        if not (method.startswith("get_by_") or method in SCOPE_ENTRY_METHODS):
+            raise AttributeError(f"RecordedPage does not support {method}")
+        return RecordedLocator(self, ((method,),))
+
+
+def context_from_bundle(
+    bundle: Dict[str, Any], workdir: Path
+) -> tuple[FailureContext, RecordedPage]:
+    """
+    Rebuilds a FailureContext; artifacts are written to ``workdir``.
+    """
+    paths = {}
+    for kind, suffix in (("dom", ".html"), ("a11y", ".yaml")):
+        text = resolve_artifact(bundle["artifacts"].get(kind), store.root)
+        if text is not None:
+            path = workdir / f"{kind}{suffix}"
+            path.write_text(text, encoding="utf-8")
+            paths[kind] = str(path)
+
+    page = RecordedPage(bundle, paths.get("dom"))
+    original = bundle.get("original_locator")
+    ctx = FailureContext(
+        tool=bundle.get("tool", "playwright"),
+        page=page,
+        test_type=bundle.get("test_type"),
+        test_name=bundle.get("test_name"),
+        environment=bundle.get("environment"),
+        failure=Failure(
+            bundle["failure_id"],
+            bundle["failure_type"],
+            ErrorInfo(**bundle["error"]),
+            LocatorDescriptor(**original) if original else None,
+        ),
+        artifacts=Artifact(paths.get("dom"), paths.get("a11y"), None),
+        url=bundle.get("url"),
+    )
+    return ctx, page
+
+
+def replay_bundle(bundle: Dict[str, Any], use_llm: bool = False) -> Dict[str, Any]:
+    """
+    Feeds a bundle back through ``manage_failure``. The heal cache and,
+    unless ``use_llm`` is set, the LLM are left out so replays are
+    deterministic.
+    """
+    from adapter.selfheal.candidate_sources import SOURCES
+    from adapter.selfheal.orchestrator import manage_failure
+
+    excluded = {"cache"} if use_llm else {"cache", "llm"}
+    sources = [s for s in SOURCES if s.name not in excluded]
+    with tempfile.TemporaryDirectory(prefix="heal-replay-") as workdir:
+        ctx, page = context_from_bundle(bundle, Path(workdir))
+        result = manage_failure(ctx, sources=sources)
+    healed = result.get("healed_locator")
+    result["replay"] = {
+        "rules_changed": bundle.get("rules") != rules_fingerprint(),
+        "recorded_healed_locator": bundle["outcome"]["healed_locator"],
+        "healed_locator": healed.to_playwright() if healed else None,
+        "matches_recording": (healed.to_playwright() if healed else None)
+        == bundle["outcome"]["healed_locator"],
+        "unrecorded_queries": page.unrecorded,
+    }
+    return result
@@ -0,0 +1,348 @@
+"""
+Concurrent candidate sources for the heal pipeline.
+
+Every registered source runs on its own worker thread and hands back
+batches of candidate locators as soon as it has them. Validation stays on
+the test thread (the Playwright sync API is not thread-safe), so sources
+must only read artifacts and never touch the page.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from adapter.selfheal.baseline import baseline_scope
+from adapter.selfheal.dom_index import dom_candidates
+from adapter.selfheal.locator_transformer import LocatorTransformer
+from adapter.selfheal.models import CoreLocator, LocatorDescriptor, as_core
+from adapter.selfheal.locator_parser import parse_playwright_locator
+from adapter.selfheal.selector_hints import hints_for
+from adapter.selfheal.shared_state import shared_state
+from adapter.selfheal.snapshot_helper import load_snapshot
+from analyzer.circuit_breaker import CallCancelledError, CircuitOpenError
+from analyzer.llm_analyzer import analyze_prompt, build_prompt
+from analyzer.model_router import model_router
+from rule_engine.models import FailureContext
+
+logger = logging.getLogger(__name__)
+
+# A healed locator is used without review above either threshold
+ACCEPT_RANK = 100
+ACCEPT_CONFIDENCE = 0.9
+
+# A source returns one batch, or an iterator of batches pulled lazily
+SourceFn = Callable[
+    [FailureContext, threading.Event],
+    List[CoreLocator] | Iterable[List[CoreLocator]],
+]
+
+
+def meets_threshold(loc: CoreLocator) -> bool:
+    if loc.source == "fuzzy":
+        # A fuzzy rank only says what kind of locator the guess is, not
+        # whether it is the right element; only its confidence counts
+        return (loc.confidence or 0) >= ACCEPT_CONFIDENCE
+    return (loc.rank or 0) >= ACCEPT_RANK or (loc.confidence or 0) >= ACCEPT_CONFIDENCE
+
+
+@dataclass(frozen=True)
+class CandidateSource:
+    name: str
+    fn: SourceFn
+
+
+SOURCES: List[CandidateSource] = []
+
+
+def register_source(name: str, fn: SourceFn):
+    SOURCES[:] = [s for s in SOURCES if s.name != name]
+    SOURCES.append(CandidateSource(name, fn))
+
+
+class HealCache:
+    """
+    Memory of accepted heals keyed by original locator and URL, so a
+    selector that broke once is healed without searching again. Heals are
+    published to the shared state, so every xdist worker reuses them.
+    """
+
+    NAMESPACE = "heal"
+
+    def __init__(self, max_entries: int = 512, ttl_s: float = 86400):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: Dict[Tuple[str, str], CoreLocator] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(context: FailureContext) -> Optional[Tuple[str, str]]:
+        original = context.failure.original_locator
+        if original is None:
+            return None
+        return (original.to_playwright(), context.url or "")
+
+    @staticmethod
+    def _shared_key(key: Tuple[str, str]) -> str:
+        return json.dumps(key)
+
+    def get(self, context: FailureContext) -> Optional[CoreLocator]:
+        key = self.key(context)
+        if key is None:
+            return None
+        with self._lock:
+            loc = self._entries.get(key)
+        if loc is not None:
+            return loc
+        # Healed by another worker (or an earlier run within the TTL)
+        shared = shared_state.get(self.NAMESPACE, self._shared_key(key))
+        if shared is None:
+            return None
+        try:
+            loc = as_core(LocatorDescriptor.model_validate_json(shared))
+        except ValueError:
+            return None
+        self._store(key, loc)
+        return loc
+
+    def _store(self, key: Tuple[str, str], loc: CoreLocator):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = loc
+
+    def remember(self, context: FailureContext, loc: CoreLocator):
+        key = self.key(context)
+        if key is None:
+            return
+        loc = as_core(loc)
+        self._store(key, loc)
+        shared_state.put(
+            self.NAMESPACE,
+            self._shared_key(key),
+            loc.to_descriptor().model_dump_json(),
+            self.ttl_s,
+        )
+
+
+heal_cache = HealCache(ttl_s=float(os.getenv("HEALER_HEAL_CACHE_TTL_S", 86400)))
+
+
+def cache_source(context: FailureContext, cancelled: threading.Event):
+    loc = heal_cache.get(context)
+    if loc is None:
+        return []
+    return [loc.replace(source="cache")]
+
+
+def transformer_source(context: FailureContext, cancelled: threading.Event):
+    transformer = LocatorTransformer()
+    original = context.failure.original_locator
+    # Search what changed since the locator last worked, then everything
+    scope = baseline_scope(context)
+    if scope is not None:
+        scoped = transformer.transform(original=original, snapshot=scope.snapshot)
+        if scoped:
+            return scoped
+    snapshot = load_snapshot(context.artifacts.a11y_snapshot)
+    return transformer.transform(original=original, snapshot=snapshot) or []
+
+
+def dom_index_source(context: FailureContext, cancelled: threading.Event):
+    return dom_candidates(
+        context.artifacts.dom_snapshot, hints_for(context.failure.original_locator)
+    )
+
+
+def parse_llm_candidates(llm_response, source: str) -> List[CoreLocator]:
+    if not isinstance(llm_response, list):
+        return []
+    locators = []
+    for text in llm_response:
+        try:
+            parsed: LocatorDescriptor = parse_playwright_locator(text["locator"])
+        except (KeyError, TypeError, ValueError) as e:
+            logger.info("Ignoring unparsable LLM candidate %s: %s", text, e)
+            continue
+        if parsed is None:
+            continue
+        locators.append(
+            CoreLocator.from_descriptor(
+                parsed, confidence=text.get("confidence", 0.0), source=source
+            )
+        )
+    return locators
+
+
+def llm_source(context: FailureContext, cancelled: threading.Event):
+    """
+    Asks the cheapest suitable model tier first and escalates to the next
+    tier when its candidates are all low-confidence or none is accepted.
+    """
+    original = context.failure.original_locator
+    if original is None:
+        # Nothing to repair; the heal ends as not_found
+        return
+    scope = baseline_scope(context)
+    system, user = build_prompt(
+        context.artifacts.a11y_snapshot,
+        original.to_playwright(),
+        scope_text=scope.text if scope is not None else None,
+        previous_match=scope.target if scope is not None else None,
+    )
+    for tier in model_router.tiers_for(len(system) + len(user)):
+        if cancelled.is_set():
+            return
+        try:
+            llm_response = analyze_prompt(
+                system, user, tier, context.failure.id, cancelled
+            )
+        except CallCancelledError:
+            # The race was decided; the request was aborted
+            return
+        except CircuitOpenError as e:
+            # Only this tier's model is off; the next tier may still answer
+            logger.info("Skipping LLM tier %s: %s", tier.name, e)
+            continue
+        except Exception as e:
+            logger.warning("LLM tier %s failed, escalating: %s", tier.name, e)
+            continue
+
+        locators = parse_llm_candidates(llm_response, f"llm:{tier.name}")
+        logger.info("List of locators fetched through LLM %s %s", tier.name, locators)
+        feedback: Optional[SourceBatch] = yield locators
+
+        if model_router.needs_escalation([loc.confidence for loc in locators]):
+            model_router.record_outcome(tier.name, accepted=False)
+            continue
+        accepted = feedback is not None and feedback.wait_validated(cancelled)
+        model_router.record_outcome(tier.name, accepted)
+        if accepted:
+            return
+
+
+register_source("cache", cache_source)
+register_source("transform", transformer_source)
+register_source("dom_index", dom_index_source)
+register_source("llm", llm_source)
+
+
+@dataclass
+class SourceBatch:
+    source: str
+    locators: List[CoreLocator]
+    elapsed_ms: float
+    error: Optional[str] = None
+    done: bool = False
+    # Set by the consumer once the batch has been validated
+    validated: threading.Event = field(default_factory=threading.Event)
+    accepted: bool = False
+
+    def mark_validated(self, accepted: bool):
+        self.accepted = accepted
+        self.validated.set()
+
+    def wait_validated(self, cancelled: threading.Event) -> bool:
+        """
+        Blocks a source until its batch is validated; False if the race
+        is cancelled first or the batch produced no acceptable locator.
+        """
+        while not self.validated.wait(0.05):
+            if cancelled.is_set():
+                return False
+        return self.accepted
+
+
+class CandidateRace:
+    """
+    Runs the sources concurrently and yields their batches in arrival
+    order. ``cancel()`` stops sources that have not started, tells running
+    ones to stop at their next batch, aborts their LLM requests and stops
+    waiting for the rest.
+    """
+
+    def __init__(self, sources: Optional[List[CandidateSource]] = None):
+        self.sources = list(SOURCES if sources is None else sources)
+        self.cancelled = threading.Event()
+        self.pending: set[str] = set()
+        self._queue: "queue.Queue[SourceBatch]" = queue.Queue()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self) -> "CandidateRace":
+        return self
+
+    def __exit__(self, *exc):
+        self.cancel()
+
+    def start(self, context: FailureContext) -> "CandidateRace":
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(self.sources), 1),
+            thread_name_prefix="candidate-source",
+        )
+        for source in self.sources:
+            self.pending.add(source.name)
+            # Each worker gets a copy of the caller's context (current_test etc.)
+            ctx = contextvars.copy_context()
+            self._executor.submit(ctx.run, self._run, source, context)
+        return self
+
+    def _run(self, source: CandidateSource, context: FailureContext):
+        start = time.perf_counter()
+
+        def emit(locators, error=None, done=False) -> SourceBatch:
+            nonlocal start
+            now = time.perf_counter()
+            batch = SourceBatch(
+                source.name, locators, (now - start) * 1000, error, done
+            )
+            self._queue.put(batch)
+            start = now
+            return batch
+
+        if self.cancelled.is_set():
+            emit([], done=True)
+            return
+        try:
+            output = source.fn(context, self.cancelled)
+            if isinstance(output, list):
+                emit(output, done=True)
+                return
+            # Generators receive their previous batch back so they can
+            # wait for its validation before deciding to continue
+            iterator = iter(output)
+            send = getattr(iterator, "send", None)
+            feedback = None
+            while not self.cancelled.is_set():
+                try:
+                    locators = send(feedback) if send and feedback else next(iterator)
+                except StopIteration:
+                    break
+                feedback = emit(list(locators))
+            if self.cancelled.is_set() and hasattr(iterator, "close"):
+                iterator.close()
+            emit([], done=True)
+        except Exception as e:
+            logger.warning("Candidate source %s failed: %s", source.name, e)
+            emit([], error=str(e), done=True)
+
+    def __iter__(self) -> Iterator[SourceBatch]:
+        while self.pending and not self.cancelled.is_set():
+            batch = self._queue.get()
+            if batch.done:
+                self.pending.discard(batch.source)
+            yield batch
+
+    def cancel(self):
+        if self.cancelled.is_set():
+            return
+        self.cancelled.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.pending:
+            logger.info("Cancelled candidate sources %s", sorted(self.pending))
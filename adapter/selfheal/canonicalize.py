@@ -0,0 +1,185 @@
+"""
+Canonicalization and deduplication of heal candidates.
+
+Sources repeat each other: the transformer finds the same role and name
+under several parents, and LLM variants differ only in quoting,
+whitespace, role case or a default ``exact=False``. Candidates are normalized and merged
+on a canonical key before ranking, so each distinct locator is validated
+in the browser once, and at most HEALER_MAX_CANDIDATES are validated per
+heal.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+import re
+
+from adapter.selfheal.models import CoreLocator, LocatorStep, as_chain, as_core
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Keyword arguments whose value is Playwright's default; dropped from chains
+DEFAULT_KWARGS = {"exact": False}
+
+# Strategies whose value is matched as text, so whitespace is insignificant
+TEXT_STRATEGIES = {"role", "text", "label", "placeholder", "scoped_role"}
+
+
+def max_candidates() -> int:
+    """
+    How many candidates a heal validates at most; 0 for no limit.
+    """
+    return int(os.getenv("HEALER_MAX_CANDIDATES", 8))
+
+
+def _squash(text: Optional[str]) -> Optional[str]:
+    if not isinstance(text, str):
+        return text
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _normalize_value(value):
+    chain = as_chain(value)
+    if chain is not None:
+        return _normalize_chain(chain)
+    return _squash(value)
+
+
+def _normalize_chain(chain: Tuple[LocatorStep, ...]) -> Tuple[LocatorStep, ...]:
+    steps = []
+    for step in chain:
+        args = tuple(_normalize_value(v) for v in step.args)
+        if step.method == "get_by_role" and args and isinstance(args[0], str):
+            args = (args[0].lower(),) + args[1:]
+        kwargs = tuple(
+            (k, _normalize_value(v))
+            for k, v in step.kwargs
+            if not (k in DEFAULT_KWARGS and v == DEFAULT_KWARGS[k])
+        )
+        steps.append(
+            LocatorStep(method=step.method, args=args, kwargs=kwargs, call=step.call)
+        )
+    return tuple(steps)
+
+
+def canonicalize(loc) -> CoreLocator:
+    """
+    The candidate with role names lower-cased, whitespace in text values
+    collapsed and default options dropped. The result locates the same
+    elements as the input.
+    """
+    loc = as_core(loc)
+    strategy = loc.strategy.lower()
+    changes = {
+        "strategy": strategy,
+        "role": loc.role.lower() if loc.role else loc.role,
+        "chain": _normalize_chain(loc.chain) if loc.chain else None,
+    }
+    if strategy in TEXT_STRATEGIES:
+        changes.update(value=_squash(loc.value), name=_squash(loc.name))
+    else:
+        # exact only applies to text matching
+        changes["exact"] = False
+    if all(getattr(loc, k) == v for k, v in changes.items()):
+        return loc
+    return loc.replace(**changes)
+
+
+def _selector_key(value: str) -> str:
+    # [name="q"] and [name='q'] select the same elements
+    return value.replace('"', "'")
+
+
+def dedupe_key(loc: CoreLocator) -> tuple:
+    """
+    Candidates with equal keys are duplicates. Scoring fields are
+    ignored, as is the quote style inside CSS/XPath selectors. ``exact``
+    is kept: an exact match can be unique where the substring match is not.
+    """
+    value = loc.value
+    if loc.strategy in ("css", "xpath") and isinstance(value, str):
+        value = _selector_key(value)
+    return (
+        loc.strategy,
+        value,
+        loc.role,
+        loc.name,
+        loc.exact,
+        loc.landmark,
+        loc.options,
+        loc.chain,
+    )
+
+
+class CandidateSet:
+    """
+    The distinct candidates of one heal, across all source batches.
+
+    ``merge`` returns the candidates of a batch that were not seen before,
+    with duplicates folded in: the most confident variant is kept, with
+    the highest confidence of any. Every source a candidate came from is
+    recorded in ``provenance``. ``take`` hands out the validation budget.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = max_candidates() if limit is None else limit
+        self._keys: Dict[tuple, CoreLocator] = {}
+        self._provenance: Dict[tuple, List[str]] = {}
+        self.duplicates = 0
+        self.taken = 0
+
+    def merge(self, locators: Iterable) -> List[CoreLocator]:
+        batch: Dict[tuple, CoreLocator] = {}
+        for loc in locators:
+            loc = canonicalize(loc)
+            key = dedupe_key(loc)
+            sources = self._provenance.setdefault(key, [])
+            if loc.source and loc.source not in sources:
+                sources.append(loc.source)
+            if key in self._keys:
+                # Already handed out in an earlier batch
+                self.duplicates += 1
+                continue
+            current = batch.get(key)
+            if current is None:
+                batch[key] = loc
+                continue
+            self.duplicates += 1
+            best = loc if loc.confidence > current.confidence else current
+            batch[key] = best.replace(
+                confidence=max(loc.confidence, current.confidence)
+            )
+        self._keys.update(batch)
+        return list(batch.values())
+
+    def take(self, ranked: List[CoreLocator]) -> List[CoreLocator]:
+        """
+        The leading candidates of ``ranked`` that fit in the remaining
+        validation budget.
+        """
+        if self.limit <= 0:
+            return ranked
+        room = max(self.limit - self.taken, 0)
+        taken = ranked[:room]
+        self.taken += len(taken)
+        return taken
+
+    @property
+    def exhausted(self) -> bool:
+        return self.limit > 0 and self.taken >= self.limit
+
+    def provenance(self) -> Dict[str, List[str]]:
+        """
+        Sources of every distinct candidate, by canonical expression.
+        """
+        return {
+            self._keys[key].canonical: sources
+            for key, sources in self._provenance.items()
+            if key in self._keys
+        }
+
+
+def dedupe_candidates(locators: Iterable) -> List[CoreLocator]:
+    """
+    Canonicalizes and merges one list of candidates, without a budget.
+    """
+    return CandidateSet(limit=0).merge(locators)
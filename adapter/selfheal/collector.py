@@ -1,18 +1,89 @@
-from pathlib import Path
+from dataclasses import asdict, dataclass
+from typing import Optional
 from playwright.sync_api import Page
+from adapter.selfheal.artifact_store import (  # noqa: F401 - re-exported
+    ARTIFACT_DIR,
+    store,
+    wait_for_pending_writes,
+)
+from adapter.selfheal.models import ErrorInfo, LocatorDescriptor
+from adapter.selfheal.retention import retention  # noqa: F401 - registers eviction
+from adapter.selfheal.retry import build_locator
+from test_context import current_test
+import json
+import logging
 import os
 
-ARTIFACT_DIR = Path(os.getcwd() + "/test_artifacts")
-ARTIFACT_DIR.mkdir(exist_ok=True)
+logger = logging.getLogger(__name__)
+
+SCREENSHOT_MODES = {"off", "png", "jpeg", "downscale", "clip"}
+
+# Landmarks used to clip the screenshot when the failing locator has no box
+CLIP_LANDMARKS = (
+    "[role=dialog]",
+    "dialog[open]",
+    "form",
+    "[role=form]",
+    "main",
+    "[role=main]",
+    "[role=search]",
+)
+
+CLIP_LANDMARK_JS = """
+(selectors) => {
+    for (const selector of selectors) {
+        for (const el of document.querySelectorAll(selector)) {
+            const r = el.getBoundingClientRect();
+            if (r.width > 0 && r.height > 0) {
+                return {x: r.x, y: r.y, width: r.width, height: r.height};
+            }
+        }
+    }
+    return null;
+}
+"""
+
+
+@dataclass(frozen=True)
+class ScreenshotConfig:
+    mode: str = "jpeg"
+    quality: int = 60
+    clip_padding: int = 24
+
+    @classmethod
+    def from_env(cls) -> "ScreenshotConfig":
+        mode = os.getenv("HEALER_SCREENSHOT_MODE", cls.mode).lower()
+        if mode not in SCREENSHOT_MODES:
+            logger.warning("Unknown screenshot mode %r; using %r", mode, cls.mode)
+            mode = cls.mode
+        return cls(
+            mode=mode,
+            quality=int(os.getenv("HEALER_SCREENSHOT_QUALITY", cls.quality)),
+            clip_padding=int(os.getenv("HEALER_SCREENSHOT_PADDING", cls.clip_padding)),
+        )
+
+
+def collect_error(failure_id: str, error: ErrorInfo, url: Optional[str]) -> str:
+    """
+    Stores the error details so the failure can be re-healed offline.
+    """
+    payload = {**asdict(error), "url": url}
+    return store.put_text(
+        failure_id,
+        "error",
+        json.dumps(payload),
+        suffix=".json",
+        test_name=current_test.get(),
+    )
 
 
 def collect_dom(page: Page, failure_id: str) -> str:
     dom_path = None
     try:
         dom = page.content()
-        path = ARTIFACT_DIR / f"{failure_id}_dom.html"
-        path.write_text(dom)
-        dom_path = str(path)
+        dom_path = store.put_text(
+            failure_id, "dom", dom, suffix=".html", test_name=current_test.get()
+        )
     except Exception as e:
         print(e)
     return dom_path
@@ -23,21 +94,95 @@ def collect_a11y(page: Page, failure_id: str) -> str:
     page.wait_for_timeout(3000)
     try:
         snapshot = page.locator("body").aria_snapshot()
-        path = ARTIFACT_DIR / f"{failure_id}_a11y.yaml"
-        with open(path, "w") as f:
-            f.write(snapshot)
-        a11y = str(path)
+        a11y = store.put_text(
+            failure_id, "a11y", snapshot, suffix=".yaml", test_name=current_test.get()
+        )
     except Exception as e:
         print(e)
     return a11y
 
 
-def collect_screenshot(page: Page, failure_id: str) -> str:
+def _clip_region(
+    page: Page, locator: Optional[LocatorDescriptor], padding: int
+) -> Optional[dict]:
+    """
+    Bounding box of the failing locator's first match, else of the first
+    visible landmark, padded and clamped to the viewport.
+    """
+    box = None
+    if locator is not None:
+        try:
+            target = build_locator(page, locator)
+            # count() does not wait, unlike bounding_box() on a missing element
+            if target.count() > 0:
+                box = target.first.bounding_box(timeout=500)
+        except Exception:
+            box = None
+    if box is None:
+        box = page.evaluate(CLIP_LANDMARK_JS, list(CLIP_LANDMARKS))
+    if box is None:
+        return None
+
+    viewport = page.viewport_size or {}
+    x = max(box["x"] - padding, 0)
+    y = max(box["y"] - padding, 0)
+    width = box["width"] + 2 * padding
+    height = box["height"] + 2 * padding
+    if viewport:
+        width = min(width, viewport["width"] - x)
+        height = min(height, viewport["height"] - y)
+    if width <= 0 or height <= 0:
+        return None
+    return {"x": x, "y": y, "width": width, "height": height}
+
+
+def collect_screenshot(
+    page: Page,
+    failure_id: str,
+    locator: Optional[LocatorDescriptor] = None,
+    config: Optional[ScreenshotConfig] = None,
+) -> str:
+    """
+    Captures a screenshot according to HEALER_SCREENSHOT_MODE:
+
+    - off:       no screenshot
+    - png:       full viewport PNG
+    - jpeg:      full viewport JPEG at HEALER_SCREENSHOT_QUALITY
+    - downscale: JPEG at CSS-pixel resolution (ignores device pixel ratio)
+    - clip:      JPEG clipped to the failing locator or nearest landmark
+
+    Only the capture runs on the calling thread; the blob is written by the
+    artifact store's writer pool.
+    """
+    config = config or ScreenshotConfig.from_env()
+    if config.mode == "off":
+        return None
+
     scrnshot = None
     try:
-        path = ARTIFACT_DIR / f"{failure_id}_screenshot.png"
-        page.screenshot(path=str(path))
-        scrnshot = str(path)
+        options = {"animations": "disabled", "caret": "hide"}
+        if config.mode == "png":
+            options["type"] = "png"
+        else:
+            options["type"] = "jpeg"
+            options["quality"] = config.quality
+        if config.mode in ("downscale", "clip"):
+            options["scale"] = "css"
+        if config.mode == "clip":
+            clip = _clip_region(page, locator, config.clip_padding)
+            if clip is not None:
+                options["clip"] = clip
+
+        data = page.screenshot(**options)
+        # Images are already compressed; store them as-is
+        scrnshot = store.put(
+            failure_id,
+            "screenshot",
+            data,
+            suffix=".png" if options["type"] == "png" else ".jpg",
+            compress=False,
+            test_name=current_test.get(),
+        )
     except Exception as e:
         print(e)
     return scrnshot
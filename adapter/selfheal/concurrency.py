@@ -0,0 +1,112 @@
+"""
+Primitives for healing several pages of one process at the same time.
+
+Multi-tab and multi-user tests fail on several pages (often of several
+browser contexts) at once, each on its own thread. Heals of one page are
+serialized, since they validate against the page and record its state;
+heals of different pages run in parallel. Heals that would do the same
+work, the same broken locator on the same page state, are coalesced: one
+thread runs the pipeline and the others reuse its result.
+"""
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+import logging
+import threading
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+class PageLocks:
+    """
+    One re-entrant lock per page, held for as long as the page is alive.
+    """
+
+    def __init__(self):
+        self._locks: "weakref.WeakKeyDictionary[Any, threading.RLock]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def lock_for(self, page) -> threading.RLock:
+        with self._lock:
+            lock = self._locks.get(page)
+            if lock is None:
+                lock = self._locks[page] = threading.RLock()
+            return lock
+
+    @contextmanager
+    def hold(self, page) -> Iterator[None]:
+        with self.lock_for(page):
+            yield
+
+
+page_locks = PageLocks()
+
+
+class _Flight:
+    __slots__ = ("done", "result", "ok", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.ok = False
+        self.followers = 0
+
+
+class Coalescer:
+    """
+    Runs identical concurrent calls once. The first caller of a key runs
+    ``fn``; callers arriving while it runs wait for its result instead. A
+    follower never inherits a failure: when the leader raises or does not
+    finish within ``timeout``, the follower gets ``None`` and is expected
+    to do the work itself.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def run(
+        self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Returns ``(result, shared)``; ``shared`` is True when the result
+        (or None) came from another thread's call.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                logger.info("Stopped waiting for in-flight %s %s", self.name, key)
+                return None, True
+            return (flight.result if flight.ok else None), True
+
+        try:
+            flight.result = fn()
+            flight.ok = True
+            return flight.result, False
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            if flight.followers:
+                logger.info(
+                    "Shared in-flight %s with %s callers",
+                    self.name,
+                    flight.followers,
+                )
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,409 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, List, Optional
+import re
+import threading
+
+from adapter.selfheal.artifact_store import content_hash, read_artifact_text, store
+from adapter.selfheal.models import CoreLocator, LocatorDescriptor
+from adapter.selfheal.selector_hints import SelectorHints, humanize
+
+INDEXED_ATTRIBUTES = (
+    "id",
+    "data-testid",
+    "name",
+    "aria-label",
+    "placeholder",
+    "title",
+    "alt",
+)
+
+VOID_TAGS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+
+# Attributes Playwright and CSS compare case- and whitespace-sensitively
+EXACT_ATTRIBUTES = {"id", "data-testid", "name", "title", "alt"}
+
+INVISIBLE_TAGS = {"script", "style", "noscript", "template", "head", "title"}
+LABELABLE_TAGS = {"input", "select", "textarea", "button", "meter", "output"}
+
+LANDMARK_TAGS = {
+    "main": "main",
+    "nav": "navigation",
+    "header": "banner",
+    "footer": "contentinfo",
+    "form": "form",
+    "search": "search",
+    "dialog": "dialog",
+}
+LANDMARK_ROLES = set(LANDMARK_TAGS.values()) | {"complementary", "region"}
+
+MAX_TEXT_LENGTH = 120
+_SPACE_RE = re.compile(r"\s+")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CSS_IDENT_RE = re.compile(r"^-?[A-Za-z_][\w-]*$")
+
+
+def normalize_value(value: str) -> str:
+    return _SPACE_RE.sub(" ", value).strip().lower()
+
+
+def css_string(value: str) -> str:
+    """
+    ``value`` as a single-quoted CSS string: quotes and backslashes are
+    escaped and control characters, newlines included, written as hex
+    escapes.
+    """
+    escaped = []
+    for ch in value:
+        if ch in "'\\":
+            escaped.append("\\" + ch)
+        elif ord(ch) < 0x20 or ord(ch) == 0x7F:
+            escaped.append(f"\\{ord(ch):x} ")
+        else:
+            escaped.append(ch)
+    return "'" + "".join(escaped) + "'"
+
+
+def _tokens(text: str) -> List[str]:
+    # Crude plural folding so "product" still hits "products"
+    return [
+        t[:-1] if len(t) > 3 and t.endswith("s") else t for t in _TOKEN_RE.findall(text)
+    ]
+
+
+@dataclass
+class DomElement:
+    path: str
+    tag: str
+    attrs: Dict[str, str]
+    landmark: Optional[str] = None
+    text: str = ""
+    label: str = ""
+    _text_parts: List[str] = field(default_factory=list, repr=False)
+
+
+class DomIndexer(HTMLParser):
+    """
+    Single pass over captured HTML collecting indexed attributes, label
+    associations and direct visible text per element.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.elements: List[DomElement] = []
+        # (tag, element index, child tag counters)
+        self._stack: List[tuple[str, int, Dict[str, int]]] = []
+        self._root_counters: Dict[str, int] = {}
+        self._invisible_depth = 0
+        self._label_for: List[tuple[str, int]] = []  # (target id, label index)
+        self._open_labels: List[tuple[int, List[int]]] = []  # label, wrapped
+
+    def _path_for(self, tag: str) -> str:
+        counters = self._stack[-1][2] if self._stack else self._root_counters
+        counters[tag] = counters.get(tag, 0) + 1
+        step = f"{tag}:nth-of-type({counters[tag]})"
+        if self._stack:
+            return f"{self.elements[self._stack[-1][1]].path} > {step}"
+        return step
+
+    def _landmark(self, tag: str, attrs: Dict[str, str]) -> Optional[str]:
+        return attrs.get("role") or LANDMARK_TAGS.get(tag)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k: (v or "") for k, v in attrs}
+        if tag in INVISIBLE_TAGS:
+            if tag not in VOID_TAGS:
+                self._invisible_depth += 1
+            return
+        parent_landmark = None
+        if self._stack:
+            parent = self.elements[self._stack[-1][1]]
+            own = self._landmark(parent.tag, parent.attrs)
+            parent_landmark = own if own in LANDMARK_ROLES else parent.landmark
+        element = DomElement(
+            path=self._path_for(tag),
+            tag=tag,
+            attrs=attrs,
+            landmark=parent_landmark,
+        )
+        index = len(self.elements)
+        self.elements.append(element)
+
+        if tag == "label":
+            if attrs.get("for"):
+                self._label_for.append((attrs["for"], index))
+            self._open_labels.append((index, []))
+        elif tag in LABELABLE_TAGS and self._open_labels:
+            self._open_labels[-1][1].append(index)
+
+        if tag not in VOID_TAGS:
+            self._stack.append((tag, index, {}))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self._stack and self._stack[-1][0] == tag:
+            self._close_top()
+
+    def handle_endtag(self, tag):
+        if tag in INVISIBLE_TAGS:
+            self._invisible_depth = max(self._invisible_depth - 1, 0)
+            return
+        if not any(open_tag == tag for open_tag, _, _ in self._stack):
+            return
+        while self._stack:
+            open_tag = self._stack[-1][0]
+            self._close_top()
+            if open_tag == tag:
+                break
+
+    def _close_top(self):
+        _, index, _ = self._stack.pop()
+        element = self.elements[index]
+        element.text = _SPACE_RE.sub(" ", " ".join(element._text_parts)).strip()
+        if element.tag == "label" and self._open_labels:
+            label_index, wrapped = self._open_labels.pop()
+            if label_index == index and not element.attrs.get("for"):
+                for target in wrapped:
+                    self.elements[target].label = element.text
+            if self._open_labels:
+                # Nested label text also belongs to the outer label
+                self.elements[self._open_labels[-1][0]]._text_parts.append(element.text)
+
+    def handle_data(self, data):
+        if self._invisible_depth or not self._stack or not data.strip():
+            return
+        self.elements[self._stack[-1][1]]._text_parts.append(data)
+        # Labels read the text of their descendants as well
+        for label_index, _ in self._open_labels:
+            if label_index != self._stack[-1][1]:
+                self.elements[label_index]._text_parts.append(data)
+
+    def finish(self) -> List[DomElement]:
+        self.close()
+        while self._stack:
+            self._close_top()
+        by_id = {e.attrs["id"]: e for e in self.elements if e.attrs.get("id")}
+        for target_id, label_index in self._label_for:
+            target = by_id.get(target_id)
+            if target is not None and not target.label:
+                target.label = self.elements[label_index].text
+        return self.elements
+
+
+class DomIndex:
+    """
+    Attribute/label/text index over one captured DOM. Lookups are dict hits
+    on normalized values; a token index supports partial matches.
+    """
+
+    def __init__(self, elements: List[DomElement]):
+        self.elements = elements
+        # kind -> normalized value -> element indexes
+        self.values: Dict[str, Dict[str, List[int]]] = {
+            kind: {} for kind in (*INDEXED_ATTRIBUTES, "label", "text")
+        }
+        # token -> {(kind, normalized value)}
+        self.tokens: Dict[str, set] = {}
+        # normalized value -> original spelling, per kind
+        self.originals: Dict[tuple, str] = {}
+
+        for i, element in enumerate(elements):
+            for attr in INDEXED_ATTRIBUTES:
+                if element.attrs.get(attr):
+                    self._add(attr, element.attrs[attr], i)
+            if element.label:
+                self._add("label", element.label, i)
+            if element.text and len(element.text) <= MAX_TEXT_LENGTH:
+                self._add("text", element.text, i)
+
+    @classmethod
+    def from_html(cls, html: str) -> "DomIndex":
+        indexer = DomIndexer()
+        indexer.feed(html)
+        return cls(indexer.finish())
+
+    def _add(self, kind: str, value: str, index: int):
+        key = normalize_value(value)
+        if not key:
+            return
+        self.values[kind].setdefault(key, []).append(index)
+        self.originals.setdefault((kind, key), value.strip())
+        words = key if kind in ("label", "text", "aria-label") else humanize(value)
+        for token in _tokens(words):
+            self.tokens.setdefault(token, set()).add((kind, key))
+
+    def lookup(self, kind: str, value: str) -> List[DomElement]:
+        return [
+            self.elements[i]
+            for i in self.values.get(kind, {}).get(normalize_value(value), [])
+        ]
+
+    def _exact(self, attr: str, value: str) -> List[int]:
+        # The index is case-insensitive; the attribute is not
+        return [
+            i
+            for i in self.values[attr].get(normalize_value(value), [])
+            if self.elements[i].attrs.get(attr) == value
+        ]
+
+    def count_matches(self, loc: LocatorDescriptor) -> Optional[int]:
+        """
+        Number of indexed elements a candidate would match, or None when the
+        index cannot answer for its strategy. Used where no page is available.
+        """
+        value = normalize_value(loc.value or "")
+        if loc.strategy == "test_id":
+            return len(self._exact("data-testid", loc.value or ""))
+        if loc.strategy == "placeholder":
+            return len(self.values["placeholder"].get(value, []))
+        if loc.strategy == "label":
+            return len(
+                set(self.values["label"].get(value, []))
+                | set(self.values["aria-label"].get(value, []))
+            )
+        if loc.strategy == "text" and loc.exact:
+            return len(self.values["text"].get(value, []))
+        if loc.strategy == "css" and _CSS_IDENT_RE.match(loc.value.lstrip("#")):
+            if loc.value.startswith("#"):
+                return len(self._exact("id", loc.value[1:]))
+        return None
+
+    def _descriptor(
+        self, kind: str, key: str, score: float
+    ) -> Optional[CoreLocator]:
+        matches = self.values[kind][key]
+        value = self.originals[(kind, key)]
+        element = self.elements[matches[0]]
+        if kind in EXACT_ATTRIBUTES:
+            # Only elements with this exact spelling match the locator
+            value = element.attrs[kind]
+            matches = self._exact(kind, value)
+        # Values shared by several elements would fail strict mode
+        confidence = round(score * (1.0 if len(matches) == 1 else 0.6), 2)
+        common = dict(
+            landmark=element.landmark, confidence=confidence, source="dom_index"
+        )
+        if kind == "data-testid":
+            return CoreLocator(strategy="test_id", value=value, **common)
+        if kind in ("label", "aria-label"):
+            return CoreLocator(strategy="label", value=value, **common)
+        if kind == "placeholder":
+            return CoreLocator(strategy="placeholder", value=value, **common)
+        if kind == "text":
+            return CoreLocator(strategy="text", value=value, exact=True, **common)
+        if kind == "id":
+            selector = (
+                f"#{value}"
+                if _CSS_IDENT_RE.match(value)
+                else f"[id={css_string(value)}]"
+            )
+            return CoreLocator(strategy="css", value=selector, **common)
+        if kind in ("name", "title", "alt"):
+            selector = f"{element.tag}[{kind}={css_string(value)}]"
+            return CoreLocator(strategy="css", value=selector, **common)
+        return None
+
+    def candidates(
+        self, hints: SelectorHints, min_coverage: float = 0.5, limit: int = 8
+    ) -> List[CoreLocator]:
+        scored: Dict[tuple, float] = {}
+
+        def offer(kind: str, key: str, score: float):
+            if key in self.values.get(kind, {}) and scored.get((kind, key), 0) < score:
+                scored[(kind, key)] = score
+
+        # Exact attribute values carried over from the original selector
+        for attr, values in hints.attributes.items():
+            for value in values:
+                offer(attr, normalize_value(value), 1.0)
+
+        for name in hints.names:
+            key = normalize_value(name)
+            for kind in self.values:
+                offer(kind, key, 0.95)
+
+            # Partial matches through the token index
+            tokens = _tokens(key)
+            if not tokens:
+                continue
+            hits: Dict[tuple, int] = {}
+            for token in tokens:
+                for entry in self.tokens.get(token, ()):
+                    hits[entry] = hits.get(entry, 0) + 1
+            for (kind, value_key), count in hits.items():
+                coverage = count / max(len(tokens), len(_tokens(value_key)))
+                if coverage >= min_coverage:
+                    offer(kind, value_key, 0.85 * coverage)
+
+        ranked = sorted(scored.items(), key=lambda item: item[1], reverse=True)
+        descriptors = []
+        for (kind, key), score in ranked:
+            descriptor = self._descriptor(kind, key, score)
+            if descriptor is not None:
+                descriptors.append(descriptor)
+            if len(descriptors) >= limit:
+                break
+        return descriptors
+
+
+class DomIndexCache:
+    """
+    Reuses the index while the captured DOM is unchanged. Keys are content
+    hashes, which the artifact store already encodes in blob file names.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, DomIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, dom_path: str) -> DomIndex:
+        path = Path(dom_path)
+        html = None
+        if path.is_relative_to(store.blob_dir):
+            key = path.name.split(".", 1)[0]
+        else:
+            html = read_artifact_text(path)
+            key = content_hash(html.encode("utf-8"))
+
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                return index
+
+        index = DomIndex.from_html(
+            html if html is not None else read_artifact_text(path)
+        )
+        with self._lock:
+            self._entries[key] = index
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+
+dom_index_cache = DomIndexCache()
+
+
+def dom_candidates(
+    dom_path: Optional[str], hints: SelectorHints
+) -> List[CoreLocator]:
+    if not dom_path or not hints:
+        return []
+    return dom_index_cache.get(dom_path).candidates(hints)
@@ -0,0 +1,161 @@
+from functools import lru_cache
+from typing import List
+import re
+
+from adapter.selfheal.models import CoreLocator
+from adapter.selfheal.roles import ARIA_ROLES
+from adapter.selfheal.selector_hints import SelectorHints
+from adapter.selfheal.snapshot_helper import SnapshotNode, iter_snapshot_nodes
+
+# Roles whose accessible name usually comes from a <label>
+LABELLED_ROLES = {
+    "textbox",
+    "searchbox",
+    "combobox",
+    "checkbox",
+    "radio",
+    "switch",
+    "slider",
+    "spinbutton",
+}
+
+TARGET_ROLE_BONUS = 0.15
+CONTEXT_ROLE_BONUS = 0.05
+ROLE_MISMATCH_PENALTY = 0.15
+# A name that only resembles a hint is a guess: its confidence stays below
+# the auto-accept threshold, so it goes to manual review
+PARTIAL_MATCH_CONFIDENCE = 0.8
+
+_SPACE_RE = re.compile(r"\s+")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text: str) -> str:
+    return _SPACE_RE.sub(" ", text).strip().lower()
+
+
+@lru_cache(maxsize=4096)
+def _trigrams(text: str) -> frozenset:
+    padded = f"  {_normalize(text)} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+@lru_cache(maxsize=4096)
+def _tokens(text: str) -> tuple:
+    return tuple(_TOKEN_RE.findall(text.lower()))
+
+
+def similarity(query: str, candidate: str) -> float:
+    """
+    Fuzzy similarity in [0, 1]: the larger of the trigram Dice coefficient
+    and a token-prefix containment score, so ``Log`` matches ``Log in``
+    strongly while ``Login`` still matches ``Log in`` through trigrams.
+    """
+    if not query or not candidate:
+        return 0.0
+    query_tokens, candidate_tokens = _tokens(query), _tokens(candidate)
+    # Equal up to case, spacing and punctuation: ``user-name`` / ``Username``
+    if query_tokens and "".join(query_tokens) == "".join(candidate_tokens):
+        return 1.0
+    a, b = _trigrams(query), _trigrams(candidate)
+    dice = 2 * len(a & b) / (len(a) + len(b))
+
+    containment = 0.0
+    if query_tokens and candidate_tokens:
+        hits = sum(any(c.startswith(q) for c in candidate_tokens) for q in query_tokens)
+        coverage = hits / len(query_tokens)
+        # Penalise candidates with many extra words
+        brevity = len(query_tokens) / max(len(candidate_tokens), len(query_tokens))
+        containment = coverage * (0.6 + 0.3 * brevity)
+    return max(dice, containment)
+
+
+class FuzzyCandidateGenerator:
+    """
+    Deterministic, snapshot-based candidate generation for locators the
+    text search cannot resolve, e.g. raw XPath/CSS selectors.
+    """
+
+    def __init__(self, min_score: float = 0.45, limit: int = 5):
+        self.min_score = min_score
+        self.limit = limit
+
+    def name_score(self, node: SnapshotNode, hints: SelectorHints) -> float:
+        if not node.name:
+            return 0.0
+        return max((similarity(name, node.name) for name in hints.names), default=0)
+
+    def score_node(self, node: SnapshotNode, hints: SelectorHints) -> float:
+        best = self.name_score(node, hints)
+        if not best:
+            return 0.0
+        if hints.roles and node.role != "text":
+            if node.role == hints.target_role:
+                best += TARGET_ROLE_BONUS
+            elif node.role in hints.roles:
+                best += CONTEXT_ROLE_BONUS
+            else:
+                best -= ROLE_MISMATCH_PENALTY
+        return min(best, 1.0)
+
+    def generate(self, snapshot, hints: SelectorHints) -> List[CoreLocator]:
+        if not hints.names:
+            return []
+
+        scored: dict[tuple, tuple[float, CoreLocator]] = {}
+
+        def offer(score: float, loc: CoreLocator):
+            key = (loc.strategy, loc.role, loc.value)
+            if key not in scored or scored[key][0] < score:
+                scored[key] = (score, loc)
+
+        for node in iter_snapshot_nodes(snapshot):
+            score = self.score_node(node, hints)
+            if score < self.min_score:
+                continue
+            confidence = round(score, 2)
+            if self.name_score(node, hints) < 1.0:
+                confidence = min(confidence, PARTIAL_MATCH_CONFIDENCE)
+            if node.role == "text":
+                offer(
+                    score,
+                    CoreLocator(
+                        strategy="text",
+                        value=node.name,
+                        exact=True,
+                        landmark=node.landmark,
+                        scope=node.parent,
+                        confidence=confidence,
+                        source="fuzzy",
+                    ),
+                )
+            elif node.role in ARIA_ROLES:
+                offer(
+                    score,
+                    CoreLocator(
+                        strategy="role",
+                        value=node.name,
+                        role=node.role,
+                        name=node.name,
+                        exact=True,
+                        landmark=node.landmark,
+                        scope=node.parent,
+                        confidence=confidence,
+                        source="fuzzy",
+                    ),
+                )
+                if node.role in LABELLED_ROLES:
+                    offer(
+                        score * 0.9,
+                        CoreLocator(
+                            strategy="label",
+                            value=node.name,
+                            landmark=node.landmark,
+                            scope=node.parent,
+                            confidence=round(confidence * 0.9, 2),
+                            source="fuzzy",
+                        ),
+                    )
+
+        ranked = sorted(scored.values(), key=lambda item: item[0], reverse=True)
+        return [loc for _, loc in ranked[: self.limit]]
@@ -0,0 +1,126 @@
+"""
+Structured heal events, one JSON line per heal.
+
+Events go through the ``healer.events`` logger, so they share the queue of
+``logging_config.setup_logging`` and the test thread never writes them.
+Every string field is cut to HEALER_EVENT_MAX_FIELD characters and lists
+to HEALER_EVENT_MAX_ITEMS entries. Large payloads (snapshots, the DOM, LLM
+responses) are not inlined: they are in the artifact store already, and
+the event references each by its content hash.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+import logging
+import os
+import time
+
+from adapter.selfheal.artifact_store import ARTIFACT_DIR, store
+from logging_config import EVENTS_LOGGER
+from rule_engine.models import FailureContext
+
+events_logger = logging.getLogger(EVENTS_LOGGER)
+
+EVENTS_PATH = ARTIFACT_DIR / "heal_events.jsonl"
+
+
+def events_enabled() -> bool:
+    return os.getenv("HEALER_EVENTS", "1").lower() not in ("0", "false", "no")
+
+
+def max_field() -> int:
+    return int(os.getenv("HEALER_EVENT_MAX_FIELD", 512))
+
+
+def max_items() -> int:
+    return int(os.getenv("HEALER_EVENT_MAX_ITEMS", 20))
+
+
+def bounded(value: Any, limit: int, items: int) -> Any:
+    """
+    ``value`` with strings cut to ``limit`` characters and lists to
+    ``items`` entries, recursively; cuts are marked with what was dropped.
+    """
+    if isinstance(value, str):
+        if len(value) <= limit:
+            return value
+        return f"{value[:limit]}...[+{len(value) - limit} chars]"
+    if isinstance(value, dict):
+        return {k: bounded(v, limit, items) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        kept = [bounded(v, limit, items) for v in value[:items]]
+        if len(value) > items:
+            kept.append(f"...[+{len(value) - items} items]")
+        return kept
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return bounded(str(value), limit, items)
+
+
+def payload_refs(failure_id: str) -> Dict[str, Dict[str, str]]:
+    """
+    The stored payloads of a failure by kind, as content hash and path
+    relative to the artifact directory.
+    """
+    refs = {}
+    for kind, path in store.artifacts_for(failure_id).items():
+        path = Path(path)
+        refs[kind] = {
+            "hash": path.name.split(".", 1)[0],
+            "path": str(path.relative_to(ARTIFACT_DIR)),
+        }
+    return refs
+
+
+def _expression(loc) -> Optional[str]:
+    if loc is None:
+        return None
+    if isinstance(loc, str):
+        return loc
+    return loc.to_playwright()
+
+
+def heal_event(ctx: FailureContext, result: Dict, healed: bool) -> Dict[str, Any]:
+    locator = result.get("healed_locator")
+    validations = result.get("validations") or []
+    event = {
+        "event": "heal",
+        "ts": time.time(),
+        "failure_id": ctx.failure.id,
+        "test": ctx.test_name,
+        "url": ctx.url,
+        "failure_type": ctx.failure.type,
+        "decision": result.get("decision"),
+        "rule_id": result.get("rule_id"),
+        "original_locator": _expression(ctx.failure.original_locator),
+        "healed": healed,
+        "healed_locator": _expression(locator),
+        "rank": getattr(locator, "rank", None),
+        "confidence": getattr(locator, "confidence", None),
+        "source": getattr(locator, "source", None),
+        "candidate_sources": result.get("candidate_sources") or [],
+        "cancelled_sources": result.get("cancelled_sources") or [],
+        "validations": len(validations),
+        "unique_validations": sum(1 for v in validations if v.is_unique),
+        "transform_strategy": result.get("transform_strategy"),
+        "coalesced": bool(result.get("coalesced")),
+        "escalated": bool(result.get("escalated")),
+        "llm_circuit": (result.get("llm_circuit") or {}).get("state"),
+        "timings_ms": result.get("timings") or {},
+        "heal_ms": round(ctx.timer.elapsed_ms(), 3),
+    }
+    event = bounded(event, max_field(), max_items())
+    event["payloads"] = payload_refs(ctx.failure.id)
+    return event
+
+
+def emit_heal_event(ctx: FailureContext, result: Dict, healed: bool):
+    """
+    Queues the heal's event; a no-op unless events are enabled and
+    ``setup_logging`` was given an events file.
+    """
+    if not events_enabled() or not events_logger.handlers:
+        return
+    if not events_logger.isEnabledFor(logging.INFO):
+        return
+    events_logger.info("heal event", extra={"event": heal_event(ctx, result, healed)})
@@ -0,0 +1,488 @@
+"""
+Heal history store.
+
+Every heal outcome is appended to an indexed SQLite database so that the
+selectors, tests and pages costing the most heal time can be found across
+runs. Writes go through a background thread; the test thread only builds a
+row and enqueues it.
+
+Query it with:
+
+    python -m adapter.selfheal.heal_history hotspots --by selector
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from adapter.selfheal.collector import ARTIFACT_DIR
+from adapter.selfheal.models import as_core
+from rule_engine.models import FailureContext
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = ARTIFACT_DIR / "heal_history.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS heals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at REAL NOT NULL,
+    failure_id TEXT NOT NULL,
+    test_name TEXT,
+    test_type TEXT,
+    tool TEXT,
+    environment TEXT,
+    component TEXT,
+    page_url TEXT,
+    failure_type TEXT,
+    error_type TEXT,
+    original_locator TEXT,
+    rule_id TEXT,
+    decision TEXT,
+    candidate_sources TEXT,
+    candidate_count INTEGER,
+    validated_count INTEGER,
+    unique_count INTEGER,
+    healed_locator TEXT,
+    locator_rank REAL,
+    confidence REAL,
+    healed INTEGER NOT NULL,
+    llm_used INTEGER NOT NULL,
+    total_ms REAL,
+    stage_ms TEXT,
+    llm_circuit TEXT,
+    test_outcome TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_heals_locator ON heals (original_locator);
+CREATE INDEX IF NOT EXISTS idx_heals_test ON heals (test_name);
+CREATE INDEX IF NOT EXISTS idx_heals_page ON heals (page_url);
+CREATE INDEX IF NOT EXISTS idx_heals_recorded ON heals (recorded_at);
+
+CREATE TABLE IF NOT EXISTS heal_candidates (
+    failure_id TEXT NOT NULL,
+    locator TEXT NOT NULL,
+    strategy TEXT,
+    role TEXT,
+    name TEXT,
+    landmark TEXT,
+    exact INTEGER,
+    source TEXT,
+    confidence REAL,
+    rank REAL,
+    match_count INTEGER,
+    is_unique INTEGER,
+    chosen INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_failure ON heal_candidates (failure_id);
+"""
+
+HEAL_COLUMNS = (
+    "recorded_at",
+    "failure_id",
+    "test_name",
+    "test_type",
+    "tool",
+    "environment",
+    "component",
+    "page_url",
+    "failure_type",
+    "error_type",
+    "original_locator",
+    "rule_id",
+    "decision",
+    "candidate_sources",
+    "candidate_count",
+    "validated_count",
+    "unique_count",
+    "healed_locator",
+    "locator_rank",
+    "confidence",
+    "healed",
+    "llm_used",
+    "total_ms",
+    "stage_ms",
+    "llm_circuit",
+)
+
+# Columns added after the tables were first released; older databases
+# are upgraded in place by migrate()
+ADDED_COLUMNS = {
+    "heals": {"llm_circuit": "TEXT", "test_outcome": "TEXT"},
+}
+
+CANDIDATE_COLUMNS = (
+    "failure_id",
+    "locator",
+    "strategy",
+    "role",
+    "name",
+    "landmark",
+    "exact",
+    "source",
+    "confidence",
+    "rank",
+    "match_count",
+    "is_unique",
+    "chosen",
+)
+
+HOTSPOT_COLUMNS = {
+    "selector": "original_locator",
+    "test": "test_name",
+    "page": "page_url",
+}
+
+
+def _locator_str(locator) -> Optional[str]:
+    if locator is None:
+        return None
+    try:
+        return locator.to_playwright()
+    except ValueError:
+        return f"{locator.strategy}={locator.value}"
+
+
+def build_rows(
+    ctx: FailureContext, result: Dict[str, Any], healed: bool
+) -> tuple[dict, list[dict]]:
+    """
+    Flatten a heal context and its orchestrator result into table rows.
+    Runs on the test thread, so it must stay cheap.
+    """
+    validations = result.get("validations") or []
+    healed_locator = result.get("healed_locator")
+    # Matched by expression, not identity: an equal copy of the validated
+    # locator is still the chosen one
+    chosen = as_core(healed_locator).canonical if healed_locator else None
+    sources = result.get("candidate_sources") or []
+    heal = {
+        "recorded_at": time.time(),
+        "failure_id": ctx.failure.id,
+        "test_name": ctx.test_name,
+        "test_type": ctx.test_type,
+        "tool": ctx.tool,
+        "environment": ctx.environment,
+        "component": ctx.component,
+        "page_url": ctx.url,
+        "failure_type": ctx.failure.type,
+        "error_type": ctx.failure.error.type,
+        "original_locator": _locator_str(ctx.failure.original_locator),
+        "rule_id": result.get("rule_id"),
+        "decision": result.get("decision"),
+        "candidate_sources": ",".join(sources),
+        "candidate_count": len(validations),
+        "validated_count": sum(1 for v in validations if v.error is None),
+        "unique_count": sum(1 for v in validations if v.is_unique),
+        "healed_locator": _locator_str(healed_locator),
+        "locator_rank": healed_locator.rank if healed_locator else None,
+        "confidence": healed_locator.confidence if healed_locator else None,
+        "healed": int(healed),
+        "llm_used": int(any(s.startswith("llm") for s in sources)),
+        "total_ms": round(ctx.timer.elapsed_ms(), 3),
+        "stage_ms": json.dumps(ctx.timer.as_dict()),
+        "llm_circuit": (result.get("llm_circuit") or {}).get("state"),
+    }
+    candidates = [
+        {
+            "failure_id": ctx.failure.id,
+            "locator": _locator_str(v.locator),
+            "strategy": v.locator.strategy,
+            "role": v.locator.role,
+            "name": v.locator.name,
+            "landmark": v.locator.landmark,
+            "exact": int(bool(v.locator.exact)),
+            "source": v.locator.source,
+            "confidence": v.locator.confidence,
+            "rank": v.locator_rank,
+            "match_count": v.count,
+            "is_unique": int(v.is_unique),
+            "chosen": int(as_core(v.locator).canonical == chosen),
+        }
+        for v in validations
+    ]
+    return heal, candidates
+
+
+@dataclass(frozen=True)
+class _Outcome:
+    test_name: str
+    outcome: str
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def migrate(conn: sqlite3.Connection):
+    for table, columns in ADDED_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, declaration in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+    conn.commit()
+
+
+class HealHistoryStore:
+    """
+    SQLite-backed heal history with a non-blocking background writer.
+    """
+
+    def __init__(self, path: Path = DEFAULT_DB_PATH, max_pending: int = 10_000):
+        self.path = Path(path)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._writer = threading.Thread(
+            target=self._run, name="heal-history-writer", daemon=True
+        )
+        self._closed = False
+        # Stops the writer after its current batch when the stop marker
+        # cannot be queued
+        self._stopping = threading.Event()
+        self._writer.start()
+
+    def record(self, ctx: FailureContext, result: Dict[str, Any], healed: bool):
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(build_rows(ctx, result, healed))
+        except queue.Full:
+            logger.warning("Heal history queue is full; dropping record")
+        except Exception:
+            logger.exception("Unable to build heal history record")
+
+    def record_outcome(self, test_name: str, outcome: str):
+        """
+        Records how a test ended on the heals it made; weight fitting labels
+        accepted heals by it.
+        """
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(_Outcome(test_name, outcome))
+        except queue.Full:
+            logger.warning("Heal history queue is full; dropping test outcome")
+
+    def flush(self, timeout: float = 10.0):
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self, timeout: float = 10.0):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning(
+                "Heal history queue is full at close; stopping after this batch"
+            )
+            self._stopping.set()
+        self._writer.join(timeout)
+
+    def _run(self):
+        conn = _connect(self.path)
+        conn.executescript(SCHEMA)
+        migrate(conn)
+        heal_sql = (
+            f"INSERT INTO heals ({', '.join(HEAL_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(HEAL_COLUMNS))})"
+        )
+        candidate_sql = (
+            f"INSERT INTO heal_candidates ({', '.join(CANDIDATE_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(CANDIDATE_COLUMNS))})"
+        )
+        outcome_sql = (
+            "UPDATE heals SET test_outcome = ? "
+            "WHERE test_name = ? AND test_outcome IS NULL"
+        )
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            # Drain whatever else is queued so bursts land in one transaction
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            heals, candidates, outcomes, waiters = [], [], [], []
+            for item in batch:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif isinstance(item, _Outcome):
+                    outcomes.append((item.outcome, item.test_name))
+                else:
+                    heal, cands = item
+                    heals.append(tuple(heal[c] for c in HEAL_COLUMNS))
+                    candidates.extend(
+                        tuple(c[col] for col in CANDIDATE_COLUMNS) for c in cands
+                    )
+            try:
+                with conn:
+                    conn.executemany(heal_sql, heals)
+                    conn.executemany(candidate_sql, candidates)
+                    # After the inserts, so a test's heals in this batch are
+                    # updated too
+                    conn.executemany(outcome_sql, outcomes)
+            except sqlite3.Error:
+                logger.exception("Failed to write heal history batch")
+            for waiter in waiters:
+                waiter.set()
+            if self._stopping.is_set():
+                stop = True
+        conn.close()
+
+
+_store: Optional[HealHistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def history_enabled() -> bool:
+    return os.getenv("HEALER_HISTORY", "1").lower() not in ("0", "false", "no")
+
+
+def get_history_store() -> Optional[HealHistoryStore]:
+    """
+    Returns the process-wide store, or None when history is disabled
+    (HEALER_HISTORY=0). HEALER_HISTORY_DB overrides the database path.
+    """
+    global _store
+    if not history_enabled():
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = HealHistoryStore(
+                Path(os.getenv("HEALER_HISTORY_DB", str(DEFAULT_DB_PATH)))
+            )
+            atexit.register(_store.close)
+        return _store
+
+
+def record_test_outcome(test_name: str, outcome: str):
+    """
+    Records a test's outcome on its heals. A process that has not healed
+    anything has no store and nothing to update.
+    """
+    with _store_lock:
+        store = _store
+    if store is not None:
+        store.record_outcome(test_name, outcome)
+
+
+def close_history_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+
+
+def query_hotspots(
+    db_path: Path,
+    by: str = "selector",
+    order: str = "total",
+    limit: int = 20,
+    since_days: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Rank selectors, tests or pages by total heal time or LLM-fallback rate.
+    """
+    column = HOTSPOT_COLUMNS[by]
+    order_by = {
+        "total": "total_ms DESC",
+        "llm_rate": "llm_rate DESC, total_ms DESC",
+        "count": "heals DESC, total_ms DESC",
+    }[order]
+    where, params = "", []
+    if since_days is not None:
+        where = "WHERE recorded_at >= ?"
+        params.append(time.time() - since_days * 86400)
+    sql = f"""
+        SELECT {column} AS key,
+               COUNT(*) AS heals,
+               ROUND(SUM(total_ms), 1) AS total_ms,
+               ROUND(AVG(total_ms), 1) AS avg_ms,
+               ROUND(AVG(llm_used), 3) AS llm_rate,
+               ROUND(AVG(healed), 3) AS heal_rate
+        FROM heals
+        {where}
+        GROUP BY {column}
+        ORDER BY {order_by}
+        LIMIT ?
+    """
+    params.append(limit)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def _print_table(rows: List[Dict[str, Any]]):
+    if not rows:
+        print("No heals recorded.")
+        return
+    headers = list(rows[0].keys())
+    widths = {
+        h: max(len(h), *(len(str(r[h])) for r in rows)) for h in headers
+    }
+    widths["key"] = min(widths["key"], 80)
+    print("  ".join(h.ljust(widths[h]) for h in headers))
+    for row in rows:
+        print(
+            "  ".join(str(row[h])[: widths[h]].ljust(widths[h]) for h in headers)
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Query the heal history store")
+    parser.add_argument(
+        "--db",
+        default=os.getenv("HEALER_HISTORY_DB", str(DEFAULT_DB_PATH)),
+        help="Path to the heal history database",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    hotspots = sub.add_parser(
+        "hotspots", help="Rank selectors, tests or pages by heal cost"
+    )
+    hotspots.add_argument("--by", choices=sorted(HOTSPOT_COLUMNS), default="selector")
+    hotspots.add_argument(
+        "--order", choices=["total", "llm_rate", "count"], default="total"
+    )
+    hotspots.add_argument("--limit", type=int, default=20)
+    hotspots.add_argument("--since-days", type=float, default=None)
+    hotspots.add_argument("--json", action="store_true", help="Print JSON rows")
+    args = parser.parse_args(argv)
+
+    rows = query_hotspots(
+        Path(args.db),
+        by=args.by,
+        order=args.order,
+        limit=args.limit,
+        since_days=args.since_days,
+    )
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        _print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
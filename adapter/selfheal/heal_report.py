@@ -0,0 +1,389 @@
+"""
+End-of-session heal report.
+
+Every heal of the session is recorded with its test, the original and the
+healed locator, rank, confidence, candidate source, rule decision and
+per-stage durations, and whether the locator was applied or only
+suggested for manual review. Workers publish their heals to the shared
+state as they happen; at session end the controller writes them, grouped
+by test and with session totals, to ``test_artifacts/heal_report.json``
+and a static ``test_artifacts/heal_report.html``.
+"""
+
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import html
+import json
+import logging
+import os
+import threading
+import time
+
+from adapter.selfheal.artifact_store import ARTIFACT_DIR
+from adapter.selfheal.heal_events import heal_event
+from adapter.selfheal.shared_state import shared_state, xdist_worker
+from rule_engine.models import FailureContext
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "heal_report"
+REPORT_JSON = ARTIFACT_DIR / "heal_report.json"
+REPORT_HTML = ARTIFACT_DIR / "heal_report.html"
+ENTRY_TTL_S = 86400
+
+# Heal event fields kept per heal
+FIELDS = (
+    "failure_id",
+    "ts",
+    "test",
+    "url",
+    "failure_type",
+    "original_locator",
+    "healed_locator",
+    "rank",
+    "confidence",
+    "source",
+    "candidate_sources",
+    "decision",
+    "rule_id",
+    "transform_strategy",
+    "coalesced",
+    "escalated",
+    "heal_ms",
+    "timings_ms",
+)
+
+
+def report_enabled() -> bool:
+    return os.getenv("HEALER_REPORT", "1").lower() not in ("0", "false", "no")
+
+
+def heal_status(result: Dict, healed: bool) -> str:
+    """
+    ``healed`` when the test went on with the healed locator, ``suggested``
+    when a unique candidate needs manual review, ``blocked`` when the rules
+    did not allow a heal and ``not_found`` otherwise.
+    """
+    if healed:
+        return "healed"
+    if result.get("decision") not in ("ALLOW", "TRANSFORM"):
+        return "blocked"
+    if result.get("healed_locator") is not None:
+        return "suggested"
+    return "not_found"
+
+
+class HealReport:
+    """
+    The heals of this process, mirrored into the shared state so that the
+    controller sees the heals of every xdist worker.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, ctx: FailureContext, result: Dict, healed: bool):
+        if not report_enabled():
+            return
+        try:
+            event = heal_event(ctx, result, healed)
+        except Exception:
+            logger.exception("Unable to build heal report entry")
+            return
+        entry = {field: event.get(field) for field in FIELDS}
+        entry["status"] = heal_status(result, healed)
+        entry["worker"] = xdist_worker() or "main"
+        with self._lock:
+            self._entries[ctx.failure.id] = entry
+        shared_state.put(
+            NAMESPACE, ctx.failure.id, json.dumps(entry, default=str), ENTRY_TTL_S
+        )
+
+    def entries(self) -> List[dict]:
+        """
+        The session's heals from every worker, by test and time.
+        """
+        collected = {}
+        for failure_id, raw in shared_state.values(NAMESPACE).items():
+            try:
+                collected[failure_id] = json.loads(raw)
+            except ValueError:
+                logger.warning("Skipping unreadable heal report entry %s", failure_id)
+        with self._lock:
+            collected.update(self._entries)
+        return sorted(collected.values(), key=lambda e: (e["test"] or "", e["ts"]))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        shared_state.clear(NAMESPACE)
+
+
+heal_report = HealReport()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def used_llm(entry: dict) -> bool:
+    """
+    Whether an LLM tier proposed a candidate for the heal. An LLM timing
+    alone does not tell: the source is timed even when the circuit was
+    open or it was cancelled before calling a model.
+    """
+    sources = [entry["source"] or "", *(entry["candidate_sources"] or [])]
+    return any(source.startswith("llm") for source in sources)
+
+
+def summarize(entries: List[dict], wall_ms: Optional[float]) -> Dict[str, Any]:
+    heal_ms = [e["heal_ms"] or 0.0 for e in entries]
+    total_ms = sum(heal_ms)
+    stage_ms: Dict[str, float] = {}
+    for entry in entries:
+        for stage, ms in (entry["timings_ms"] or {}).items():
+            stage_ms[stage] = stage_ms.get(stage, 0.0) + ms
+    return {
+        "heals": len(entries),
+        "tests_with_heals": len({e["test"] for e in entries}),
+        "workers": len({e["worker"] for e in entries}),
+        "by_status": dict(Counter(e["status"] for e in entries)),
+        "by_source": dict(
+            Counter(e["source"] for e in entries if e["source"] is not None)
+        ),
+        "by_rule": dict(Counter(e["rule_id"] or "none" for e in entries)),
+        "llm_heals": sum(1 for e in entries if used_llm(e)),
+        "coalesced": sum(1 for e in entries if e["coalesced"]),
+        "suite_wall_ms": round(wall_ms, 1) if wall_ms is not None else None,
+        "heal_ms": {
+            "total": round(total_ms, 1),
+            "avg": round(total_ms / len(entries), 1) if entries else 0.0,
+            "p95": round(_percentile(heal_ms, 95), 1),
+            "max": round(max(heal_ms, default=0.0), 1),
+        },
+        # Summed over workers, so above 100 when xdist workers heal at once
+        "heal_pct_of_wall": round(100 * total_ms / wall_ms, 2) if wall_ms else None,
+        "stage_ms": {
+            stage: round(ms, 1)
+            for stage, ms in sorted(stage_ms.items(), key=lambda kv: -kv[1])
+        },
+    }
+
+
+def build_report(
+    entries: List[dict],
+    wall_ms: Optional[float] = None,
+    outcomes: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    The report of ``entries``: session totals and the heals of each test
+    with its outcome (``outcomes`` by pytest node id).
+    """
+    outcomes = outcomes or {}
+    tests: Dict[str, List[dict]] = {}
+    for entry in entries:
+        tests.setdefault(entry["test"] or "", []).append(entry)
+    return {
+        "generated_at": time.time(),
+        "summary": summarize(entries, wall_ms),
+        "tests": [
+            {
+                "test": test,
+                "outcome": outcomes.get(test),
+                "heal_ms": round(sum(e["heal_ms"] or 0.0 for e in heals), 1),
+                "heals": heals,
+            }
+            for test, heals in tests.items()
+        ],
+    }
+
+
+STATUS_LABELS = {
+    "healed": "Healed",
+    "suggested": "Manual review required",
+    "blocked": "Blocked by rules",
+    "not_found": "No candidate",
+}
+
+STYLE = """
+body { font-family: sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; margin-bottom: 2em; }
+th, td { border: 1px solid #ccc; padding: 4px 8px; text-align: left;
+         vertical-align: top; font-size: 13px; }
+th { background: #f3f3f3; }
+code { font-size: 12px; word-break: break-all; }
+.healed { background: #e8f6e8; }
+.suggested { background: #fff6d6; }
+.blocked, .not_found { background: #fbe9e9; }
+"""
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return "<td></td>"
+    return f"<td>{html.escape(str(value))}</td>"
+
+
+def _code(value: Optional[str]) -> str:
+    if not value:
+        return "<td></td>"
+    return f"<td><code>{html.escape(value)}</code></td>"
+
+
+def _table(headers: List[str], rows: List[str]) -> str:
+    head = "".join(f"<th>{html.escape(h)}</th>" for h in headers)
+    return f"<table><tr>{head}</tr>{''.join(rows)}</table>"
+
+
+def render_html(report: Dict[str, Any]) -> str:
+    summary = report["summary"]
+    totals = [
+        ("Heals", summary["heals"]),
+        ("Tests with heals", summary["tests_with_heals"]),
+        ("Suite wall time (ms)", summary["suite_wall_ms"]),
+        ("Heal time (ms)", summary["heal_ms"]["total"]),
+        ("Heal time, % of wall time", summary["heal_pct_of_wall"]),
+        (
+            "Heal avg / p95 / max (ms)",
+            "{avg} / {p95} / {max}".format(**summary["heal_ms"]),
+        ),
+        ("Heals using the LLM", summary["llm_heals"]),
+        ("Coalesced heals", summary["coalesced"]),
+    ]
+    totals += [
+        (STATUS_LABELS.get(status, status), count)
+        for status, count in sorted(summary["by_status"].items())
+    ]
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
+        "<title>Heal report</title>",
+        f"<style>{STYLE}</style></head><body>",
+        "<h1>Heal report</h1>",
+        _table(
+            ["Total", "Value"],
+            [f"<tr>{_cell(name)}{_cell(value)}</tr>" for name, value in totals],
+        ),
+        "<h2>Time by stage</h2>",
+        _table(
+            ["Stage", "Total ms"],
+            [
+                f"<tr>{_cell(stage)}{_cell(ms)}</tr>"
+                for stage, ms in summary["stage_ms"].items()
+            ],
+        ),
+        "<h2>Heals by test</h2>",
+    ]
+    rows = []
+    for test in report["tests"]:
+        for heal in test["heals"]:
+            stages = ", ".join(
+                f"{stage} {ms:.0f}" for stage, ms in (heal["timings_ms"] or {}).items()
+            )
+            rows.append(
+                f"<tr class='{html.escape(heal['status'])}'>"
+                f"{_cell(test['test'])}{_cell(test['outcome'])}"
+                f"{_cell(STATUS_LABELS.get(heal['status'], heal['status']))}"
+                f"{_code(heal['original_locator'])}{_code(heal['healed_locator'])}"
+                f"{_cell(heal['rank'])}{_cell(heal['confidence'])}"
+                f"{_cell(heal['source'])}{_cell(heal['decision'])}"
+                f"{_cell(heal['rule_id'])}{_cell(heal['heal_ms'])}{_cell(stages)}"
+                "</tr>"
+            )
+    parts.append(
+        _table(
+            [
+                "Test",
+                "Outcome",
+                "Status",
+                "Original locator",
+                "Healed locator",
+                "Rank",
+                "Confidence",
+                "Source",
+                "Decision",
+                "Rule",
+                "Heal ms",
+                "Stages (ms)",
+            ],
+            rows,
+        )
+    )
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def write_report(
+    report: Dict[str, Any],
+    json_path: Path = REPORT_JSON,
+    html_path: Path = REPORT_HTML,
+):
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    json_path.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+    html_path.write_text(render_html(report), encoding="utf-8")
+
+
+class HealReportPlugin:
+    """
+    Pytest plugin, registered by the root conftest. In the controller (or
+    a run without xdist) it times the session, keeps each test's outcome
+    and writes the report at session end if anything was healed.
+    """
+
+    def __init__(self):
+        self.started: Optional[float] = None
+        self.outcomes: Dict[str, str] = {}
+
+    @staticmethod
+    def _is_controller(config) -> bool:
+        return not hasattr(config, "workerinput")
+
+    def pytest_configure(self, config):
+        if self._is_controller(config):
+            # Runs before xdist starts the workers
+            heal_report.clear()
+            shared_state.flush()
+
+    def pytest_sessionstart(self, session):
+        self.started = time.perf_counter()
+
+    def pytest_runtest_logreport(self, report):
+        if report.failed:
+            self.outcomes[report.nodeid] = (
+                "failed" if report.when == "call" else "error"
+            )
+        elif report.when == "call" or report.skipped:
+            self.outcomes.setdefault(report.nodeid, report.outcome)
+
+    def pytest_sessionfinish(self, session):
+        if not report_enabled() or not self._is_controller(session.config):
+            return
+        wall_ms = None
+        if self.started is not None:
+            wall_ms = (time.perf_counter() - self.started) * 1000
+        shared_state.flush()
+        entries = heal_report.entries()
+        if not entries:
+            # Nothing healed; don't leave an empty report behind
+            logger.debug("No heals this session; heal report not written")
+            return
+        report = build_report(entries, wall_ms, self.outcomes)
+        try:
+            write_report(report)
+        except OSError as e:
+            logger.warning("Unable to write the heal report: %s", e)
+            return
+        summary = report["summary"]
+        logger.info(
+            "Heal report: %s heals (%s), %s ms healing (%s%% of wall time) -> %s",
+            summary["heals"],
+            summary["by_status"],
+            summary["heal_ms"]["total"],
+            summary["heal_pct_of_wall"],
+            REPORT_HTML,
+        )
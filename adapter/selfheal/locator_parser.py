@@ -0,0 +1,297 @@
+"""
+Parser for Playwright locator expressions.
+
+One tokenizer and a small recursive-descent parser handle every place a
+locator arrives as text: the "waiting for ..." line of a Playwright error
+and each candidate in an LLM answer. Chains (``locator("form")
+.get_by_role("button", name="Save")``, ``.nth(1)``, ``.first``,
+``.filter(has_text="x")``) and both quote styles are supported.
+
+    chain := NAME [call] ("." NAME [call])*
+    call  := "(" [arg ("," arg)* [","]] ")"
+    arg   := [NAME "="] value
+    value := STRING | NUMBER | True | False | None | chain
+
+Parsed chains are immutable and memoized by input string.
+"""
+
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+import re
+
+from adapter.selfheal.models import LocatorDescriptor, LocatorStep
+
+TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<string>[rRuU]?(?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'))
+      | (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<name>[A-Za-z_]\w*)
+      | (?P<punct>[().,=])
+    )""",
+    re.VERBOSE | re.DOTALL,
+)
+
+# LLMs are told to keep single quotes inside single-quoted selectors
+# ('//button[@type='submit']'); such a string runs to the last matching
+# quote that is followed by "," or ")"
+LENIENT_STRING_RE = re.compile(r"""(['"])(.*?)\1(?=\s*[,)])""", re.DOTALL)
+
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r"}
+ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+
+CONSTANTS = {"True": True, "False": False, "None": None}
+
+# Where a locator expression starts in a Playwright error message
+ERROR_EXPRESSION_RE = re.compile(
+    r"(?:waiting for|strict mode violation:)\s+",
+    re.IGNORECASE,
+)
+
+TARGET_METHODS = {
+    "get_by_role": "role",
+    "get_by_text": "text",
+    "get_by_label": "label",
+    "get_by_placeholder": "placeholder",
+    "get_by_test_id": "test_id",
+    "locator": None,  # css or xpath, inferred from the selector
+}
+SCOPE_METHODS = {"frame_locator", "content_frame"}
+MODIFIER_METHODS = {"first", "last", "nth", "filter", "and_"}
+
+# Keyword arguments a descriptor holds without keeping the chain
+DESCRIPTOR_KWARGS = {"role": {"name", "exact"}, "text": {"exact"}}
+
+
+class LocatorSyntaxError(ValueError):
+    pass
+
+
+class _Parser:
+    def __init__(self, text: str, pos: int = 0):
+        self.text = text
+        self.pos = pos
+        self._token: Optional[Tuple[str, str, int, int]] = None
+
+    def peek(self) -> Optional[Tuple[str, str, int, int]]:
+        """
+        The next token as (kind, text, start, end), or None at the end of
+        the input or at a character no token starts with.
+        """
+        if self._token is None:
+            m = TOKEN_RE.match(self.text, self.pos)
+            if m is None or m.lastgroup is None:
+                return None
+            self._token = (
+                m.lastgroup,
+                m.group(m.lastgroup),
+                m.start(m.lastgroup),
+                m.end(),
+            )
+        return self._token
+
+    def advance(self) -> Tuple[str, str, int, int]:
+        token = self.peek()
+        if token is None:
+            raise LocatorSyntaxError(f"Unexpected input at {self.pos}: {self.text!r}")
+        self.pos = token[3]
+        self._token = None
+        return token
+
+    def at(self, kind: str, text: Optional[str] = None) -> bool:
+        token = self.peek()
+        return (
+            token is not None
+            and token[0] == kind
+            and (text is None or token[1] == text)
+        )
+
+    def expect(
+        self, kind: str, text: Optional[str] = None
+    ) -> Tuple[str, str, int, int]:
+        if not self.at(kind, text):
+            raise LocatorSyntaxError(
+                f"Expected {text or kind} at {self.pos}: {self.text!r}"
+            )
+        return self.advance()
+
+    def seek(self, pos: int):
+        self.pos = pos
+        self._token = None
+
+    def chain(self) -> Tuple[LocatorStep, ...]:
+        steps = [self.step()]
+        while self.at("punct", "."):
+            # A trailing "." ends the expression (e.g. end of a sentence)
+            after = _Parser(self.text, self.peek()[3])
+            if not after.at("name"):
+                break
+            self.advance()
+            steps.append(self.step())
+        return tuple(steps)
+
+    def step(self) -> LocatorStep:
+        method = self.expect("name")[1]
+        if not self.at("punct", "("):
+            return LocatorStep(method=method, call=False)
+        self.advance()
+        args, kwargs = [], []
+        while not self.at("punct", ")"):
+            token = self.peek()
+            if token is not None and token[0] == "name":
+                after = _Parser(self.text, token[3])
+                if after.at("punct", "="):
+                    self.advance()
+                    self.advance()
+                    kwargs.append((token[1], self.value()))
+                else:
+                    args.append(self.value())
+            else:
+                args.append(self.value())
+            if not self.at("punct", ","):
+                break
+            self.advance()
+        self.expect("punct", ")")
+        return LocatorStep(method=method, args=tuple(args), kwargs=tuple(kwargs))
+
+    def value(self) -> Any:
+        token = self.peek()
+        if token is None:
+            raise LocatorSyntaxError(f"Expected a value at {self.pos}: {self.text!r}")
+        kind, text, start, end = token
+        if kind == "string":
+            self.advance()
+            if not (self.at("punct", ",") or self.at("punct", ")")):
+                return self._lenient_string(start)
+            return _unquote(text)
+        if kind == "number":
+            self.advance()
+            return float(text) if "." in text else int(text)
+        if kind == "name" and text in CONSTANTS:
+            self.advance()
+            return CONSTANTS[text]
+        if kind == "name":
+            nested = self.chain()
+            if nested[0].method != "page" and nested[0].method not in TARGET_METHODS:
+                raise LocatorSyntaxError(f"Unsupported value {text!r} at {start}")
+            return _strip_page(nested)
+        raise LocatorSyntaxError(f"Unexpected {text!r} at {start}: {self.text!r}")
+
+    def _lenient_string(self, start: int) -> str:
+        while self.text[start] not in "'\"":
+            start += 1  # skip a string prefix
+        m = LENIENT_STRING_RE.match(self.text, start)
+        if m is None:
+            raise LocatorSyntaxError(f"Unterminated string at {start}: {self.text!r}")
+        self.seek(m.end())
+        return m.group(2)
+
+
+def _unquote(token: str) -> str:
+    raw = token[0] in "rR"
+    if token[0] not in "'\"":
+        token = token[1:]
+    body = token[1:-1]
+    if raw:
+        return body
+    return ESCAPE_RE.sub(lambda m: ESCAPES.get(m.group(1), m.group(1)), body)
+
+
+@lru_cache(maxsize=4096)
+def parse_chain(code: str) -> Tuple[LocatorStep, ...]:
+    """
+    Parses a whole locator expression; a leading ``page.`` is dropped.
+    """
+    parser = _Parser(code)
+    steps = parser.chain()
+    if parser.peek() is not None or parser.text[parser.pos :].strip():
+        raise LocatorSyntaxError(f"Unexpected trailing input: {code!r}")
+    return _strip_page(steps)
+
+
+@lru_cache(maxsize=1024)
+def parse_error_chain(message: str) -> Optional[Tuple[LocatorStep, ...]]:
+    """
+    The locator chain an error message says Playwright was waiting for (or
+    found ambiguous), or None.
+    """
+    for m in ERROR_EXPRESSION_RE.finditer(message):
+        try:
+            steps = _strip_page(_Parser(message, m.end()).chain())
+        except LocatorSyntaxError:
+            continue
+        # Prose may follow the expression ('locator("#a"). Retrying')
+        known = TARGET_METHODS.keys() | SCOPE_METHODS | MODIFIER_METHODS
+        for i, step in enumerate(steps):
+            if step.method not in known:
+                steps = steps[:i]
+                break
+        if steps and any(step.method in TARGET_METHODS for step in steps):
+            return steps
+    return None
+
+
+def _strip_page(steps: Tuple[LocatorStep, ...]) -> Tuple[LocatorStep, ...]:
+    if steps and steps[0].method == "page" and not steps[0].call:
+        return steps[1:]
+    return steps
+
+
+def infer_locator_strategy(selector: str) -> str:
+    selector = selector.strip()
+
+    if selector.startswith("/") or selector.startswith("("):
+        return "xpath"
+
+    return "css"
+
+
+def descriptor_from_chain(steps: Tuple[LocatorStep, ...]) -> LocatorDescriptor:
+    """
+    Builds a descriptor for the chain's target, i.e. its last locator
+    call; the chain itself is kept when anything scopes or modifies it.
+    """
+    target_index = None
+    for i, step in enumerate(steps):
+        if step.method in TARGET_METHODS and step.call:
+            target_index = i
+        elif step.method not in SCOPE_METHODS | MODIFIER_METHODS:
+            raise LocatorSyntaxError(f"Unsupported locator method: {step.method}")
+    if target_index is None:
+        raise LocatorSyntaxError("Expression has no locator call")
+
+    target = steps[target_index]
+    if not target.args or not isinstance(target.args[0], str):
+        raise LocatorSyntaxError(f"Unsupported {target.method} argument: {target.args}")
+    kwargs = dict(target.kwargs)
+    strategy = TARGET_METHODS[target.method] or infer_locator_strategy(target.args[0])
+
+    fields = {"strategy": strategy, "value": target.args[0]}
+    if strategy == "role":
+        name = kwargs.get("name")
+        if name is not None and not isinstance(name, str):
+            raise LocatorSyntaxError(f"Unsupported role name: {name!r}")
+        fields.update(role=target.args[0], name=name or "", value=name or "")
+    if "exact" in kwargs:
+        fields["exact"] = bool(kwargs["exact"])
+
+    kept = DESCRIPTOR_KWARGS.get(strategy, set())
+    if len(steps) > 1 or set(kwargs) - kept:
+        fields["chain"] = steps
+    return LocatorDescriptor(**fields)
+
+
+def parse_playwright_locator(code: str) -> LocatorDescriptor:
+    return descriptor_from_chain(parse_chain(code.strip()))
+
+
+def parse_playwright_error(message: str) -> Optional[LocatorDescriptor]:
+    """
+    Extract the locator from a Playwright timeout or strict-mode message.
+    """
+    steps = parse_error_chain(message)
+    if steps is None:
+        return None
+    try:
+        return descriptor_from_chain(steps)
+    except LocatorSyntaxError:
+        return None
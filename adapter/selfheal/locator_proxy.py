@@ -1,12 +1,21 @@
+from typing import Optional
 from playwright.sync_api import Locator
+from adapter.selfheal.baseline import baseline_enabled, baselines, call_expression
 from adapter.selfheal.healer_interface import ILocatorHealer
 
 
 class HealingLocatorProxy:
-    def __init__(self, locator: Locator, healer: ILocatorHealer):
+    def __init__(
+        self,
+        locator: Locator,
+        healer: ILocatorHealer,
+        call: Optional[tuple] = None,
+    ):
         self._locator = locator
         self._page = locator.page
         self._healer = healer
+        # (method, args, kwargs) the locator was built with, for baselines
+        self._call = call
 
     def click(self, **kwargs):
         return self._execute("click", **kwargs)
@@ -16,10 +25,13 @@ class HealingLocatorProxy:
 
     def _execute(self, action, *args, **kwargs):
         try:
-            return getattr(self._locator, action)(*args, **kwargs)
+            result = getattr(self._locator, action)(*args, **kwargs)
         except Exception as e:
             healed = self._healer.heal(
                 page=self._page,
                 exception=e,
             )
             return getattr(healed, action)(*args, **kwargs)
+        if self._call is not None and baseline_enabled():
+            baselines.record(self._page, self._locator, call_expression(*self._call))
+        return result
@@ -1,4 +1,8 @@
-from adapter.selfheal.models import LocatorDescriptor
+from typing import Callable, Dict, List, Optional, Tuple
+from adapter.selfheal.fuzzy_matcher import FuzzyCandidateGenerator
+from adapter.selfheal.locator_parser import parse_chain
+from adapter.selfheal.models import CoreLocator, LocatorDescriptor, LocatorStep, as_core
+from adapter.selfheal.selector_hints import hints_for
 from adapter.selfheal.snapshot_helper import find_elements_by_text
 import re
 from adapter.selfheal.roles import ARIA_ROLES
@@ -6,27 +10,40 @@ from adapter.selfheal.roles import ARIA_ROLES
 
 class LocatorTransformer:
 
+    def __init__(self, fuzzy: FuzzyCandidateGenerator | None = None):
+        self.fuzzy = fuzzy or FuzzyCandidateGenerator()
+
     def transform(
         self, *, original: LocatorDescriptor, snapshot: list
-    ) -> list[LocatorDescriptor] | None:
+    ) -> list[CoreLocator] | None:
         """
         Returns a refined locator or None if deterministic narrowing fails
         """
-        matches = find_elements_by_text(snapshot, original.value)
-
-        # 1️⃣ Upgrade to ROLE if possible
-        role_locators = self._to_role(matches)
-        if role_locators:
-            return role_locators
-        # 2️⃣ Next upgrade to text if possible
-        text_locators = self._to_text(matches)
-        if text_locators:
-            return text_locators
-
-        # 3️⃣ Add landmark scope
-        scoped_locators = self._add_parent_scope(matches, original)
-        if scoped_locators:
-            return scoped_locators
+        if original is None:
+            return None
+
+        # Raw selectors never appear verbatim in the snapshot
+        if original.strategy not in ("css", "xpath"):
+            matches = find_elements_by_text(snapshot, original.value)
+
+            # 1️⃣ Upgrade to ROLE if possible
+            role_locators = self._to_role(matches)
+            if role_locators:
+                return role_locators
+            # 2️⃣ Next upgrade to text if possible
+            text_locators = self._to_text(matches)
+            if text_locators:
+                return text_locators
+
+            # 3️⃣ Add landmark scope
+            scoped_locator = self._add_parent_scope(matches, original)
+            if scoped_locator:
+                return [scoped_locator]
+
+        # 4️⃣ Fuzzy match selector hints against snapshot names
+        fuzzy_locators = self.fuzzy.generate(snapshot, hints_for(original))
+        if fuzzy_locators:
+            return fuzzy_locators
 
         # No safe narrowing possible → escalate
         return None
@@ -40,58 +57,153 @@ class LocatorTransformer:
 
         return match.group("role"), match.group("name")
 
-    def _to_role(self, matches) -> list[LocatorDescriptor] | None:
-        roles: list[LocatorDescriptor] = []
+    def _to_role(self, matches) -> list[CoreLocator] | None:
+        roles: list[CoreLocator] = []
         for text, root_parent, curr_parent in matches:
-            loc: LocatorDescriptor = None
             (role, role_name) = self.extract_role_and_name(text)
             if role in ARIA_ROLES:
-                loc = LocatorDescriptor(
+                loc = CoreLocator(
                     strategy="role",
                     value=role_name,
                     role=role,
                     name=role_name,
+                    exact=True,
                     landmark=root_parent.partition(" ")[0],
                     scope=curr_parent.partition(" ")[0],
+                    source="transformer",
                 )
-                loc.exact = True
                 roles.append(loc)
         return roles
 
-    def _to_text(self, matches) -> list[LocatorDescriptor] | None:
-        texts: list[LocatorDescriptor] = []
+    def _to_text(self, matches) -> list[CoreLocator] | None:
+        texts: list[CoreLocator] = []
         for text, root_parent, curr_parent in matches:
-            loc: LocatorDescriptor = None
             if curr_parent == "text":
-                loc = LocatorDescriptor(
+                loc = CoreLocator(
                     strategy="text",
                     value=text,
                     role=None,
                     name=None,
+                    exact=True,
                     landmark=root_parent.partition(" ")[0],
                     scope=curr_parent.partition(" ")[0],
+                    source="transformer",
                 )
-                loc.exact = True
                 texts.append(loc)
         return texts
 
     def _add_parent_scope(
         self, matches, locator: LocatorDescriptor
-    ) -> LocatorDescriptor | None:
+    ) -> CoreLocator | None:
 
         parents = set(
             parent.partition(" ")[0]
             for _, parent, scope in matches
             if parent and scope in ARIA_ROLES
         )
-        if len(parents) == 1:
+        if len(parents) == 1 and locator.role:
             parent = parents.pop()
 
-            return LocatorDescriptor(
+            return CoreLocator(
                 strategy="scoped_role",
                 value=locator.role,
                 name=locator.name,
                 landmark=parent,
+                source="transformer",
             )
 
         return None
+
+    # --- Narrowing of ambiguous locators (strict-mode violations) ---
+
+    def narrow(
+        self,
+        *,
+        original: LocatorDescriptor,
+        matches: List[dict],
+        order: List[str],
+        confidence: float = 0.0,
+    ) -> List[Tuple[str, CoreLocator]]:
+        """
+        Narrowings of ``original`` that keep exactly one of its ``matches``,
+        as (strategy, locator) in the rule's ``order``. ``matches`` are the
+        facts collected in-page for every element the original matched
+        (role, accessible name, visibility and role-bearing ancestors), so
+        each narrowing is counted without another browser round trip.
+        Visible matches are preferred as the element to keep.
+        """
+        if original is None or len(matches) < 2:
+            return []
+        original = as_core(original)
+        targets = sorted(matches, key=lambda m: (not m.get("visible"), m["index"]))
+        narrowed: List[Tuple[str, CoreLocator]] = []
+        seen = set()
+        for name in order:
+            strategy = self.NARROWING_STRATEGIES.get(name)
+            if strategy is None:
+                continue
+            for target in targets:
+                loc = strategy(self, original, target, matches)
+                if loc is None or loc.canonical in seen:
+                    continue
+                seen.add(loc.canonical)
+                narrowed.append(
+                    (name, loc.replace(confidence=confidence, source="narrow"))
+                )
+        return narrowed
+
+    @staticmethod
+    def _chain_of(loc: CoreLocator) -> Tuple[LocatorStep, ...]:
+        return loc.chain or parse_chain(loc.to_playwright())
+
+    @staticmethod
+    def _role_step(role: str, name: Optional[str]) -> LocatorStep:
+        kwargs = (("name", name), ("exact", True)) if name else ()
+        return LocatorStep(method="get_by_role", args=(role,), kwargs=kwargs)
+
+    def _scoped(
+        self, original: CoreLocator, target: dict, matches: List[dict], landmark: bool
+    ) -> CoreLocator | None:
+        for ancestor in target["ancestors"]:
+            if bool(ancestor.get("landmark")) != landmark:
+                continue
+            scope = (ancestor["role"], ancestor.get("name") or "")
+            inside = sum(
+                any((a["role"], a.get("name") or "") == scope for a in m["ancestors"])
+                for m in matches
+            )
+            if inside == 1:
+                step = self._role_step(*scope)
+                chain = (step,) + self._chain_of(original)
+                return original.replace(chain=chain, landmark=scope[0])
+        return None
+
+    def _scope_by_role(self, original, target, matches) -> CoreLocator | None:
+        return self._scoped(original, target, matches, landmark=False)
+
+    def _parent_landmark(self, original, target, matches) -> CoreLocator | None:
+        return self._scoped(original, target, matches, landmark=True)
+
+    def _add_accessible_name(self, original, target, matches) -> CoreLocator | None:
+        role, name = target.get("role"), target.get("name")
+        if not role or not name:
+            return None
+        same = sum(m.get("role") == role and m.get("name") == name for m in matches)
+        if same != 1:
+            return None
+        if original.strategy == "role" and not original.chain:
+            return CoreLocator(
+                strategy="role", value=name, role=role, name=name, exact=True
+            )
+        # Keep the original selector and require the name as well
+        named = self._role_step(role, name)
+        chain = self._chain_of(original) + (
+            LocatorStep(method="and_", args=((named,),)),
+        )
+        return original.replace(chain=chain)
+
+    NARROWING_STRATEGIES: Dict[str, Callable] = {
+        "scope_by_role": _scope_by_role,
+        "add_accessible_name": _add_accessible_name,
+        "parent_landmark": _parent_landmark,
+    }
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
-from typing import Optional
-from pydantic import BaseModel
+from typing import Any, Dict, Optional, Tuple
+from pydantic import BaseModel, ConfigDict
 
 
 @dataclass
@@ -10,6 +10,56 @@ class ErrorInfo:
     message: str
 
 
+class LocatorStep(BaseModel):
+    """
+    One call (or property access, when ``call`` is False) in a locator
+    chain such as ``locator("form").get_by_role("button").nth(1)``.
+    Argument values are literals or, for e.g. ``filter(has=...)``, a
+    nested chain.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    method: str
+    args: Tuple[Any, ...] = ()
+    kwargs: Tuple[Tuple[str, Any], ...] = ()
+    call: bool = True
+
+    def render(self) -> str:
+        if not self.call:
+            return self.method
+        params = [render_value(v) for v in self.args]
+        params += [f"{k}={render_value(v)}" for k, v in self.kwargs]
+        return f"{self.method}({', '.join(params)})"
+
+
+def as_chain(value) -> Optional[Tuple[LocatorStep, ...]]:
+    """
+    The nested chain held by an argument value, or None for a literal.
+    Chains read back from JSON arrive as lists of dicts.
+    """
+    if isinstance(value, (list, tuple)) and value:
+        if all(isinstance(v, LocatorStep) for v in value):
+            return tuple(value)
+        if all(isinstance(v, dict) and "method" in v for v in value):
+            return tuple(LocatorStep.model_validate(v) for v in value)
+    return None
+
+
+def render_value(value) -> str:
+    chain = as_chain(value)
+    if chain is not None:
+        return render_chain(chain)
+    if isinstance(value, str):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{escaped}"'
+    return repr(value)
+
+
+def render_chain(chain: Tuple[LocatorStep, ...]) -> str:
+    return "page." + ".".join(step.render() for step in chain)
+
+
 class LocatorDescriptor(BaseModel):
     strategy: str  # text | role | css
     value: str  # "Submit", "button", etc
@@ -22,36 +72,238 @@ class LocatorDescriptor(BaseModel):
     options: Optional[str] = None
     rank: float = 0
     confidence: float = 0
+    source: Optional[str] = None  # transformer | fuzzy | dom_index | llm
+    # Full call chain when the expression is scoped or modified
+    # (locator("form").get_by_role(...), .nth(1), .filter(...)); the fields
+    # above then describe its target step
+    chain: Optional[Tuple[LocatorStep, ...]] = None
+
+    def to_playwright(self) -> str:
+        return render_locator(self)
+
+
+def render_locator(loc) -> str:
+    """
+    The Playwright expression for a LocatorDescriptor or CoreLocator.
+    """
+    if loc.chain:
+        return render_chain(loc.chain)
+
+    if loc.strategy == "text":
+        if loc.exact:
+            return f"page.get_by_text({render_value(loc.value)}, exact=True)"
+        return f"page.get_by_text({render_value(loc.value)})"
+
+    if loc.strategy == "label":
+        return f"page.get_by_label({render_value(loc.value)})"
+
+    if loc.strategy == "placeholder":
+        return f"page.get_by_placeholder({render_value(loc.value)})"
+
+    if loc.strategy == "test_id":
+        return f"page.get_by_test_id({render_value(loc.value)})"
+
+    if loc.strategy == "css" or loc.strategy == "xpath":
+        return f"page.locator({render_value(loc.value)})"
+
+    if loc.strategy == "role":
+        args = []
+        if loc.name:
+            args.append(f", name={render_value(loc.name)}")
+        if loc.exact:
+            args.append(f", exact={loc.exact}")
+        if loc.options:
+            args.append(loc.options)  # {", " if args else ""}
+        return f'page.get_by_role("{loc.role}"{"".join(args)})'
+
+    if loc.strategy == "scoped_role":
+        return (
+            f'page.get_by_role("{loc.landmark}")'
+            f'.get_by_role("{loc.value}", name="{loc.name}")'
+        )
+
+    raise ValueError("Unsupported locator strategy")
+
+
+CORE_FIELDS = (
+    "strategy",
+    "value",
+    "role",
+    "attributes",
+    "name",
+    "exact",
+    "landmark",
+    "scope",
+    "options",
+    "chain",
+    "rank",
+    "confidence",
+    "source",
+)
+FIELD_INDEX = {name: i for i, name in enumerate(CORE_FIELDS)}
+# Fields that do not change the rendered expression
+SCORE_FIELDS = {"rank", "confidence", "source"}
+_UNRENDERED = object()
+INTERN_LIMIT = 65536
+
+
+class CoreLocator:
+    """
+    Immutable, interned candidate locator for the heal pipeline.
+
+    Carries the same fields as LocatorDescriptor without pydantic
+    validation. Equal field values give the same instance, the hash is
+    computed at construction and the Playwright expression (``canonical``)
+    on first use, and changes go through ``replace``. Convert with ``from_descriptor`` /
+    ``to_descriptor`` where locators cross into serialized form.
+    """
+
+    # Field values live in ``_key``; each field is a read-only property
+    # over it (attached below the class), so construction fills three slots
+    __slots__ = ("_key", "_hash", "_expression")
+
+    # Bounded like the ``re`` module's cache: cleared when full, so
+    # interning never holds more than INTERN_LIMIT locators alive
+    _interned: Dict[tuple, "CoreLocator"] = {}
+
+    def __new__(
+        cls,
+        strategy: str,
+        value: str,
+        role: Optional[str] = None,
+        attributes: Optional[str] = None,
+        name: Optional[str] = None,
+        exact: Optional[bool] = False,
+        landmark: Optional[str] = None,
+        scope: Optional[str] = None,
+        options: Optional[str] = None,
+        chain: Optional[Tuple[LocatorStep, ...]] = None,
+        rank: float = 0.0,
+        confidence: float = 0.0,
+        source: Optional[str] = None,
+    ) -> "CoreLocator":
+        key = (
+            strategy,
+            value,
+            role,
+            attributes,
+            name,
+            bool(exact),
+            landmark,
+            scope,
+            options,
+            tuple(chain) if chain else None,
+            float(rank or 0),
+            float(confidence or 0),
+            source,
+        )
+        return cls._intern(key)
+
+    @classmethod
+    def _intern(cls, key: tuple, expression=_UNRENDERED) -> "CoreLocator":
+        interned = cls._interned.get(key)
+        if interned is not None:
+            return interned
+
+        self = object.__new__(cls)
+        init = object.__setattr__
+        init(self, "_key", key)
+        init(self, "_hash", hash(key))
+        init(self, "_expression", expression)
+        if len(cls._interned) >= INTERN_LIMIT:
+            cls._interned.clear()
+        # setdefault is atomic: racing threads agree on one instance
+        return cls._interned.setdefault(key, self)
+
+    def _render(self) -> Optional[str]:
+        expression = self._expression
+        if expression is _UNRENDERED:
+            try:
+                expression = render_locator(self)
+            except ValueError:
+                expression = None
+            object.__setattr__(self, "_expression", expression)
+        return expression
+
+    @property
+    def canonical(self) -> str:
+        """
+        The Playwright expression, or ``strategy=value`` for strategies
+        that have none; equal for candidates that locate the same way.
+        """
+        return self._render() or f"{self._key[0]}={self._key[1]}"
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"CoreLocator is immutable; use replace({name}=...)")
+
+    def __delattr__(self, name):
+        raise AttributeError("CoreLocator is immutable")
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, CoreLocator):
+            return NotImplemented
+        return self._hash == other._hash and self._key == other._key
+
+    def __reduce__(self):
+        return (CoreLocator, self._key)
+
+    def __repr__(self) -> str:
+        return (
+            f"CoreLocator({self.canonical!r}, rank={self.rank}, "
+            f"confidence={self.confidence}, source={self.source!r})"
+        )
+
+    def replace(self, **changes) -> "CoreLocator":
+        if changes.keys() <= SCORE_FIELDS:
+            # Re-ranking keeps the expression; skip re-rendering it
+            key = list(self._key)
+            for name, value in changes.items():
+                index = FIELD_INDEX[name]
+                key[index] = value if name == "source" else float(value or 0)
+            return CoreLocator._intern(tuple(key), self._expression)
+        fields = dict(zip(CORE_FIELDS, self._key))
+        fields.update(changes)
+        return CoreLocator(**fields)
 
     def to_playwright(self) -> str:
-        if self.strategy == "text":
-            return f'page.get_by_text("{self.value}")'
+        expression = self._render()
+        if expression is None:
+            raise ValueError("Unsupported locator strategy")
+        return expression
+
+    @classmethod
+    def from_descriptor(cls, d: "LocatorDescriptor", **changes) -> "CoreLocator":
+        if isinstance(d, CoreLocator):
+            return d.replace(**changes) if changes else d
+        fields = {name: getattr(d, name) for name in CORE_FIELDS}
+        fields.update(changes)
+        return cls(**fields)
+
+    def to_descriptor(self) -> "LocatorDescriptor":
+        return LocatorDescriptor(**{name: getattr(self, name) for name in CORE_FIELDS})
+
+
+def _field_property(index: int) -> property:
+    return property(lambda self: self._key[index])
 
-        if self.strategy == "css" or self.strategy == "xpath":
-            return f'page.locator("{self.value}")'
 
-        if self.strategy == "role":
-            args = []
-            if self.name:
-                args.append(f', name="{self.name}"')
-            if self.exact:
-                args.append(f", exact={self.exact}")
-            if self.options:
-                args.append(self.options)  # {", " if args else ""}
-            return f'page.get_by_role("{self.role}"{"".join(args)})'
+for _index, _field in enumerate(CORE_FIELDS):
+    setattr(CoreLocator, _field, _field_property(_index))
+del _index, _field
 
-        if self.strategy == "scoped_role":
-            return (
-                f'page.get_by_role("{self.landmark}")'
-                f'.get_by_role("{self.value}", name="{self.name}")'
-            )
 
-        raise ValueError("Unsupported locator strategy")
+def as_core(loc) -> CoreLocator:
+    return CoreLocator.from_descriptor(loc)
 
 
 @dataclass
 class ValidationResult:
-    locator: LocatorDescriptor
+    locator: CoreLocator
     locator_rank: float
     count: int
     is_unique: bool
@@ -1,77 +1,316 @@
-from typing import List, Dict
-from adapter.selfheal.reporter import parse_playwright_locator
+from typing import List, Dict, Optional
+from adapter.selfheal.candidate_sources import (
+    SOURCES,
+    CandidateRace,
+    CandidateSource,
+    meets_threshold,
+)
+from adapter.selfheal.canonicalize import CandidateSet
+from adapter.selfheal.concurrency import Coalescer
 from adapter.selfheal.score_engine import rank_locators
-from analyzer.llm_analyzer import analyze_with_llm
 from rule_engine.models import FailureContext, Rule
-from rule_engine.rule_loader import load_rules_from_yaml
+from rule_engine.rule_loader import RULES_PATH, load_rules_from_yaml
 from rule_engine.execution_engine import ExecutionEngine
+from rule_engine.match import first_mismatch_failure
+from adapter.selfheal.models import CoreLocator, ValidationResult, as_core
+from adapter.selfheal.shared_state import shared_state
+from adapter.selfheal.validation_cache import page_state, validation_cache
 from adapter.selfheal.locator_transformer import LocatorTransformer
-from adapter.selfheal.snapshot_helper import load_snapshot
-from adapter.selfheal.models import LocatorDescriptor, ValidationResult
-from adapter.selfheal.validator import validate_locator_uniqueness
+from adapter.selfheal.validator import (
+    collect_match_facts,
+    validate_locator_uniqueness,
+)
+from analyzer.circuit_breaker import llm_breakers
+from analyzer.warmup import warmup
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
-rules = load_rules_from_yaml("rule_engine/rules.yaml")
+rules = load_rules_from_yaml(RULES_PATH)
 engine = ExecutionEngine(rules)
 
+RULE_COUNTER_PREFIX = "rule:"
+
+DEFAULT_NARROWING_ORDER = ["scope_by_role", "add_accessible_name", "parent_landmark"]
+ESCALATION_SOURCES = ("llm",)
+
+# Pages failing the same way at once (multi-tab tests) heal once
+in_flight_heals = Coalescer("heal")
+COALESCE_WAIT_S = float(os.getenv("HEALER_COALESCE_WAIT_S", 120))
+
+
+def rule_tracing_enabled() -> bool:
+    return os.getenv("HEALER_RULE_TRACE", "0").lower() in ("1", "true", "yes")
+
 
 def get_rule_decision(context: FailureContext) -> Rule:
-    rule_decision: Rule = engine.evaluate(context)
+    with context.timer.stage("rules"):
+        rule_decision: Rule = engine.evaluate(context, trace=rule_tracing_enabled())
     logger.info(rule_decision)
     return rule_decision
 
 
-def manage_failure(context: FailureContext) -> Dict:
+def export_rule_stats():
+    """
+    Adds this process's per-rule counters to the shared state, where the
+    counters of all xdist workers are summed.
+    """
+    stats = engine.stats()
+    counts = {
+        f"{RULE_COUNTER_PREFIX}evaluations": stats["evaluations"],
+        f"{RULE_COUNTER_PREFIX}noop": stats["noop"],
+    }
+    for rule_id, rule_stats in stats["rules"].items():
+        for name in ("evaluations", "hits", "when_misses", "match_misses"):
+            counts[f"{RULE_COUNTER_PREFIX}{rule_id}:{name}"] = rule_stats[name]
+    shared_state.add_counts(counts)
+
+
+def collected_rule_stats() -> Dict[str, Dict[str, int]]:
+    """
+    The session's rule counters summed over every worker, by rule id.
+    """
+    collected: Dict[str, Dict[str, int]] = {}
+    for name, value in shared_state.counters(RULE_COUNTER_PREFIX).items():
+        key = name[len(RULE_COUNTER_PREFIX) :]
+        rule_id, _, counter = key.rpartition(":")
+        collected.setdefault(rule_id or "engine", {})[counter] = value
+    return collected
+
+
+def coalescing_enabled() -> bool:
+    return os.getenv("HEALER_COALESCE", "1").lower() not in ("0", "false", "no")
+
+
+def heal_key(
+    context: FailureContext, sources: Optional[List[CandidateSource]] = None
+) -> Optional[tuple]:
+    """
+    Heals with equal keys do the same work: the same failure of the same
+    locator on the same page state, with the same sources. None when the
+    page state is unknown.
+    """
+    original = context.failure.original_locator
+    state = page_state(context)
+    if original is None or state is None or not coalescing_enabled():
+        return None
+    return (
+        context.failure.type,
+        as_core(original).canonical,
+        state,
+        None if sources is None else tuple(sources),
+    )
+
+
+def manage_failure(
+    context: FailureContext, sources: Optional[List[CandidateSource]] = None
+) -> Dict:
+    """
+    Heals one failure. A heal identical to one running on another thread
+    waits for it and adopts its locator once this page confirms it is
+    unique; otherwise it runs its own.
+    """
+    key = heal_key(context, sources)
+    if key is None:
+        return _manage_failure(context, sources)
+    with context.timer.stage("coalesce"):
+        result, shared = in_flight_heals.run(
+            key, lambda: _manage_failure(context, sources), COALESCE_WAIT_S
+        )
+    if not shared:
+        return result
+    adopted = _adopt(context, result) if result is not None else None
+    return adopted if adopted is not None else _manage_failure(context, sources)
+
+
+def _manage_failure(
+    context: FailureContext, sources: Optional[List[CandidateSource]] = None
+) -> Dict:
     rule_decision = get_rule_decision(context)
     if rule_decision["decision"] == "ALLOW":
-        return get_locator(context, rule_decision)
+        result = get_locator(context, rule_decision, sources)
+    elif rule_decision["decision"] == "TRANSFORM":
+        result = transform_locator(context, rule_decision, sources)
     else:
-        return rule_decision
-
-
-def get_locator(context: FailureContext, rule_decision: Rule) -> Dict:
-    candidates = get_candidate_locators(context, rule_decision)
-    ranked_locators = rank_locators(candidates)
-    results: List[ValidationResult] = [
-        validate_locator_uniqueness(context.page, locator)
-        for locator in ranked_locators
-    ]
-    final_result = {}
-    for result in results:
-        if result.is_unique:
-            final_result["failure"] = context.failure.type
-            final_result["original_locator"] = (
-                context.failure.original_locator.to_playwright()
-            )
-            final_result["healed_locator"] = result.locator
-            final_result["locator_rank"] = result.locator.rank
-            final_result["decision"] = rule_decision["decision"]
-        return final_result
-    return final_result
-
-
-def get_candidate_locators(context: FailureContext, rule_decision):
-    locators: list[LocatorDescriptor] = []
-    if rule_decision["decision"] != "DENY":
-        snap = load_snapshot(context.artifacts.a11y_snapshot)
-        transformer = LocatorTransformer()
-        locators = transformer.transform(
-            original=context.failure.original_locator, snapshot=snap
+        result = rule_decision
+    return _finish(context, result)
+
+
+def _finish(context: FailureContext, result: Dict) -> Dict:
+    result["timings"] = context.timer.as_dict()
+    for stage, elapsed_ms in result["timings"].items():
+        shared_state.record_timing(f"stage:{stage}", elapsed_ms)
+    shared_state.record_timing("heal", context.timer.elapsed_ms())
+    result["llm_circuit"] = llm_breakers.snapshot()
+    result["llm_warmup"] = warmup.status()
+    return result
+
+
+def _adopt(context: FailureContext, shared: Dict) -> Optional[Dict]:
+    """
+    This heal's result from the result of an identical heal, or None when
+    the shared locator is not unique on this page.
+    """
+    result = {**shared, "validations": [], "coalesced": True}
+    healed: Optional[CoreLocator] = shared.get("healed_locator")
+    if healed is not None:
+        with context.timer.stage("validation"):
+            validation = validate_locator_uniqueness(context.page, healed)
+        if not validation.is_unique:
+            logger.info("Shared heal %s is not unique on this page", healed.canonical)
+            return None
+        result["validations"] = [validation]
+    return _finish(context, result)
+
+
+def get_locator(
+    context: FailureContext,
+    rule_decision: Rule,
+    sources: Optional[List[CandidateSource]] = None,
+) -> Dict:
+    """
+    Races the candidate sources and validates each batch on the test thread
+    as it arrives. Duplicates of earlier candidates are merged away before
+    ranking. Slower sources are cancelled once a unique candidate meets the
+    acceptance threshold or the validation budget is spent. Candidates
+    already found ambiguous or absent on this page state are not
+    re-validated.
+    """
+    timer = context.timer
+    candidates = CandidateSet()
+    state = page_state(context)
+    cached_validations = 0
+    results: List[ValidationResult] = []
+    healed: Optional[CoreLocator] = None
+
+    with CandidateRace(sources) as race:
+        race.start(context)
+        for batch in race:
+            timer.add(batch.source, batch.elapsed_ms)
+            if not batch.locators:
+                batch.mark_validated(False)
+                continue
+            logger.info("%s candidates from %s", len(batch.locators), batch.source)
+            with timer.stage("canonicalize"):
+                distinct = candidates.merge(batch.locators)
+            with timer.stage("ranking"):
+                ranked_locators = candidates.take(rank_locators(distinct))
+            batch_accepted = False
+            with timer.stage("validation"):
+                for locator in ranked_locators:
+                    result = validation_cache.get(locator, state)
+                    if result is not None and not result.is_unique:
+                        cached_validations += 1
+                    else:
+                        result = validate_locator_uniqueness(context.page, locator)
+                        validation_cache.put(result, state)
+                    results.append(result)
+                    if result.is_unique and _is_better(locator, healed):
+                        healed = locator
+                    if result.is_unique and meets_threshold(locator):
+                        batch_accepted = True
+                    if healed is not None and meets_threshold(healed):
+                        break
+            batch.mark_validated(batch_accepted)
+            if healed is not None and meets_threshold(healed):
+                race.cancel()
+            elif candidates.exhausted:
+                logger.info("Validated %s candidates, the maximum", candidates.taken)
+                race.cancel()
+        cancelled_sources = sorted(race.pending)
+    provenance = candidates.provenance()
+    original = context.failure.original_locator
+
+    return {
+        "failure": context.failure.type,
+        "original_locator": original.to_playwright() if original else None,
+        "healed_locator": healed,
+        "locator_rank": healed.rank if healed is not None else None,
+        "decision": rule_decision["decision"],
+        "rule_id": rule_decision.get("rule_id"),
+        "candidate_sources": sorted(
+            {s for sources in provenance.values() for s in sources}
+        ),
+        "candidate_provenance": provenance,
+        "duplicate_candidates": candidates.duplicates,
+        "cancelled_sources": cancelled_sources,
+        "validations": results,
+        "cached_validations": cached_validations,
+    }
+
+
+def transform_locator(
+    context: FailureContext,
+    rule_decision: Rule,
+    sources: Optional[List[CandidateSource]] = None,
+) -> Dict:
+    """
+    Narrows an ambiguous locator with the rule's transform strategies, in
+    the declared order, and returns the first narrowing the page confirms
+    to be unique. The candidates are counted against facts collected from
+    all ambiguous matches in one in-page call. Only when none is unique
+    does the rule's fallback escalate, and only if its requirements hold.
+    """
+    timer = context.timer
+    details = rule_decision.get("details") or {}
+    original = context.failure.original_locator
+    results: List[ValidationResult] = []
+    healed: Optional[CoreLocator] = None
+    strategy = None
+
+    with timer.stage("narrowing"):
+        matches = collect_match_facts(context.page, original) if original else []
+        narrowed = LocatorTransformer().narrow(
+            original=original,
+            matches=matches,
+            order=details.get("preferred_order") or DEFAULT_NARROWING_ORDER,
+            confidence=rule_decision.get("confidence", 0.0),
         )
-        if not locators:
-            locators = []
-            logger.info(
-                "No locators found from deterministic search. Calling LLM now...."
-            )
-            llm_response = analyze_with_llm(
-                context.artifacts.a11y_snapshot,
-                context.failure.original_locator.to_playwright(),
-            )
-            for text in llm_response:
-                parsed: LocatorDescriptor = parse_playwright_locator(text["locator"])
-                parsed.confidence = text["confidence"]
-                locators.append(parsed)
-            logger.info(f"List of locators fetched through LLM {locators}")
-        return locators
+    logger.info("%s narrowings of %s ambiguous matches", len(narrowed), len(matches))
+    with timer.stage("validation"):
+        for name, locator in narrowed:
+            result = validate_locator_uniqueness(context.page, locator)
+            results.append(result)
+            if result.is_unique:
+                healed, strategy = locator, name
+                break
+
+    if healed is None and _fallback_applies(context, details.get("fallback")):
+        logger.info("No unique narrowing; escalating as the rule's fallback")
+        escalation = [s for s in (sources or SOURCES) if s.name in ESCALATION_SOURCES]
+        result = get_locator(context, rule_decision, escalation)
+        result["validations"] = results + result["validations"]
+        result.update(transform_strategy=None, escalated=True, match_facts=matches)
+        return result
+
+    return {
+        "failure": context.failure.type,
+        "original_locator": original.to_playwright() if original else None,
+        "healed_locator": healed,
+        "locator_rank": healed.rank if healed is not None else None,
+        "decision": rule_decision["decision"],
+        "rule_id": rule_decision.get("rule_id"),
+        "candidate_sources": ["narrow"] if narrowed else [],
+        "cancelled_sources": [],
+        "validations": results,
+        "transform_strategy": strategy,
+        "escalated": False,
+        "match_facts": matches,
+    }
+
+
+def _fallback_applies(context: FailureContext, fallback: Optional[Dict]) -> bool:
+    if not fallback or fallback.get("type") != "ESCALATE":
+        return False
+    requires = fallback.get("requires") or []
+    return first_mismatch_failure({"requires": requires}, context) is None
+
+
+def _is_better(locator: CoreLocator, current: Optional[CoreLocator]) -> bool:
+    if current is None:
+        return True
+    return (meets_threshold(locator), locator.rank) > (
+        meets_threshold(current),
+        current.rank,
+    )
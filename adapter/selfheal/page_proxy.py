@@ -2,12 +2,24 @@ from playwright.sync_api import Page
 
 from adapter.selfheal.healer_interface import ILocatorHealer
 from adapter.selfheal.locator_proxy import HealingLocatorProxy
+from adapter.selfheal.validation_cache import validation_cache
 
 
 class HealingPage:
     def __init__(self, page: Page, healer: ILocatorHealer):
         self._page = page
         self._healer = healer
+        # Validation outcomes describe the old document once the page moves
+        self._url = page.url
+        page.on("framenavigated", self._on_navigated)
+
+    def _on_navigated(self, frame):
+        if frame != self._page.main_frame:
+            return
+        validation_cache.invalidate(self._url)
+        if frame.url != self._url:
+            validation_cache.invalidate(frame.url)
+        self._url = frame.url
 
     # --- Pass-through for everything else ---
 
@@ -20,7 +32,7 @@ class HealingPage:
 
             def wrapper(*args, **kwargs):
                 loc = attr(*args, **kwargs)
-                return HealingLocatorProxy(loc, self._healer)
+                return HealingLocatorProxy(loc, self._healer, call=(name, args, kwargs))
 
             return wrapper
         return attr
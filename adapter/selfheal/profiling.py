@@ -0,0 +1,183 @@
+"""
+Opt-in profiling of heals.
+
+With HEALER_PROFILE=1 (or ``pytest --healer-profile``) every heal runs
+under cProfile. A heal that takes at least HEALER_PROFILE_MIN_MS keeps its
+profile as the ``profile`` artifact of its failure, in pstats format
+(``python -m pstats <file>``, snakeviz ...). At session end the controller
+merges the session's profiles into ``test_artifacts/profiles/session.prof``
+and lists the hottest functions in ``session_top.txt``.
+
+Only one profiler can run in a process at a time (since Python 3.12 it
+sees every thread, the candidate source pool included), so a heal that
+starts while another one is profiled runs unprofiled.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+import cProfile
+import logging
+import marshal
+import os
+import pstats
+import threading
+import time
+
+from adapter.selfheal.artifact_store import ARTIFACT_DIR, store
+from adapter.selfheal.shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = ARTIFACT_DIR / "profiles"
+NAMESPACE = "profile"
+ENTRY_TTL_S = 86400
+
+
+def profiling_enabled() -> bool:
+    return os.getenv("HEALER_PROFILE", "0").lower() in ("1", "true", "yes")
+
+
+def min_ms() -> float:
+    return float(os.getenv("HEALER_PROFILE_MIN_MS", 0))
+
+
+def top_functions() -> int:
+    return int(os.getenv("HEALER_PROFILE_TOP", 30))
+
+
+@dataclass
+class ProfiledHeal:
+    # Set by the heal once its failure is known
+    failure_id: Optional[str] = None
+    test_name: Optional[str] = None
+    # The stored profile, if it was kept
+    path: Optional[str] = None
+
+
+class HealProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._paths: Dict[str, str] = {}
+
+    @contextmanager
+    def profile(self) -> Iterator[ProfiledHeal]:
+        """
+        Profiles the block when profiling is on and no other heal is being
+        profiled. The block names the failure on the yielded object.
+        """
+        heal = ProfiledHeal()
+        if not profiling_enabled() or not self._lock.acquire(blocking=False):
+            yield heal
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Another profiler (pytest-profiling, a debugger) is active
+            self._lock.release()
+            logger.debug("Heal not profiled: %s", e)
+            yield heal
+            return
+        start = time.perf_counter()
+        try:
+            yield heal
+        finally:
+            profiler.disable()
+            self._lock.release()
+            self._save(profiler, heal, (time.perf_counter() - start) * 1000)
+
+    def _save(self, profiler: cProfile.Profile, heal: ProfiledHeal, elapsed_ms: float):
+        if heal.failure_id is None or elapsed_ms < min_ms():
+            return
+        try:
+            data = marshal.dumps(pstats.Stats(profiler).stats)
+            # Written on this thread: the controller merges the file as soon
+            # as the workers finish
+            path = store.put(
+                heal.failure_id,
+                "profile",
+                data,
+                suffix=".prof",
+                compress=False,
+                test_name=heal.test_name,
+                background=False,
+            )
+        except Exception:
+            logger.exception("Unable to store the profile of %s", heal.failure_id)
+            return
+        heal.path = path
+        self._paths[heal.failure_id] = path
+        shared_state.put(NAMESPACE, heal.failure_id, path, ENTRY_TTL_S)
+        logger.info("Heal took %.0f ms; profile stored in %s", elapsed_ms, path)
+
+    def profiles(self) -> Dict[str, str]:
+        """
+        The session's stored profiles from every worker, by failure id.
+        """
+        return {**shared_state.values(NAMESPACE), **self._paths}
+
+    def clear(self):
+        self._paths.clear()
+        shared_state.clear(NAMESPACE)
+
+
+heal_profiler = HealProfiler()
+
+
+def merge_profiles(
+    paths: Iterable[str], directory: Path = PROFILE_DIR, top: Optional[int] = None
+) -> Optional[Path]:
+    """
+    Merges the ``paths`` that still exist into ``directory/session.prof``
+    and writes the ``top`` functions by cumulative and own time to
+    ``directory/session_top.txt``. Returns the merged profile's path.
+    """
+    existing = sorted({p for p in paths if Path(p).exists()})
+    if not existing:
+        return None
+    directory.mkdir(parents=True, exist_ok=True)
+    merged = directory / "session.prof"
+    with (directory / "session_top.txt").open("w", encoding="utf-8") as f:
+        stats = pstats.Stats(*existing, stream=f)
+        stats.dump_stats(merged)
+        f.write(f"Merged {len(existing)} heal profiles\n")
+        stats.sort_stats("cumulative").print_stats(top or top_functions())
+        stats.sort_stats("tottime").print_stats(top or top_functions())
+    return merged
+
+
+class HealProfilePlugin:
+    """
+    Pytest plugin, registered by the root conftest. The controller (or a
+    run without xdist) merges the session's heal profiles at session end.
+    """
+
+    @staticmethod
+    def _is_controller(config) -> bool:
+        return not hasattr(config, "workerinput")
+
+    def pytest_configure(self, config):
+        if self._is_controller(config):
+            # Runs before xdist starts the workers
+            heal_profiler.clear()
+            shared_state.flush()
+
+    def pytest_sessionfinish(self, session):
+        if not profiling_enabled() or not self._is_controller(session.config):
+            return
+        shared_state.flush()
+        profiles = heal_profiler.profiles()
+        try:
+            merged = merge_profiles(profiles.values())
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Unable to merge heal profiles: %s", e)
+            return
+        if merged is not None:
+            logger.info(
+                "Merged %s heal profiles into %s (top functions in %s)",
+                len(profiles),
+                merged,
+                merged.with_name("session_top.txt"),
+            )
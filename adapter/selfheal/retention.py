@@ -0,0 +1,165 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import logging
+import os
+import threading
+import time
+
+from adapter.selfheal.artifact_store import ArtifactStore, FailureRecord, store
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    max_bytes: int = 1024 * 1024 * 1024  # 0 disables the size bound
+    max_age_seconds: float = 14 * 86400  # 0 disables the age bound
+    keep_per_test: int = 5  # 0 keeps every failure of a test
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        return cls(
+            max_bytes=int(
+                float(os.getenv("HEALER_ARTIFACT_MAX_MB", cls.max_bytes / 1048576))
+                * 1048576
+            ),
+            max_age_seconds=float(
+                os.getenv("HEALER_ARTIFACT_MAX_AGE_DAYS", cls.max_age_seconds / 86400)
+            )
+            * 86400,
+            keep_per_test=int(
+                os.getenv("HEALER_ARTIFACT_KEEP_PER_TEST", cls.keep_per_test)
+            ),
+        )
+
+
+class RetentionManager:
+    """
+    Evicts failure artifacts, oldest first, until the store satisfies the
+    retention policy.
+
+    Works off the artifact store's manifest index rather than scanning
+    ``test_artifacts/``. ``maybe_schedule`` is registered as a store listener
+    and runs a bounded pass on the writer pool every ``check_every`` puts;
+    ``enforce`` with no budget is the full pass run at session end, which
+    also runs the pruners of artifacts kept outside the manifest.
+    """
+
+    def __init__(
+        self,
+        artifact_store: ArtifactStore,
+        policy: RetentionPolicy,
+        check_every: int = 50,
+        budget: int = 200,
+    ):
+        self.store = artifact_store
+        self.policy = policy
+        self.check_every = check_every
+        self.budget = budget
+        self._puts = 0
+        self._scheduled = False
+        self._lock = threading.Lock()
+        self._pruners: List[Callable[[], int]] = []
+
+    def add_pruner(self, pruner: Callable[[], int]):
+        """
+        Registers a cleanup for artifacts the manifest does not index, e.g.
+        baselines. Runs on the full pass and returns the bytes it freed.
+        """
+        self._pruners.append(pruner)
+
+    def select_evictions(self, failures: List[FailureRecord], now: float) -> List[str]:
+        """
+        Failures that break the age or keep-N bounds, oldest first.
+        """
+        policy = self.policy
+        evict = set()
+
+        if policy.max_age_seconds:
+            cutoff = now - policy.max_age_seconds
+            for record in failures:
+                if record.ts >= cutoff:
+                    break
+                evict.add(record.failure_id)
+
+        if policy.keep_per_test:
+            seen: Dict[Optional[str], int] = {}
+            # Walk newest first so the newest N per test are kept
+            for record in reversed(failures):
+                if record.failure_id in evict:
+                    continue
+                seen[record.test_name] = seen.get(record.test_name, 0) + 1
+                if seen[record.test_name] > policy.keep_per_test:
+                    evict.add(record.failure_id)
+
+        return [r.failure_id for r in failures if r.failure_id in evict]
+
+    def enforce(self, budget: Optional[int] = None) -> int:
+        """
+        Runs one eviction pass, removing at most ``budget`` failures.
+        Returns the number of bytes freed.
+        """
+        full = budget is None
+        failures = self.store.failures()
+        evict = self.select_evictions(failures, time.time())
+        if budget is not None:
+            evict = evict[:budget]
+            budget -= len(evict)
+        freed = self.store.evict(evict)
+
+        max_bytes = self.policy.max_bytes
+        if max_bytes:
+            # Blobs are shared between failures, so the bytes a failure frees
+            # are only known after evicting it; go oldest first in small steps.
+            remaining = iter(self.store.failures())
+            while self.store.total_bytes > max_bytes and (
+                budget is None or budget > 0
+            ):
+                step = [r.failure_id for _, r in zip(range(20), remaining)]
+                if budget is not None:
+                    step = step[:budget]
+                    budget -= len(step)
+                if not step:
+                    break
+                freed += self.store.evict(step)
+
+        if full:
+            for pruner in self._pruners:
+                try:
+                    freed += pruner()
+                except Exception:
+                    logger.exception("Artifact pruner failed")
+
+        if freed:
+            logger.info("Artifact retention freed %.1f MB", freed / 1048576)
+        return freed
+
+    def maybe_schedule(self, _store: ArtifactStore = None):
+        with self._lock:
+            self._puts += 1
+            if self._scheduled or self._puts < self.check_every:
+                return
+            self._puts = 0
+            self._scheduled = True
+        self.store.submit(self._background_pass)
+
+    def _background_pass(self):
+        try:
+            self.enforce(budget=self.budget)
+        except Exception:
+            logger.exception("Artifact retention pass failed")
+        finally:
+            with self._lock:
+                self._scheduled = False
+
+
+retention = RetentionManager(store, RetentionPolicy.from_env())
+store.add_listener(retention.maybe_schedule)
+
+
+def enforce_retention() -> int:
+    """
+    Full retention pass; called at session end.
+    """
+    store.wait_for_pending_writes()
+    return retention.enforce()
@@ -1,8 +1,34 @@
-from adapter.selfheal.models import LocatorDescriptor
+from typing import Tuple
+from adapter.selfheal.models import LocatorDescriptor, LocatorStep, as_chain
 from playwright.sync_api import Page, Locator
 
 
+def apply_chain(page: Page, chain: Tuple[LocatorStep, ...]) -> Locator:
+    """
+    Replays a parsed locator chain on ``page``.
+    """
+
+    def resolve(value):
+        nested = as_chain(value)
+        return apply_chain(page, nested) if nested is not None else value
+
+    target = page
+    for step in chain:
+        attr = getattr(target, step.method)
+        if not step.call:
+            target = attr
+            continue
+        target = attr(
+            *(resolve(v) for v in step.args),
+            **{k: resolve(v) for k, v in step.kwargs},
+        )
+    return target
+
+
 def build_locator(page: Page, d: LocatorDescriptor) -> Locator:
+    if d.chain:
+        return apply_chain(page, d.chain)
+
     if d.strategy == "role":
         return page.get_by_role(
             d.role, name=d.value, exact=d.exact if hasattr(d, "exact") else False
@@ -19,6 +45,9 @@ def build_locator(page: Page, d: LocatorDescriptor) -> Locator:
     if d.strategy == "placeholder":
         return page.get_by_placeholder(d.value)
 
+    if d.strategy == "test_id":
+        return page.get_by_test_id(d.value)
+
     if d.strategy == "xpath":
         return page.locator(d.value)
 
@@ -21,6 +21,11 @@ ARIA_ROLES = {
     "menuitem",
     "tab",
     "tabpanel",
+    "searchbox",
+    "switch",
+    "slider",
+    "spinbutton",
+    "dialog",
 
     # Structure
     "heading",
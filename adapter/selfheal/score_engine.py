@@ -1,54 +1,159 @@
-from adapter.selfheal.models import LocatorDescriptor
-
-
-BASE_WEIGHTS = {
-    "role": 100,
-    "label": 95,
-    "placeholder": 90,
-    "text": 70,
-    "css": 40,
-    "xpath": 20,
-}
-
-ROLE_PRIORITY = {
-    "button": 30,
-    "combobox": 25,
-    "textbox": 25,
-    "checkbox": 20,
-    "radio": 20,
-    "link": 15,
-}
-
-LANDMARK_PRIORITY = {
-    "main": 30,  # primary content → best
-    "search": 25,  # forms / search boxes
-    "navigation": 15,  # menus
-    "banner": 5,  # header
-    "contentinfo": -20,  # footer → usually duplicated
-}
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import yaml
 
+from adapter.selfheal.models import CoreLocator, LocatorDescriptor, as_core
 
-def score_locator(locator: LocatorDescriptor) -> float:
-    score = BASE_WEIGHTS.get(locator.strategy, 10)
+WEIGHTS_PATH = Path(__file__).with_name("score_weights.yaml")
+
+ONE_HOT_GROUPS = ("strategy", "role", "landmark", "source")
+SCALAR_FEATURES = ("exact", "name_length", "confidence")
+OTHER = "_other"
+NAME_LENGTH_CAP = 64
+
+
+class ScoringModel:
+    """
+    Linear candidate scorer.
+
+    A batch of candidates is turned into a feature matrix (one-hot strategy,
+    role, landmark and source, plus exact, name length and confidence) and
+    scored with a single dot product against weights loaded from YAML.
+    """
+
+    def __init__(
+        self,
+        vocab: Dict[str, List[str]],
+        weights: Optional[np.ndarray] = None,
+        bias: float = 0.0,
+    ):
+        self.vocab = {group: list(values) for group, values in vocab.items()}
+        self.feature_names: List[str] = []
+        self._index: Dict[str, Dict[str, int]] = {}
+        for group in ONE_HOT_GROUPS:
+            values = self.vocab.get(group, [])
+            if OTHER not in values:
+                values.append(OTHER)
+            self._index[group] = {}
+            for value in values:
+                self._index[group][value] = len(self.feature_names)
+                self.feature_names.append(f"{group}:{value}")
+        self._scalar_index = {}
+        for name in SCALAR_FEATURES:
+            self._scalar_index[name] = len(self.feature_names)
+            self.feature_names.append(name)
+        if weights is None:
+            weights = np.zeros(len(self.feature_names))
+        self.weights = np.asarray(weights, dtype=np.float64)
+        if self.weights.shape != (len(self.feature_names),):
+            raise ValueError(
+                f"Expected {len(self.feature_names)} weights, got {self.weights.shape}"
+            )
+        self.bias = float(bias)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScoringModel":
+        weights_def = data.get("weights", {})
+        vocab = {
+            group: [str(v) for v in (weights_def.get(group) or {})]
+            for group in ONE_HOT_GROUPS
+        }
+        model = cls(vocab, bias=data.get("bias", 0))
+        for i, name in enumerate(model.feature_names):
+            if ":" in name:
+                group, value = name.split(":", 1)
+                model.weights[i] = float((weights_def.get(group) or {}).get(value, 0))
+            else:
+                model.weights[i] = float(weights_def.get(name) or 0)
+        return model
+
+    @classmethod
+    def from_yaml(cls, path: Path = WEIGHTS_PATH) -> "ScoringModel":
+        with Path(path).open("r", encoding="utf-8") as f:
+            return cls.from_dict(yaml.safe_load(f))
 
-    # Landmark-aware scoring
-    score += score_landmark(locator)
-    score += score_role(locator)
-    locator.rank = round(score, 2)
-    return round(score, 2)
+    def to_dict(self) -> dict:
+        weights: Dict[str, object] = {}
+        for name, weight in zip(self.feature_names, self.weights.tolist()):
+            if ":" in name:
+                group, value = name.split(":", 1)
+                weights.setdefault(group, {})[value] = round(weight, 4)
+            else:
+                weights[name] = round(weight, 4)
+        return {"version": 1, "bias": round(self.bias, 4), "weights": weights}
 
+    def to_yaml(self, path: Path = WEIGHTS_PATH):
+        with Path(path).open("w", encoding="utf-8") as f:
+            yaml.safe_dump(self.to_dict(), f, sort_keys=False)
 
-def score_landmark(locator: LocatorDescriptor) -> int:
-    if not locator.landmark:
-        return 0
-    return LANDMARK_PRIORITY.get(locator.landmark, 0)
+    def features(self, locators: Sequence) -> np.ndarray:
+        """
+        Feature matrix of shape (len(locators), n_features). Works on any
+        object exposing the LocatorDescriptor attributes.
+        """
+        n = len(locators)
+        matrix = np.zeros((n, len(self.feature_names)))
+        if not n:
+            return matrix
+        rows = np.arange(n)
+        for group in ONE_HOT_GROUPS:
+            index = self._index[group]
+            other = index[OTHER]
+            values = [group_value(loc, group) for loc in locators]
+            cols = [index.get(value, other) for value in values]
+            matrix[rows, cols] = [value is not None for value in values]
+        matrix[:, self._scalar_index["exact"]] = [
+            1.0 if getattr(loc, "exact", False) else 0.0 for loc in locators
+        ]
+        matrix[:, self._scalar_index["name_length"]] = [
+            min(len(getattr(loc, "name", None) or ""), NAME_LENGTH_CAP)
+            / NAME_LENGTH_CAP
+            for loc in locators
+        ]
+        matrix[:, self._scalar_index["confidence"]] = [
+            float(getattr(loc, "confidence", 0) or 0) for loc in locators
+        ]
+        return matrix
 
+    def score(self, locators: Sequence) -> np.ndarray:
+        return np.round(self.features(locators) @ self.weights + self.bias, 2)
 
-def score_role(locator: LocatorDescriptor) -> int:
-    if not locator.value:
-        return 0
-    return ROLE_PRIORITY.get(locator.value, 0)
+
+def group_value(locator, group: str):
+    """
+    The value of ``locator`` in a one-hot group.
+    """
+    value = getattr(locator, group, None)
+    if group == "strategy":
+        # Every candidate has a strategy; unknown ones fall into _other
+        return value or OTHER
+    if group == "source" and value:
+        # LLM candidates are tagged with their tier, e.g. llm:fast
+        return value.split(":", 1)[0]
+    return value or None
+
+
+model = ScoringModel.from_yaml()
+
+
+def score_locators(locators: Sequence[LocatorDescriptor]) -> np.ndarray:
+    return model.score(locators)
+
+
+def score_locator(locator: LocatorDescriptor) -> float:
+    return float(model.score([locator])[0])
 
 
-def rank_locators(locators: list[LocatorDescriptor]) -> list[LocatorDescriptor]:
-    return sorted(locators, key=score_locator, reverse=True)
+def rank_locators(locators: Sequence[CoreLocator]) -> list[CoreLocator]:
+    """
+    Returns the candidates with ``rank`` set, best first. Descriptors are
+    converted to CoreLocator; inputs are never modified.
+    """
+    if not locators:
+        return []
+    locators = [as_core(loc) for loc in locators]
+    scores = model.score(locators)
+    # Stable sort on the negated score keeps input order for ties
+    order = np.argsort(-scores, kind="stable")
+    return [locators[i].replace(rank=float(scores[i])) for i in order]
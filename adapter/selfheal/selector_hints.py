@@ -0,0 +1,260 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import re
+
+from adapter.selfheal.models import LocatorDescriptor
+
+# Implicit ARIA role of common HTML tags
+TAG_ROLES = {
+    "a": "link",
+    "button": "button",
+    "select": "combobox",
+    "textarea": "textbox",
+    "input": "textbox",
+    "img": "img",
+    "h1": "heading",
+    "h2": "heading",
+    "h3": "heading",
+    "h4": "heading",
+    "h5": "heading",
+    "h6": "heading",
+    "li": "listitem",
+    "ul": "list",
+    "ol": "list",
+    "nav": "navigation",
+    "form": "form",
+    "main": "main",
+    "header": "banner",
+    "footer": "contentinfo",
+    "table": "table",
+    "tr": "row",
+    "td": "cell",
+    "option": "option",
+    "dialog": "dialog",
+}
+
+INPUT_TYPE_ROLES = {
+    "checkbox": "checkbox",
+    "radio": "radio",
+    "submit": "button",
+    "button": "button",
+    "reset": "button",
+    "search": "searchbox",
+    "range": "slider",
+}
+
+# Attributes whose values read like accessible names
+NAME_ATTRIBUTES = (
+    "aria-label",
+    "title",
+    "placeholder",
+    "alt",
+    "value",
+    "name",
+    "data-testid",
+    "data-test",
+    "data-test-id",
+    "id",
+)
+
+# Attributes holding code identifiers rather than human-readable text
+IDENTIFIER_ATTRIBUTES = {"id", "name", "data-testid", "data-test", "data-test-id"}
+
+XPATH_FUNCTIONS = {
+    "text",
+    "normalize-space",
+    "contains",
+    "starts-with",
+    "ends-with",
+    "translate",
+    "lower-case",
+    "not",
+    "and",
+    "or",
+    "last",
+    "position",
+    "node",
+    "descendant",
+    "ancestor",
+    "following-sibling",
+    "preceding-sibling",
+    "parent",
+    "child",
+    "self",
+    "following",
+    "preceding",
+    "descendant-or-self",
+    "ancestor-or-self",
+}
+
+STRING_LITERAL_RE = re.compile(r"""(?P<q>["'])(?P<value>.*?)(?P=q)""")
+XPATH_ATTR_RE = re.compile(
+    r"""(?:contains|starts-with)?\(?\s*@(?P<attr>[\w:-]+)\s*(?:=|,)\s*"""
+    r"""(?P<q>["'])(?P<value>.*?)(?P=q)"""
+)
+XPATH_TAG_RE = re.compile(r"(?:^|/|::|\()\s*(?P<tag>[a-zA-Z][\w-]*)\s*(?=\[|/|$|\)|\|)")
+CSS_TAG_RE = re.compile(r"(?:^|[\s>+~,(])(?P<tag>[a-zA-Z][\w-]*)")
+CSS_ID_RE = re.compile(r"#(?P<value>[\w-]+)")
+CSS_CLASS_RE = re.compile(r"\.(?P<value>[a-zA-Z_][\w-]*)")
+CSS_ATTR_RE = re.compile(
+    r"""\[\s*(?P<attr>[\w:-]+)\s*[~|^$*]?=\s*(?P<q>["']?)(?P<value>.*?)(?P=q)\s*(?:[is])?\s*\]"""
+)
+CSS_TEXT_RE = re.compile(
+    r""":(?:has-text|text|text-is|text-matches)\(\s*(?P<q>["'])(?P<value>.*?)(?P=q)\s*\)"""
+)
+ROLE_ENGINE_RE = re.compile(
+    r"""^(?:internal:)?role=(?P<role>[\w-]+)"""
+    r"""(?:\[name=(?P<q>["'])(?P<name>.*?)(?P=q)[is]?\])?"""
+)
+TEXT_ENGINE_RE = re.compile(
+    r"""^(?:internal:)?text=(?P<q>["']?)(?P<value>.*?)(?P=q)[is]?$"""
+)
+WORD_RE = re.compile(r"[A-Za-z0-9]+")
+CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+@dataclass
+class SelectorHints:
+    """
+    What a raw XPath/CSS selector tells us about its target element.
+    """
+
+    tags: List[str] = field(default_factory=list)
+    attributes: Dict[str, List[str]] = field(default_factory=dict)
+    texts: List[str] = field(default_factory=list)
+    roles: List[str] = field(default_factory=list)
+
+    def add_attribute(self, attr: str, value: str):
+        self.attributes.setdefault(attr.lower(), []).append(value)
+
+    @property
+    def target_role(self) -> Optional[str]:
+        return self.roles[0] if self.roles else None
+
+    @property
+    def names(self) -> List[str]:
+        """
+        Strings expected to resemble the element's accessible name,
+        most specific first.
+        """
+        names = list(self.texts)
+        for attr in NAME_ATTRIBUTES:
+            for value in self.attributes.get(attr, []):
+                names.append(
+                    humanize(value) if attr in IDENTIFIER_ATTRIBUTES else value
+                )
+        for attr in ("href", "class"):
+            for value in self.attributes.get(attr, []):
+                names.append(humanize(value.rsplit("/", 1)[-1]))
+        seen = set()
+        return [
+            n for n in names if n and not (n.lower() in seen or seen.add(n.lower()))
+        ]
+
+    def __bool__(self) -> bool:
+        return bool(self.tags or self.attributes or self.texts or self.roles)
+
+
+def humanize(identifier: str) -> str:
+    """
+    ``loginButton`` / ``login-btn`` / ``login_button`` -> ``login button``
+    """
+    return " ".join(WORD_RE.findall(CAMEL_RE.sub(" ", identifier))).lower()
+
+
+def _finalize_roles(hints: SelectorHints) -> SelectorHints:
+    for value in hints.attributes.get("role", []):
+        hints.roles.append(value.lower())
+    input_types = hints.attributes.get("type", [])
+    # The last tag is the target element; its role goes first
+    for tag in reversed(hints.tags):
+        if tag == "input" and input_types:
+            hints.roles.extend(
+                INPUT_TYPE_ROLES.get(t.lower(), "textbox") for t in input_types
+            )
+        elif tag in TAG_ROLES:
+            hints.roles.append(TAG_ROLES[tag])
+    hints.roles = list(dict.fromkeys(hints.roles))
+    return hints
+
+
+def tokenize_xpath(selector: str) -> SelectorHints:
+    hints = SelectorHints()
+    selector = selector.removeprefix("xpath=")
+    attr_spans = []
+    for m in XPATH_ATTR_RE.finditer(selector):
+        hints.add_attribute(m.group("attr"), m.group("value"))
+        attr_spans.append(m.span("value"))
+    for m in STRING_LITERAL_RE.finditer(selector):
+        start = m.start("value")
+        if any(s <= start <= e for s, e in attr_spans):
+            continue
+        if m.group("value").strip():
+            hints.texts.append(m.group("value").strip())
+    # Drop literals before tag matching so words inside them are not tags
+    stripped = STRING_LITERAL_RE.sub("''", selector)
+    for m in XPATH_TAG_RE.finditer(stripped):
+        tag = m.group("tag").lower()
+        if tag not in XPATH_FUNCTIONS and tag != "*":
+            hints.tags.append(tag)
+    return _finalize_roles(hints)
+
+
+def tokenize_css(selector: str) -> SelectorHints:
+    hints = SelectorHints()
+    selector = selector.removeprefix("css=")
+
+    if m := ROLE_ENGINE_RE.match(selector):
+        hints.roles.append(m.group("role"))
+        if m.group("name"):
+            hints.texts.append(m.group("name"))
+        return hints
+    if m := TEXT_ENGINE_RE.match(selector):
+        hints.texts.append(m.group("value"))
+        return hints
+
+    for m in CSS_TEXT_RE.finditer(selector):
+        hints.texts.append(m.group("value"))
+    for m in CSS_ATTR_RE.finditer(selector):
+        hints.add_attribute(m.group("attr"), m.group("value"))
+    # Remove bracketed and quoted parts before reading tags, ids and classes
+    stripped = CSS_ATTR_RE.sub(" ", CSS_TEXT_RE.sub(" ", selector))
+    stripped = STRING_LITERAL_RE.sub(" ", stripped)
+    stripped = re.sub(r":[\w-]+(\([^)]*\))?", " ", stripped)
+    for m in CSS_ID_RE.finditer(stripped):
+        hints.add_attribute("id", m.group("value"))
+    for m in CSS_CLASS_RE.finditer(stripped):
+        hints.add_attribute("class", m.group("value"))
+    for m in CSS_TAG_RE.finditer(re.sub(r"[#.][\w-]+", " ", stripped)):
+        hints.tags.append(m.group("tag").lower())
+    return _finalize_roles(hints)
+
+
+def hints_for(locator: Optional[LocatorDescriptor]) -> SelectorHints:
+    """
+    Builds hints for any parsed locator: raw selectors are tokenized, other
+    strategies contribute their role and name/value directly.
+    """
+    if locator is None:
+        return SelectorHints()
+    if locator.strategy == "xpath":
+        return tokenize_xpath(locator.value)
+    if locator.strategy == "css":
+        return tokenize_css(locator.value)
+
+    hints = SelectorHints()
+    if locator.role:
+        hints.roles.append(locator.role)
+    for text in (locator.name, locator.value):
+        if text and text not in hints.texts:
+            hints.texts.append(text)
+    if locator.strategy in ("label", "placeholder", "test_id"):
+        hints.add_attribute(
+            {
+                "label": "aria-label",
+                "placeholder": "placeholder",
+                "test_id": "data-testid",
+            }[locator.strategy],
+            locator.value,
+        )
+    return hints
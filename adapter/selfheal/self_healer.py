@@ -1,7 +1,15 @@
+from adapter.selfheal.bundle import save_bundle
+from adapter.selfheal.candidate_sources import heal_cache, meets_threshold
+from adapter.selfheal.concurrency import page_locks
+from adapter.selfheal.heal_events import emit_heal_event
 from adapter.selfheal.healer_interface import ILocatorHealer
-from adapter.selfheal.models import LocatorDescriptor
+from adapter.selfheal.heal_history import get_history_store
+from adapter.selfheal.heal_report import heal_report
+from adapter.selfheal.models import CoreLocator
 from adapter.selfheal.orchestrator import manage_failure
+from adapter.selfheal.profiling import ProfiledHeal, heal_profiler
 from adapter.selfheal.reporter import normalize_failure
+from adapter.selfheal.timing import StageTimer
 from playwright.sync_api import Locator
 from adapter.selfheal.retry import build_locator
 import logging
@@ -11,30 +19,63 @@ logger = logging.getLogger(__name__)
 
 
 class SimpleSelfHealer(ILocatorHealer):
+    """
+    Safe to share between threads: heals of one page are serialized, heals
+    of different pages (and browser contexts) run concurrently.
+    """
+
     def heal(self, *, page, exception) -> Locator:
+        with page_locks.hold(page), heal_profiler.profile() as profiled:
+            return self._heal(page, exception, profiled)
+
+    def _heal(self, page, exception, profiled: ProfiledHeal) -> Locator:
         ctx = normalize_failure(
             tool="playwright",
             page=page,
             exception=exception,
             test_name=current_test.get(),
             test_type="REGRESSION",
+            timer=StageTimer(),
         )
+        profiled.failure_id, profiled.test_name = ctx.failure.id, ctx.test_name
 
         result = manage_failure(ctx)
-        logger.info(f"Healing engine result: {result}")
-        if result["decision"] == "ALLOW":
-            loc: LocatorDescriptor = result["healed_locator"]
-            if loc.rank >= 100 or loc.confidence >= 0.9:
-                healed_locator: Locator = build_locator(page, result["healed_locator"])
-                logger.info(f"Returning healed locator {healed_locator}")
-                return healed_locator
-            else:
-                logger.info(
-                    f"Manual Review required as locator score doesn't "
-                    f"meet the required threshold. "
-                    f"Suggested locator {loc.to_playwright()}."
-                    f"Locator rank: {loc.rank}, Locator confidence: {loc.confidence}."
-                )
-                raise exception
-        else:
+        logger.debug("Healing engine result: %s", result)
+        save_bundle(ctx, exception, result)
+        healed_locator = self._accept(page, result)
+        if healed_locator is not None:
+            heal_cache.remember(ctx, result["healed_locator"])
+        emit_heal_event(ctx, result, healed=healed_locator is not None)
+        heal_report.record(ctx, result, healed=healed_locator is not None)
+
+        history = get_history_store()
+        if history is not None:
+            history.record(ctx, result, healed=healed_locator is not None)
+
+        if healed_locator is None:
             raise exception
+        return healed_locator
+
+    def _accept(self, page, result) -> Locator | None:
+        if result["decision"] not in ("ALLOW", "TRANSFORM"):
+            return None
+        loc: CoreLocator = result.get("healed_locator")
+        if loc is None:
+            logger.info("No unique candidate locator found.")
+            return None
+        # A confirmed narrowing keeps one of the elements the test already
+        # matched, so the rule's transform vouches for it
+        if result.get("transform_strategy") or meets_threshold(loc):
+            healed_locator: Locator = build_locator(page, loc)
+            logger.info("Returning healed locator %s", healed_locator)
+            return healed_locator
+        logger.info(
+            "Manual Review required as locator score doesn't "
+            "meet the required threshold. "
+            "Suggested locator %s."
+            "Locator rank: %s, Locator confidence: %s.",
+            loc.to_playwright(),
+            loc.rank,
+            loc.confidence,
+        )
+        return None
@@ -0,0 +1,360 @@
+"""
+State shared by every pytest-xdist worker of a session.
+
+Each worker is its own process with its own module globals, so a heal
+found by one worker is invisible to the others. This module keeps heal
+results, LLM responses and timing statistics in one SQLite database under
+the pytest cache directory (``.pytest_cache/ai-healer``):
+
+- WAL mode lets any number of workers read while one writes; lookups are
+  a primary-key read on a per-thread connection (tens of microseconds).
+- Writes never block the test thread: each process funnels them through
+  a single writer thread that commits them in batches.
+- ``file_lock`` serializes cross-process edits of plain files, such as the
+  artifact store's manifest.
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single process assumed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = Path(os.getcwd()) / ".pytest_cache" / "ai-healer"
+DB_NAME = "shared.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    total_ms REAL NOT NULL,
+    max_ms REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+PUT_SQL = (
+    "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)"
+)
+STAT_SQL = """
+INSERT INTO stats (name, count, total_ms, max_ms) VALUES (?, 1, ?, ?)
+ON CONFLICT (name) DO UPDATE SET
+    count = count + 1,
+    total_ms = total_ms + excluded.total_ms,
+    max_ms = MAX(max_ms, excluded.max_ms)
+"""
+COUNT_SQL = """
+INSERT INTO counters (name, value) VALUES (?, ?)
+ON CONFLICT (name) DO UPDATE SET value = value + excluded.value
+"""
+
+
+def shared_state_enabled() -> bool:
+    return os.getenv("HEALER_SHARED_STATE", "1").lower() not in ("0", "false", "no")
+
+
+def xdist_worker() -> Optional[str]:
+    """
+    The xdist worker id (``gw0`` ...), or None in the controller or a
+    non-distributed run.
+    """
+    return os.getenv("PYTEST_XDIST_WORKER")
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """
+    Holds an exclusive advisory lock on ``<path>.lock`` across processes.
+    """
+    if fcntl is None:
+        yield
+        return
+    lock_path = Path(f"{path}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class SharedState:
+    """
+    Namespaced key/value store and timing counters in one SQLite file.
+
+    Reads go straight to the database on a connection owned by the calling
+    thread. Writes are queued to this process's writer thread, so a value
+    becomes visible to other workers a few milliseconds after ``put``.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_DIR, max_pending: int = 10_000):
+        self.directory = Path(directory)
+        self.path = self.directory / DB_NAME
+        self._local = threading.local()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._ready = False
+        self._closed = False
+        # Stops the writer after its current batch when the stop marker
+        # cannot be queued
+        self._stopping = threading.Event()
+
+    def configure(self, directory: Path):
+        """
+        Points the store at another directory, e.g. the pytest cache dir.
+        Only honoured before first use.
+        """
+        with self._lock:
+            if self._ready:
+                return
+            self.directory = Path(directory)
+            self.path = self.directory / DB_NAME
+
+    def _ensure_ready(self):
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Creating the schema is the only write outside the writer thread
+            with file_lock(self.path):
+                conn = _connect(self.path)
+                conn.executescript(SCHEMA)
+                conn.close()
+            self._writer = threading.Thread(
+                target=self._run, name="shared-state-writer", daemon=True
+            )
+            self._writer.start()
+            self._ready = True
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._ensure_ready()
+            conn = _connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    # --- Key/value ---
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        try:
+            row = (
+                self._conn()
+                .execute(
+                    "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            logger.warning("Shared state read failed: %s", e)
+            return None
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return row[0]
+
+    def put(self, namespace: str, key: str, value: str, ttl_s: Optional[float] = None):
+        expires_at = time.time() + ttl_s if ttl_s else None
+        self._enqueue((PUT_SQL, (namespace, key, value, expires_at)))
+
+    def values(self, namespace: str) -> Dict[str, str]:
+        """
+        Every live value of ``namespace`` by key.
+        """
+        try:
+            rows = self._conn().execute(
+                "SELECT key, value FROM kv WHERE namespace = ? "
+                "AND (expires_at IS NULL OR expires_at >= ?) ORDER BY key",
+                (namespace, time.time()),
+            )
+            return dict(rows)
+        except sqlite3.Error as e:
+            logger.warning("Shared state read failed: %s", e)
+            return {}
+
+    def clear(self, namespace: str):
+        self._enqueue(("DELETE FROM kv WHERE namespace = ?", (namespace,)))
+
+    # --- Statistics ---
+
+    def record_timing(self, name: str, elapsed_ms: float):
+        self._enqueue((STAT_SQL, (name, elapsed_ms, elapsed_ms)))
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Timing counters summed over every worker of every run sharing the
+        database, until ``reset_stats``.
+        """
+        try:
+            rows = self._conn().execute(
+                "SELECT name, count, total_ms, max_ms FROM stats ORDER BY name"
+            )
+            return {
+                name: {
+                    "count": count,
+                    "avg_ms": round(total / count, 1),
+                    "max_ms": round(max_ms, 1),
+                }
+                for name, count, total, max_ms in rows
+            }
+        except sqlite3.Error as e:
+            logger.warning("Shared state read failed: %s", e)
+            return {}
+
+    def add_counts(self, counts: Dict[str, int]):
+        """
+        Adds ``counts`` to the shared counters, e.g. a worker's totals at
+        session end.
+        """
+        for name, value in counts.items():
+            if value:
+                self._enqueue((COUNT_SQL, (name, value)))
+
+    def counters(self, prefix: str = "") -> Dict[str, int]:
+        try:
+            rows = self._conn().execute(
+                "SELECT name, value FROM counters WHERE substr(name, 1, ?) = ? "
+                "ORDER BY name",
+                (len(prefix), prefix),
+            )
+            return dict(rows)
+        except sqlite3.Error as e:
+            logger.warning("Shared state read failed: %s", e)
+            return {}
+
+    def reset_stats(self):
+        self._enqueue(("DELETE FROM stats", ()))
+        self._enqueue(("DELETE FROM counters", ()))
+
+    def purge_expired(self):
+        self._enqueue(("DELETE FROM kv WHERE expires_at < ?", (time.time(),)))
+
+    # --- Writer ---
+
+    def _enqueue(self, item):
+        if self._closed:
+            return
+        try:
+            self._ensure_ready()
+            self._queue.put_nowait(item)
+        except queue.Full:
+            logger.warning("Shared state queue is full; dropping write")
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Shared state unavailable: %s", e)
+
+    def flush(self, timeout: float = 10.0):
+        if not self._ready or self._closed:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self, timeout: float = 10.0):
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                logger.warning("Shared state queue is full at close")
+                self._stopping.set()
+            self._writer.join(timeout)
+
+    def _run(self):
+        conn = _connect(self.path)
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            # Drain whatever else is queued so bursts land in one transaction
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            statements, waiters = [], []
+            for item in batch:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    statements.append(item)
+            try:
+                # Applied in queue order: a reset must not overtake writes
+                with conn:
+                    for sql, params in statements:
+                        conn.execute(sql, params)
+            except sqlite3.Error:
+                logger.exception("Failed to write shared state batch")
+            for waiter in waiters:
+                waiter.set()
+            if self._stopping.is_set():
+                stop = True
+        conn.close()
+
+
+class _DisabledState(SharedState):
+    """
+    Stand-in used with HEALER_SHARED_STATE=0: nothing is shared.
+    """
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        return None
+
+    def values(self, namespace: str) -> Dict[str, str]:
+        return {}
+
+    def _enqueue(self, item):
+        pass
+
+    def stats(self) -> Dict[str, dict]:
+        return {}
+
+    def counters(self, prefix: str = "") -> Dict[str, int]:
+        return {}
+
+
+shared_state: SharedState = (
+    SharedState(Path(os.getenv("HEALER_SHARED_DIR", str(DEFAULT_DIR))))
+    if shared_state_enabled()
+    else _DisabledState()
+)
+atexit.register(shared_state.close)
@@ -1,9 +1,12 @@
+from dataclasses import dataclass
+from typing import Iterator, Optional
+import re
 import yaml
+from adapter.selfheal.artifact_store import read_artifact_text
 
 
 def load_snapshot(path: str) -> list:
-    with open(path, "r") as f:
-        return yaml.safe_load(f)
+    return yaml.safe_load(read_artifact_text(path))
 
 
 def find_elements_by_text(snapshot: list, text: str) -> list:
@@ -30,3 +33,58 @@ def find_elements_by_text(snapshot: list, text: str) -> list:
 
     walk(snapshot)
     return matches
+
+
+SNAPSHOT_NODE_RE = re.compile(
+    r'^\s*(?:-\s*)?(?P<role>[a-zA-Z]+)(?:\s+"(?P<name>(?:[^"\\]|\\.)*)")?'
+)
+
+
+@dataclass(frozen=True)
+class SnapshotNode:
+    role: str
+    name: Optional[str]
+    landmark: Optional[str]  # top-level ancestor role
+    parent: Optional[str]  # direct parent role
+
+
+def _parse_node(entry: str) -> tuple[Optional[str], Optional[str]]:
+    m = SNAPSHOT_NODE_RE.match(entry)
+    if not m:
+        return None, None
+    name = m.group("name")
+    return m.group("role"), name.replace('\\"', '"') if name else None
+
+
+def iter_snapshot_nodes(snapshot) -> Iterator[SnapshotNode]:
+    """
+    Flattens an aria snapshot into (role, name, landmark, parent) nodes.
+    ``text: ...`` entries become nodes with role ``text``.
+    """
+
+    def walk(node, landmark=None, parent=None):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if not isinstance(key, str) or key.startswith("/"):
+                    continue
+                role, name = _parse_node(key)
+                if role == "text" and isinstance(value, str):
+                    yield SnapshotNode("text", value, landmark, parent)
+                    continue
+                if role is None:
+                    continue
+                if name is None and isinstance(value, str):
+                    # `- button: Submit` carries the name as the value
+                    name = value
+                yield SnapshotNode(role, name, landmark, parent)
+                if not isinstance(value, str):
+                    yield from walk(value, landmark or role, role)
+        elif isinstance(node, list):
+            for item in node:
+                yield from walk(item, landmark, parent)
+        elif isinstance(node, str):
+            role, name = _parse_node(node)
+            if role is not None:
+                yield SnapshotNode(role, name, landmark, parent)
+
+    yield from walk(snapshot)
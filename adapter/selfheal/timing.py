@@ -0,0 +1,30 @@
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock durations (in ms) per heal pipeline stage.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.durations: dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name: str, elapsed_ms: float):
+        self.durations[name] = self.durations.get(name, 0.0) + elapsed_ms
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def as_dict(self) -> dict[str, float]:
+        return {name: round(ms, 3) for name, ms in self.durations.items()}
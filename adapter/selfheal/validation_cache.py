@@ -0,0 +1,132 @@
+"""
+Short-lived cache of browser validation outcomes.
+
+Validating a candidate that matches nothing costs the whole ``wait_for``
+timeout. Retried heals and tests sharing a page validate the same
+candidates against the same page state, so outcomes are remembered by
+(canonical locator, URL, page structure hash). The structure hash is the
+content hash of the failure's a11y (else DOM) snapshot, which the artifact
+store already encodes in blob names. Entries expire after
+HEALER_VALIDATION_CACHE_TTL_S and are dropped when the page navigates.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+import os
+import threading
+import time
+
+from adapter.selfheal.artifact_store import content_hash, read_artifact_text, store
+from adapter.selfheal.models import CoreLocator, ValidationResult
+from rule_engine.models import FailureContext
+
+CacheKey = Tuple[str, Optional[str], str]
+
+
+def snapshot_hash(path: Optional[str]) -> Optional[str]:
+    if not path:
+        return None
+    path = Path(path)
+    if path.is_relative_to(store.blob_dir):
+        return path.name.split(".", 1)[0]
+    try:
+        return content_hash(read_artifact_text(path).encode("utf-8"))
+    except OSError:
+        return None
+
+
+def page_state(context: FailureContext) -> Optional[Tuple[Optional[str], str]]:
+    """
+    (URL, structure hash) of the page a heal validates against, or None
+    when no snapshot identifies its state.
+    """
+    artifacts = context.artifacts
+    digest = snapshot_hash(artifacts.a11y_snapshot) or snapshot_hash(
+        artifacts.dom_snapshot
+    )
+    if digest is None:
+        return None
+    return context.url, digest
+
+
+def validation_cache_enabled() -> bool:
+    return os.getenv("HEALER_VALIDATION_CACHE", "1").lower() not in ("0", "false", "no")
+
+
+class ValidationCache:
+    """
+    Outcomes (match count and error) by candidate and page state, LRU
+    bounded. Only definite outcomes are kept: a count, or a timeout
+    waiting for the candidate; other errors (a closed page) are retried.
+    """
+
+    def __init__(self, ttl_s: float = 60.0, max_entries: int = 2048):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[float, int, Optional[str]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(locator: CoreLocator, state) -> Optional[CacheKey]:
+        if state is None or not validation_cache_enabled():
+            return None
+        url, digest = state
+        return locator.canonical, url, digest
+
+    def get(self, locator: CoreLocator, state) -> Optional[ValidationResult]:
+        key = self.key(locator, state)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+        _, count, error = entry
+        return ValidationResult(
+            locator=locator,
+            locator_rank=locator.rank,
+            count=count,
+            is_unique=count == 1,
+            error=error,
+        )
+
+    def put(self, result: ValidationResult, state):
+        key = self.key(result.locator, state)
+        if key is None or self.ttl_s <= 0:
+            return
+        if result.error is not None and "Timeout" not in result.error:
+            return
+        entry = (time.monotonic() + self.ttl_s, result.count, result.error)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, url: Optional[str] = None) -> int:
+        """
+        Drops the entries for ``url``, or all entries. Returns how many.
+        """
+        with self._lock:
+            if url is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            stale = [key for key in self._entries if key[1] == url]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+
+validation_cache = ValidationCache(
+    ttl_s=float(os.getenv("HEALER_VALIDATION_CACHE_TTL_S", 60))
+)
@@ -1,14 +1,24 @@
+from typing import List
+import logging
 from playwright.sync_api import Page, Locator
-from adapter.selfheal.models import LocatorDescriptor, ValidationResult
+from adapter.selfheal.models import (
+    CoreLocator,
+    LocatorDescriptor,
+    ValidationResult,
+    as_core,
+)
 from adapter.selfheal.retry import build_locator
 
+logger = logging.getLogger(__name__)
+
 
 def validate_locator_uniqueness(
-    page: Page, locator_exp: LocatorDescriptor, timeout: int = 2000
+    page: Page, locator_exp: CoreLocator | LocatorDescriptor, timeout: int = 2000
 ) -> ValidationResult:
     """
     Executes a Playwright locator expression and validates uniqueness.
     """
+    locator_exp = as_core(locator_exp)
 
     try:
         # Evaluate locator expression safely
@@ -35,3 +45,123 @@ def validate_locator_uniqueness(
             is_unique=False,
             error=str(e),
         )
+
+
+# Role, accessible name, visibility and role-bearing ancestors of every
+# element a locator matches, approximating Playwright's role engine
+MATCH_FACTS_JS = """
+(elements) => {
+    const LANDMARKS = new Set([
+        "banner", "complementary", "contentinfo", "form", "main",
+        "navigation", "region", "search",
+    ]);
+    const NAME_FROM_CONTENT = new Set([
+        "button", "cell", "checkbox", "columnheader", "heading", "link",
+        "menuitem", "option", "radio", "row", "switch", "tab", "treeitem",
+    ]);
+    const INPUT_ROLES = {
+        checkbox: "checkbox", radio: "radio", button: "button",
+        submit: "button", reset: "button", image: "button",
+        range: "slider", number: "spinbutton", search: "searchbox",
+    };
+    const squash = (text) => (text || "").replace(/\\s+/g, " ").trim();
+    const labelOf = (el) => {
+        const ids = el.getAttribute("aria-labelledby");
+        if (ids) {
+            return squash(ids.split(/\\s+/)
+                .map((id) => document.getElementById(id))
+                .filter(Boolean).map((e) => e.textContent).join(" "));
+        }
+        return squash(el.getAttribute("aria-label"));
+    };
+    const roleOf = (el) => {
+        const explicit = el.getAttribute("role");
+        if (explicit) return explicit.split(/\\s+/)[0];
+        const tag = el.tagName.toLowerCase();
+        switch (tag) {
+            case "a": case "area": return el.hasAttribute("href") ? "link" : null;
+            case "button": return "button";
+            case "input":
+                return INPUT_ROLES[(el.type || "text").toLowerCase()] || "textbox";
+            case "textarea": return "textbox";
+            case "select": return el.multiple || el.size > 1 ? "listbox" : "combobox";
+            case "option": return "option";
+            case "img": return el.getAttribute("alt") === "" ? null : "img";
+            case "h1": case "h2": case "h3": case "h4": case "h5": case "h6":
+                return "heading";
+            case "nav": return "navigation";
+            case "main": return "main";
+            case "aside": return "complementary";
+            case "header":
+                return el.closest("article, aside, main, nav, section") ? null : "banner";
+            case "footer":
+                return el.closest("article, aside, main, nav, section") ? null : "contentinfo";
+            case "form": return labelOf(el) ? "form" : null;
+            case "section": return labelOf(el) ? "region" : null;
+            case "search": return "search";
+            case "dialog": return "dialog";
+            case "ul": case "ol": return "list";
+            case "li": return "listitem";
+            case "table": return "table";
+            case "tr": return "row";
+            case "td": return "cell";
+            case "th": return "columnheader";
+            case "fieldset": return "group";
+            case "article": return "article";
+            default: return null;
+        }
+    };
+    const nameOf = (el, role) => {
+        const label = labelOf(el);
+        if (label) return label;
+        if (el.labels && el.labels.length) {
+            return squash([...el.labels].map((l) => l.textContent).join(" "));
+        }
+        if (el.tagName === "FIELDSET") {
+            const legend = el.querySelector(":scope > legend");
+            if (legend) return squash(legend.textContent);
+        }
+        const alt = el.getAttribute("alt");
+        if (alt) return squash(alt);
+        if (el.tagName === "INPUT" && ["submit", "button", "reset"].includes(el.type)) {
+            return squash(el.value);
+        }
+        if (role && NAME_FROM_CONTENT.has(role)) return squash(el.textContent);
+        return squash(el.getAttribute("title") || el.getAttribute("placeholder"));
+    };
+    return elements.map((el, index) => {
+        const role = roleOf(el);
+        const ancestors = [];
+        for (let p = el.parentElement; p && p !== document.documentElement; p = p.parentElement) {
+            const r = roleOf(p);
+            if (r && r !== "presentation" && r !== "none") {
+                ancestors.push({role: r, name: nameOf(p, r), landmark: LANDMARKS.has(r)});
+            }
+        }
+        return {
+            index,
+            role,
+            name: nameOf(el, role),
+            visible: el.getClientRects().length > 0,
+            ancestors,
+        };
+    });
+}
+"""
+
+
+def collect_match_facts(page: Page, locator_exp: LocatorDescriptor) -> List[dict]:
+    """
+    Facts about every element ``locator_exp`` matches, in document order,
+    gathered in one ``evaluate_all`` round trip. Empty when the locator
+    cannot be evaluated.
+    """
+    try:
+        return build_locator(page, locator_exp).evaluate_all(MATCH_FACTS_JS)
+    except Exception as e:
+        logger.info(
+            "Unable to collect matches of %s: %s",
+            locator_exp.to_playwright(),
+            e,
+        )
+        return []
@@ -0,0 +1,157 @@
+"""
+Offline fitting of candidate scoring weights from heal history.
+
+Training examples come from the heal history store. A candidate the
+healer accepted is a success when its test then passed and a failure when
+it failed; candidates that did not resolve to exactly one element are
+failures. Unique candidates that were not chosen are left out, as nothing
+says whether their test would have passed. A logistic regression over the
+scoring features is
+fitted with NumPy and rescaled so that a rank of 100 (the healer's
+acceptance threshold) corresponds to a 50% predicted success rate.
+
+    python -m adapter.selfheal.weight_fitting --db test_artifacts/heal_history.sqlite3
+"""
+
+import argparse
+import logging
+import sqlite3
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Optional
+
+import numpy as np
+import yaml
+
+from adapter.selfheal.heal_history import DEFAULT_DB_PATH
+from adapter.selfheal.score_engine import (
+    ONE_HOT_GROUPS,
+    WEIGHTS_PATH,
+    ScoringModel,
+    group_value,
+)
+
+logger = logging.getLogger(__name__)
+
+# rank = ACCEPT_RANK + RANK_PER_LOGIT * logit(p)
+ACCEPT_RANK = 100.0
+RANK_PER_LOGIT = 20.0
+MIN_SAMPLES = 20
+
+
+def load_outcomes(db_path: Path, since_days: Optional[float] = None):
+    """
+    Returns (candidates, labels) from the heal_candidates table, labelled
+    by the outcome of the test their heal belongs to.
+    """
+    sql = (
+        "SELECT c.strategy, c.role, c.name, c.landmark, c.exact, c.source, "
+        "c.confidence, c.chosen AND h.test_outcome = 'passed' "
+        "FROM heal_candidates c JOIN heals h ON h.failure_id = c.failure_id "
+        "WHERE ((c.chosen AND h.healed AND h.test_outcome IS NOT NULL) "
+        "OR NOT c.is_unique)"
+    )
+    params: list = []
+    if since_days is not None:
+        sql += " AND h.recorded_at >= strftime('%s', 'now') - ?"
+        params.append(since_days * 86400)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    candidates = [
+        SimpleNamespace(
+            strategy=strategy,
+            role=role,
+            name=name,
+            landmark=landmark,
+            exact=bool(exact),
+            source=source,
+            confidence=confidence or 0.0,
+        )
+        for strategy, role, name, landmark, exact, source, confidence, _ in rows
+    ]
+    labels = np.array([row[-1] for row in rows], dtype=np.float64)
+    return candidates, labels
+
+
+def _vocab_for(base: ScoringModel, candidates: List) -> dict:
+    """
+    Extends the current vocabulary with values seen in the history.
+    """
+    vocab = {group: list(base.vocab.get(group, [])) for group in ONE_HOT_GROUPS}
+    for group in ONE_HOT_GROUPS:
+        seen = set(vocab[group])
+        for candidate in candidates:
+            value = group_value(candidate, group)
+            if value and value not in seen:
+                seen.add(value)
+                vocab[group].append(value)
+    return vocab
+
+
+def fit_weights(
+    candidates: List,
+    labels: np.ndarray,
+    base: Optional[ScoringModel] = None,
+    l2: float = 0.1,
+    learning_rate: float = 0.5,
+    iterations: int = 2000,
+) -> ScoringModel:
+    """
+    Fits an L2-regularised logistic regression with batch gradient descent.
+    """
+    if len(candidates) < MIN_SAMPLES:
+        raise ValueError(
+            f"Need at least {MIN_SAMPLES} recorded candidates, got {len(candidates)}"
+        )
+    if labels.min() == labels.max():
+        raise ValueError("Heal history has only successes or only failures")
+
+    base = base or ScoringModel.from_yaml()
+    model = ScoringModel(_vocab_for(base, candidates))
+    x = model.features(candidates)
+    n, d = x.shape
+    w = np.zeros(d)
+    b = 0.0
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-(x @ w + b)))
+        error = p - labels
+        w -= learning_rate * (x.T @ error / n + l2 * w / n)
+        b -= learning_rate * error.mean()
+
+    p = 1.0 / (1.0 + np.exp(-(x @ w + b)))
+    accuracy = float(((p >= 0.5) == (labels >= 0.5)).mean())
+    logger.info("Fitted %s weights on %s candidates, accuracy %.3f", d, n, accuracy)
+
+    model.weights = w * RANK_PER_LOGIT
+    model.bias = ACCEPT_RANK + b * RANK_PER_LOGIT
+    return model
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Fit candidate scoring weights from heal history"
+    )
+    parser.add_argument("--db", default=str(DEFAULT_DB_PATH))
+    parser.add_argument("--out", default=str(WEIGHTS_PATH))
+    parser.add_argument("--since-days", type=float, default=None)
+    parser.add_argument("--l2", type=float, default=0.1)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Print the weights instead of writing"
+    )
+    args = parser.parse_args(argv)
+
+    candidates, labels = load_outcomes(Path(args.db), args.since_days)
+    model = fit_weights(candidates, labels, l2=args.l2)
+    if args.dry_run:
+        print(yaml.safe_dump(model.to_dict(), sort_keys=False))
+    else:
+        model.to_yaml(Path(args.out))
+        print(f"Wrote {len(model.feature_names)} weights to {args.out}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
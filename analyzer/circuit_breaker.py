@@ -0,0 +1,383 @@
+"""
+Circuit breaker around LLM calls.
+
+Each model has its own breaker, so a missing or failing model only opens
+its own circuit and the other tiers keep answering. Calls of every model
+run on one small bounded pool, shared by every thread of the process, so
+they can be abandoned after a timeout. A call first waits for a
+free worker; that wait is not part of its timeout or its latency. Async
+calls are aborted when they time out or their caller cancels them, which
+frees the worker at once instead of when the request would have ended.
+Outcomes go into a rolling window; when too many recent calls fail or are
+slow, the breaker opens and LLM escalation is skipped for a
+cool-down period. After that, a limited number of half-open probe calls
+decide whether to close it again.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import inspect
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# How often a running call checks whether it was cancelled
+ABORT_POLL_S = 0.05
+
+
+class CircuitState(str, Enum):
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the LLM while the breaker is open.
+    """
+
+
+class LLMTimeoutError(Exception):
+    """
+    Raised when a single LLM call exceeds its timeout.
+    """
+
+
+class CallCancelledError(Exception):
+    """
+    Raised when the caller cancelled an LLM call before it finished.
+    """
+
+
+def _run_abortable(fn: Callable[..., Any], args: tuple, abort: threading.Event):
+    """
+    Runs the coroutine function ``fn`` in an event loop of its own and
+    cancels it, closing its request, as soon as ``abort`` is set.
+    """
+
+    async def run():
+        task = asyncio.ensure_future(fn(*args))
+        while not task.done():
+            if abort.is_set():
+                task.cancel()
+            await asyncio.wait({task}, timeout=ABORT_POLL_S)
+        return task.result()
+
+    return asyncio.run(run())
+
+
+@dataclass(frozen=True)
+class BreakerConfig:
+    timeout_s: float = 60.0
+    window: int = 20
+    min_calls: int = 4
+    error_rate: float = 0.5
+    slow_ms: float = 30_000.0
+    slow_rate: float = 0.8
+    cooldown_s: float = 60.0
+    half_open_probes: int = 1
+    max_workers: int = 2
+
+    @classmethod
+    def from_env(cls) -> "BreakerConfig":
+        return cls(
+            timeout_s=float(os.getenv("HEALER_LLM_TIMEOUT_S", cls.timeout_s)),
+            window=int(os.getenv("HEALER_LLM_WINDOW", cls.window)),
+            min_calls=int(os.getenv("HEALER_LLM_MIN_CALLS", cls.min_calls)),
+            error_rate=float(os.getenv("HEALER_LLM_ERROR_RATE", cls.error_rate)),
+            slow_ms=float(os.getenv("HEALER_LLM_SLOW_MS", cls.slow_ms)),
+            slow_rate=float(os.getenv("HEALER_LLM_SLOW_RATE", cls.slow_rate)),
+            cooldown_s=float(os.getenv("HEALER_LLM_COOLDOWN_S", cls.cooldown_s)),
+            half_open_probes=int(
+                os.getenv("HEALER_LLM_HALF_OPEN_PROBES", cls.half_open_probes)
+            ),
+            max_workers=int(os.getenv("HEALER_LLM_WORKERS", cls.max_workers)),
+        )
+
+
+@dataclass(frozen=True)
+class Admission:
+    """
+    The state a call was admitted in. ``period`` changes with every state
+    transition, so an outcome arriving after one is recognized as stale.
+    """
+
+    state: CircuitState
+    period: int
+
+
+class CallPool:
+    """
+    Workers for LLM calls, with one slot per worker held from submit until
+    the call finishes, timed out or not.
+    """
+
+    def __init__(self, max_workers: int):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="llm-call"
+        )
+        self.slots = threading.BoundedSemaphore(max_workers)
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        config: Optional[BreakerConfig] = None,
+        clock=time.monotonic,
+        pool: Optional[CallPool] = None,
+        name: str = "LLM",
+    ):
+        self.config = config or BreakerConfig()
+        self.name = name
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (ok, latency_ms) per completed call
+        self._window: deque[tuple[bool, float]] = deque(maxlen=self.config.window)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._period = 0
+        self._trips = 0
+        self._rejected = 0
+        self._saturated = 0
+        self._pool = pool or CallPool(self.config.max_workers)
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> CircuitState:
+        if (
+            self._state == CircuitState.OPEN
+            and self._clock() - self._opened_at >= self.config.cooldown_s
+        ):
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: CircuitState):
+        if state == self._state:
+            return
+        logger.warning(
+            "%s circuit %s -> %s", self.name, self._state.value, state.value
+        )
+        self._state = state
+        self._period += 1
+        if state == CircuitState.OPEN:
+            self._opened_at = self._clock()
+            self._trips += 1
+        elif state == CircuitState.HALF_OPEN:
+            self._probes_in_flight = 0
+        elif state == CircuitState.CLOSED:
+            self._window.clear()
+
+    def allow(self) -> Optional[Admission]:
+        """
+        Reserves a call slot; half-open admits only a few probes at a time.
+        Returns the call's admission, or None when it is rejected.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CircuitState.CLOSED:
+                return Admission(state, self._period)
+            if (
+                state == CircuitState.HALF_OPEN
+                and self._probes_in_flight < self.config.half_open_probes
+            ):
+                self._probes_in_flight += 1
+                return Admission(state, self._period)
+            self._rejected += 1
+            return None
+
+    def record(self, ok: bool, latency_ms: float, admission: Admission):
+        """
+        Counts a call's outcome in the state it was admitted in. Outcomes
+        of calls admitted before the last transition are dropped: a call
+        let in while CLOSED is no probe of a later half-open breaker.
+        """
+        with self._lock:
+            if admission.period != self._period:
+                return
+            if admission.state == CircuitState.HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                slow = latency_ms >= self.config.slow_ms
+                self._transition(
+                    CircuitState.CLOSED if ok and not slow else CircuitState.OPEN
+                )
+                return
+            self._window.append((ok, latency_ms))
+            if self._should_trip():
+                self._transition(CircuitState.OPEN)
+
+    def _should_trip(self) -> bool:
+        calls = len(self._window)
+        if calls < self.config.min_calls:
+            return False
+        errors = sum(1 for ok, _ in self._window if not ok)
+        slow = sum(1 for _, ms in self._window if ms >= self.config.slow_ms)
+        return (
+            errors / calls >= self.config.error_rate
+            or slow / calls >= self.config.slow_rate
+        )
+
+    def _abandon(self, admission: Admission):
+        """
+        A cancelled call tells nothing about the LLM; only its probe slot
+        is given back.
+        """
+        with self._lock:
+            if (
+                admission.state == CircuitState.HALF_OPEN
+                and admission.period == self._period
+            ):
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def call(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        cancelled: Optional[threading.Event] = None,
+    ):
+        """
+        Runs ``fn`` under the breaker with a hard timeout. Waiting up to
+        ``timeout`` for a free worker is not held against the LLM. A
+        coroutine function is aborted on timeout or once ``cancelled`` is
+        set; a plain function keeps running on its worker, its result
+        discarded.
+        """
+        timeout = self.config.timeout_s if timeout is None else timeout
+        if self.state == CircuitState.OPEN:
+            with self._lock:
+                self._rejected += 1
+            raise CircuitOpenError(f"{self.name} circuit is OPEN; skipping call")
+        slots = self._pool.slots
+        if not slots.acquire(timeout=timeout):
+            with self._lock:
+                self._saturated += 1
+            raise LLMTimeoutError(f"No free LLM worker within {timeout:.1f}s")
+        if cancelled is not None and cancelled.is_set():
+            slots.release()
+            raise CallCancelledError(f"{self.name} call cancelled")
+        admission = self.allow()
+        if admission is None:
+            slots.release()
+            raise CircuitOpenError(
+                f"{self.name} circuit is {self.state.value}; skipping call"
+            )
+        abort = threading.Event()
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(fn):
+                future = self._pool.executor.submit(_run_abortable, fn, args, abort)
+            else:
+                future = self._pool.executor.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise FutureTimeout()
+                try:
+                    result = future.result(
+                        timeout=remaining if cancelled is None else ABORT_POLL_S
+                    )
+                    break
+                except FutureTimeout:
+                    if cancelled is not None and cancelled.is_set():
+                        abort.set()
+                        future.cancel()
+                        self._abandon(admission)
+                        raise CallCancelledError(f"{self.name} call cancelled")
+        except FutureTimeout:
+            abort.set()
+            future.cancel()
+            self.record(False, (time.perf_counter() - start) * 1000, admission)
+            raise LLMTimeoutError(f"LLM call exceeded {timeout:.1f}s") from None
+        except CallCancelledError:
+            raise
+        except Exception:
+            self.record(False, (time.perf_counter() - start) * 1000, admission)
+            raise
+        self.record(True, (time.perf_counter() - start) * 1000, admission)
+        return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._window)
+            latencies = sorted(ms for _, ms in self._window)
+            errors = sum(1 for ok, _ in self._window if not ok)
+            retry_in = (
+                max(self.config.cooldown_s - (self._clock() - self._opened_at), 0.0)
+                if state == CircuitState.OPEN
+                else 0.0
+            )
+            return {
+                "state": state.value,
+                "calls": calls,
+                "error_rate": round(errors / calls, 3) if calls else 0.0,
+                "p50_ms": round(latencies[calls // 2], 1) if calls else None,
+                "p95_ms": (
+                    round(latencies[min(int(calls * 0.95), calls - 1)], 1)
+                    if calls
+                    else None
+                ),
+                "trips": self._trips,
+                "rejected": self._rejected,
+                "saturated": self._saturated,
+                "retry_in_s": round(retry_in, 1),
+            }
+
+
+class ModelBreakers:
+    """
+    One breaker per model, all sharing one call pool.
+    """
+
+    def __init__(self, config: Optional[BreakerConfig] = None, clock=time.monotonic):
+        self.config = config or BreakerConfig()
+        self._clock = clock
+        self.pool = CallPool(self.config.max_workers)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None:
+                breaker = self._breakers[model] = CircuitBreaker(
+                    self.config, self._clock, self.pool, name=f"LLM {model}"
+                )
+            return breaker
+
+    def snapshot(self) -> dict:
+        """
+        ``state`` is CLOSED while any model is, OPEN once all are; the
+        breakers themselves are under ``models``.
+        """
+        with self._lock:
+            breakers = dict(self._breakers)
+        models = {model: breaker.snapshot() for model, breaker in breakers.items()}
+        states = {snap["state"] for snap in models.values()}
+        if not states or CircuitState.CLOSED.value in states:
+            state = CircuitState.CLOSED.value
+        elif CircuitState.HALF_OPEN.value in states:
+            state = CircuitState.HALF_OPEN.value
+        else:
+            state = CircuitState.OPEN.value
+        return {"state": state, "models": models}
+
+
+llm_breakers = ModelBreakers(BreakerConfig.from_env())
@@ -1,12 +1,24 @@
 import json
-from typing import Any
+from pathlib import Path
+from typing import Any, Optional
 from langchain.messages import HumanMessage, SystemMessage
-from langchain_ollama import ChatOllama
+from adapter.selfheal.artifact_store import content_hash, read_artifact_text, store
+from adapter.selfheal.concurrency import Coalescer
+from adapter.selfheal.shared_state import shared_state
+from analyzer.model_router import ModelTier, model_router
 import logging
+import os
 import re
+import threading
 
 logger = logging.getLogger(__name__)
-llm = ChatOllama(model="llama3.1:8b", temperature=0)
+
+# Tiers run at temperature 0, so an answer can be reused by every worker
+LLM_CACHE_NAMESPACE = "llm"
+LLM_CACHE_TTL_S = float(os.getenv("HEALER_LLM_CACHE_TTL_S", 7 * 86400))
+
+# Identical prompts asked by concurrent heals share one call
+in_flight_prompts = Coalescer("LLM call")
 
 
 def sanitize_llm_json(raw: str) -> Any:
@@ -43,12 +55,25 @@ def sanitize_llm_json(raw: str) -> Any:
         ) from e
 
 
-def analyze_with_llm(snapshot_path: str, selector: str):
+def build_prompt(
+    snapshot_path: str,
+    selector: str,
+    scope_text: Optional[str] = None,
+    previous_match: Optional[str] = None,
+) -> tuple[str, str]:
     """
-    Calls LLM and returns structured decision.
+    Returns the (system, user) prompt pair for a snapshot and selector.
+    With ``scope_text`` only that part of the snapshot (the regions changed
+    since a passing run) is sent, along with what the selector matched then.
     """
-    with open(snapshot_path, "r", encoding="utf-8") as f:
-        text = f.read()
+    if scope_text is None:
+        text = read_artifact_text(snapshot_path)
+    else:
+        text = (
+            "(Only the parts of the page changed since the selector last "
+            f"worked; it then matched {previous_match or 'an unknown element'})"
+            f"\n{scope_text}"
+        )
 
     LLM_SYSTEM_PROMPT = f"""
     You are a Playwright automation expert in python language.
@@ -108,14 +133,48 @@ def analyze_with_llm(snapshot_path: str, selector: str):
         "tool": "playwright",
         "original_selector": selector,
     }
+    return LLM_SYSTEM_PROMPT, json.dumps(prompt)
 
-    llm_response_text = call_llm(system=LLM_SYSTEM_PROMPT, user=json.dumps(prompt))
-    logger.info(f"LLM Response: {llm_response_text}")
+
+def analyze_with_llm(
+    snapshot_path: str, selector: str, tier: Optional[ModelTier] = None
+):
+    """
+    Calls LLM and returns structured decision.
+    """
+    system, user = build_prompt(snapshot_path, selector)
+    return analyze_prompt(system, user, tier)
+
+
+def analyze_prompt(
+    system: str,
+    user: str,
+    tier: Optional[ModelTier] = None,
+    failure_id: Optional[str] = None,
+    cancelled: Optional[threading.Event] = None,
+):
+    """
+    Asks the LLM and parses its answer. With ``failure_id`` the raw
+    response is stored with the failure's artifacts and only referenced in
+    the log by its content hash. Setting ``cancelled`` aborts the call.
+    """
+    llm_response_text = call_llm(
+        system=system, user=user, tier=tier, cancelled=cancelled
+    )
+    if failure_id is not None:
+        kind = f"llm_response:{tier.name}" if tier is not None else "llm_response"
+        path = store.put_text(failure_id, kind, llm_response_text, suffix=".txt")
+        logger.info(
+            "LLM response of %d chars stored as %s",
+            len(llm_response_text),
+            Path(path).name,
+        )
+    logger.debug("LLM Response: %s", llm_response_text)
     try:
         decision = sanitize_llm_json(llm_response_text)
     except json.JSONDecodeError as e:
         logger.error(e.msg)
-        logger.error(f"Line:  {e.lineno}, Column:, {e.colno}")
+        logger.error("Line:  %s, Column:, %s", e.lineno, e.colno)
         return {
             "action": "FLAG_FOR_REVIEW",
             "details": {},
@@ -125,9 +184,28 @@ def analyze_with_llm(snapshot_path: str, selector: str):
     return decision
 
 
-def call_llm(system: str, user: str) -> str:
-    sys_msg = SystemMessage(system)
-    user_msg = HumanMessage(user)
-    messages = [sys_msg, user_msg]
-    response = llm.invoke(messages)
-    return response.content
+def call_llm(
+    system: str,
+    user: str,
+    tier: Optional[ModelTier] = None,
+    cancelled: Optional[threading.Event] = None,
+) -> str:
+    if tier is None:
+        tier = model_router.tiers_for(len(system) + len(user))[0]
+    key = content_hash(f"{tier.model}\0{system}\0{user}".encode("utf-8"))
+    cached = shared_state.get(LLM_CACHE_NAMESPACE, key)
+    if cached is not None:
+        logger.info("Reusing cached LLM response from %s", tier.model)
+        return cached
+
+    def invoke() -> str:
+        messages = [SystemMessage(system), HumanMessage(user)]
+        response = model_router.invoke(tier, messages, cancelled)
+        shared_state.put(LLM_CACHE_NAMESPACE, key, response, LLM_CACHE_TTL_S)
+        return response
+
+    response, shared = in_flight_prompts.run(key, invoke)
+    if shared and response is None:
+        # The call we waited for failed; make our own
+        response = invoke()
+    return response
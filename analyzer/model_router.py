@@ -0,0 +1,171 @@
+"""
+Tiered LLM routing.
+
+Prompts go to the cheapest tier that can hold them; callers escalate to
+the next tier when a tier's answer is not good enough. Per-tier latency
+and acceptance are tracked so the tiers in ``models.yaml`` can be tuned.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+import os
+import threading
+import time
+
+import yaml
+from langchain_ollama import ChatOllama
+
+from adapter.selfheal.shared_state import shared_state
+from analyzer.circuit_breaker import CallCancelledError, llm_breakers
+from analyzer.warmup import warmup
+
+logger = logging.getLogger(__name__)
+
+MODELS_PATH = Path(__file__).with_name("models.yaml")
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    name: str
+    model: str
+    max_prompt_chars: Optional[int] = None
+    timeout_s: Optional[float] = None
+    temperature: float = 0
+
+
+class TierStats:
+    def __init__(self, window: int = 200):
+        self.calls = 0
+        self.errors = 0
+        self.evaluated = 0
+        self.accepted = 0
+        self.latencies: deque[float] = deque(maxlen=window)
+
+    def as_dict(self) -> dict:
+        latencies = sorted(self.latencies)
+        n = len(latencies)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(sum(latencies) / n, 1) if n else None,
+            "p95_ms": round(latencies[min(int(n * 0.95), n - 1)], 1) if n else None,
+            "acceptance_rate": (
+                round(self.accepted / self.evaluated, 3) if self.evaluated else None
+            ),
+        }
+
+
+class ModelRouter:
+    def __init__(self, tiers: List[ModelTier], min_confidence: float = 0.7):
+        if not tiers:
+            raise ValueError("At least one model tier is required")
+        self.tiers = tiers
+        self.min_confidence = min_confidence
+        self._stats = {tier.name: TierStats() for tier in tiers}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_yaml(cls, path: Path = MODELS_PATH) -> "ModelRouter":
+        with Path(path).open("r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+        tiers = [ModelTier(**tier) for tier in data.get("tiers", [])]
+        return cls(tiers, min_confidence=data.get("min_confidence", 0.7))
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        # OLLAMA_MODEL pins a single model and disables tiering
+        model = os.getenv("OLLAMA_MODEL")
+        if model:
+            return cls([ModelTier(name="default", model=model)])
+        return cls.from_yaml(Path(os.getenv("HEALER_MODELS_CONFIG", MODELS_PATH)))
+
+    def tiers_for(self, prompt_chars: int) -> List[ModelTier]:
+        """
+        Tiers able to take a prompt of this size, cheapest first. The last
+        tier is always kept so oversized prompts still get an answer.
+        """
+        tiers = [
+            tier
+            for tier in self.tiers
+            if tier.max_prompt_chars is None or prompt_chars <= tier.max_prompt_chars
+        ]
+        return tiers or self.tiers[-1:]
+
+    def client(self, tier: ModelTier, timeout: float) -> ChatOllama:
+        """
+        A client per call: its async HTTP client belongs to the event loop
+        the call runs in, and aborting the call closes it. ``timeout``
+        bounds the HTTP request itself.
+        """
+        return ChatOllama(
+            model=tier.model,
+            temperature=tier.temperature,
+            keep_alive=warmup.keep_alive,
+            client_kwargs={"timeout": timeout},
+        )
+
+    def invoke(
+        self, tier: ModelTier, messages, cancelled: Optional[threading.Event] = None
+    ) -> str:
+        """
+        Asks ``tier``; setting ``cancelled`` aborts the request and raises
+        ``CallCancelledError``.
+        """
+
+        timeout = tier.timeout_s or llm_breakers.config.timeout_s
+        # A model still loading is not a slow host; allow for the load time,
+        # in the HTTP request as well as in the breaker
+        loading_s = warmup.remaining_s(tier.model)
+        if loading_s:
+            logger.info("Model %s still warming, ~%.0fs left", tier.model, loading_s)
+            timeout += loading_s
+
+        async def request():
+            return await self.client(tier, timeout).ainvoke(messages)
+
+        start = time.perf_counter()
+        try:
+            response = llm_breakers.for_model(tier.model).call(
+                request, timeout=timeout, cancelled=cancelled
+            )
+        except CallCancelledError:
+            raise
+        except Exception:
+            with self._lock:
+                stats = self._stats[tier.name]
+                stats.calls += 1
+                stats.errors += 1
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            stats = self._stats[tier.name]
+            stats.calls += 1
+            stats.latencies.append(elapsed_ms)
+        shared_state.record_timing(f"llm:{tier.name}", elapsed_ms)
+        logger.info(
+            "LLM tier %s (%s) answered in %.0fms",
+            tier.name,
+            tier.model,
+            elapsed_ms,
+        )
+        return response.content
+
+    def needs_escalation(self, confidences: List[float]) -> bool:
+        return not confidences or all(c < self.min_confidence for c in confidences)
+
+    def record_outcome(self, tier_name: str, accepted: bool):
+        with self._lock:
+            stats = self._stats.get(tier_name)
+            if stats is not None:
+                stats.evaluated += 1
+                stats.accepted += int(accepted)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+
+model_router = ModelRouter.from_env()
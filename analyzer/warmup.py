@@ -0,0 +1,169 @@
+"""
+Background warm-up of the configured LLM models.
+
+Loading a model into Ollama's memory takes seconds; doing it during the
+first heal puts that cost inside a test. The warm-up thread loads the
+models of the cheapest HEALER_WARMUP_TIERS tiers at session start with a
+one-token request and then pings them so they stay resident; only one by
+default, so the larger models are not held in memory unless used. Heals
+consult ``remaining_s`` to know whether a model is warm or how much
+longer its load is expected to take, and extend their timeouts by it.
+"""
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional
+import logging
+import os
+import threading
+import time
+
+from langchain_ollama import ChatOllama
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState(str, Enum):
+    PENDING = "PENDING"
+    WARMING = "WARMING"
+    READY = "READY"
+    FAILED = "FAILED"
+
+
+@dataclass
+class ModelReadiness:
+    model: str
+    state: WarmupState = WarmupState.PENDING
+    started_at: Optional[float] = None
+    ready_at: Optional[float] = None
+    load_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+def warmup_enabled() -> bool:
+    return os.getenv("HEALER_WARMUP", "1").lower() not in ("0", "false", "no")
+
+
+def warmup_tiers() -> int:
+    return int(os.getenv("HEALER_WARMUP_TIERS", 1))
+
+
+class ModelWarmup:
+    def __init__(
+        self,
+        keep_alive: str = "15m",
+        ping_interval_s: float = 300.0,
+        expected_load_s: float = 15.0,
+    ):
+        self.keep_alive = keep_alive
+        self.ping_interval_s = ping_interval_s
+        self.expected_load_s = expected_load_s
+        self._models: Dict[str, ModelReadiness] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "ModelWarmup":
+        return cls(
+            keep_alive=os.getenv("HEALER_LLM_KEEP_ALIVE", "15m"),
+            ping_interval_s=float(os.getenv("HEALER_WARMUP_PING_S", 300)),
+            expected_load_s=float(os.getenv("HEALER_WARMUP_EXPECTED_S", 15)),
+        )
+
+    def start(self, models: List[str]):
+        if self._thread is not None:
+            return
+        with self._lock:
+            for model in dict.fromkeys(models):
+                self._models.setdefault(model, ModelReadiness(model))
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="llm-warmup", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _ping(self, model: str):
+        client = ChatOllama(
+            model=model,
+            num_predict=1,
+            keep_alive=self.keep_alive,
+            client_kwargs={"timeout": max(self.expected_load_s * 8, 60)},
+        )
+        client.invoke("ok")
+
+    def _warm(self, model: str):
+        with self._lock:
+            readiness = self._models[model]
+            readiness.state = WarmupState.WARMING
+            readiness.started_at = time.monotonic()
+        start = time.perf_counter()
+        try:
+            self._ping(model)
+        except Exception as e:
+            logger.warning("Warm-up of %s failed: %s", model, e)
+            with self._lock:
+                readiness.state = WarmupState.FAILED
+                readiness.error = str(e)
+            return
+        load_ms = (time.perf_counter() - start) * 1000
+        logger.info("Model %s warm after %.0fms", model, load_ms)
+        with self._lock:
+            readiness.state = WarmupState.READY
+            readiness.ready_at = time.monotonic()
+            readiness.load_ms = load_ms
+            readiness.error = None
+
+    def _run(self):
+        # Cheapest model first: it serves the first heal
+        for model in list(self._models):
+            if self._stop.is_set():
+                return
+            self._warm(model)
+        # Keep-alive pings reset Ollama's unload timer; failed loads are retried
+        while not self._stop.wait(self.ping_interval_s):
+            for model, readiness in list(self._models.items()):
+                if readiness.state != WarmupState.READY:
+                    self._warm(model)
+                    continue
+                try:
+                    self._ping(model)
+                except Exception as e:
+                    logger.info("Keep-alive ping for %s failed: %s", model, e)
+
+    def remaining_s(self, model: str) -> float:
+        """
+        Expected seconds until ``model`` is loaded: 0 when warm or not
+        managed by the warm-up, otherwise the remaining expected load time.
+        """
+        with self._lock:
+            readiness = self._models.get(model)
+            if readiness is None or readiness.state in (
+                WarmupState.READY,
+                WarmupState.FAILED,
+            ):
+                return 0.0
+            if readiness.state == WarmupState.PENDING:
+                return self.expected_load_s
+            elapsed = time.monotonic() - readiness.started_at
+            return max(self.expected_load_s - elapsed, 1.0)
+
+    def status(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                model: {
+                    "state": r.state.value,
+                    "load_ms": round(r.load_ms, 1) if r.load_ms else None,
+                    "error": r.error,
+                }
+                for model, r in self._models.items()
+            }
+
+
+warmup = ModelWarmup.from_env()
@@ -1,20 +1,99 @@
 import pytest
 from playwright.sync_api import Page
 
+from adapter.selfheal.artifact_store import wait_for_pending_writes
+from adapter.selfheal.bundle import bundle_writer
+from adapter.selfheal.heal_events import EVENTS_PATH
+from adapter.selfheal.heal_history import close_history_store, record_test_outcome
+from adapter.selfheal.heal_report import HealReportPlugin
+from adapter.selfheal.orchestrator import collected_rule_stats, export_rule_stats
 from adapter.selfheal.page_proxy import HealingPage
+from adapter.selfheal.profiling import HealProfilePlugin
+from adapter.selfheal.retention import enforce_retention
 from adapter.selfheal.self_healer import SimpleSelfHealer
+from adapter.selfheal.shared_state import shared_state
+from analyzer.model_router import model_router
+from analyzer.warmup import warmup, warmup_enabled, warmup_tiers
 import logging
-from logging_config import setup_logging
+import os
+from logging_config import setup_logging, stop_logging
 from test_context import current_test
 
+logger = logging.getLogger(__name__)
+
 
 @pytest.hookimpl(tryfirst=True)
 def pytest_runtest_setup(item):
     current_test.set(item.nodeid)
 
 
-def pytest_configure():
-    setup_logging(level=logging.INFO)
+def pytest_runtest_logreport(report):
+    # Whether the test passed with its heals; labels them for weight fitting
+    if report.when == "call":
+        record_test_outcome(report.nodeid, report.outcome)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--healer-profile",
+        action="store_true",
+        default=False,
+        help="Profile heals with cProfile (same as HEALER_PROFILE=1)",
+    )
+
+
+def _is_xdist_worker(config) -> bool:
+    return hasattr(config, "workerinput")
+
+
+def _is_xdist_controller(config) -> bool:
+    return not _is_xdist_worker(config) and bool(
+        getattr(config.option, "numprocesses", None)
+    )
+
+
+def pytest_configure(config):
+    setup_logging(level=logging.INFO, events_file=str(EVENTS_PATH))
+    if config.getoption("healer_profile"):
+        os.environ["HEALER_PROFILE"] = "1"
+    if not os.getenv("HEALER_SHARED_DIR") and getattr(config, "cache", None):
+        shared_state.configure(config.cache.mkdir("ai-healer"))
+    if not _is_xdist_worker(config):
+        # Runs before xdist starts the workers
+        shared_state.purge_expired()
+        shared_state.reset_stats()
+        shared_state.flush()
+    config.pluginmanager.register(HealReportPlugin(), "healer-report")
+    config.pluginmanager.register(HealProfilePlugin(), "healer-profile")
+
+
+def pytest_collection_finish(session):
+    # Only processes that run healing tests need a model; the xdist
+    # controller runs no tests at all
+    if not warmup_enabled() or _is_xdist_controller(session.config):
+        return
+    if any("healer" in item.fixturenames for item in session.items):
+        # Loads the models off the critical path of the first heal
+        warmup.start([tier.model for tier in model_router.tiers[: warmup_tiers()]])
+
+
+def pytest_sessionfinish(session):
+    enforce_retention()
+    logger.info("LLM tier stats: %s", model_router.stats())
+    export_rule_stats()
+    shared_state.flush()
+    if not _is_xdist_worker(session.config):
+        logger.info("Heal timing stats (all workers): %s", shared_state.stats())
+        logger.info("Rule stats (all workers): %s", collected_rule_stats())
+
+
+def pytest_unconfigure():
+    warmup.stop()
+    close_history_store()
+    bundle_writer.flush()
+    wait_for_pending_writes()
+    shared_state.close()
+    stop_logging()
 
 
 @pytest.fixture(scope="session")
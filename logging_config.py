@@ -1,12 +1,64 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
 
 LOG_FORMAT = "%(asctime)s | %(levelname)-8s | " "%(name)s | %(message)s"
 
+# Structured heal events; written as JSON lines, never to the console
+EVENTS_LOGGER = "healer.events"
+
+_listener: Optional[QueueListener] = None
+
+
+def _is_event(record: logging.LogRecord) -> bool:
+    return record.name == EVENTS_LOGGER
+
+
+def _is_not_event(record: logging.LogRecord) -> bool:
+    return record.name != EVENTS_LOGGER
+
+
+def log_queue_enabled() -> bool:
+    return os.getenv("HEALER_LOG_QUEUE", "1").lower() not in ("0", "false", "no")
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    One JSON object per record: the record's ``event`` (passed through
+    ``extra``) when it has one, else its level, logger and message.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = getattr(record, "event", None)
+        if event is None:
+            event = {
+                "ts": record.created,
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+            }
+        return json.dumps(event, default=str, ensure_ascii=False)
+
 
 def setup_logging(
-    level=logging.INFO, log_to_file: bool = False, filename: str = "app.log"
+    level=logging.INFO,
+    log_to_file: bool = False,
+    filename: str = "app.log",
+    events_file: Optional[str] = None,
 ):
+    """
+    Installs the console (and optional file) handlers behind a queue: the
+    logging thread only enqueues records and a listener thread formats and
+    writes them. With ``events_file`` heal events are appended to it as
+    JSON lines. HEALER_LOG_QUEUE=0 writes synchronously instead.
+    """
+    global _listener
+    stop_logging()
     handlers = []
 
     console_handler = logging.StreamHandler(sys.stdout)
@@ -18,8 +70,70 @@ def setup_logging(
         file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
         handlers.append(file_handler)
 
+    events = logging.getLogger(EVENTS_LOGGER)
+    events.propagate = False
+    events.setLevel(logging.INFO)
+    event_handlers = []
+    if events_file:
+        events_handler = logging.FileHandler(events_file, delay=True)
+        events_handler.setFormatter(JsonLinesFormatter())
+        event_handlers.append(events_handler)
+
+    if log_queue_enabled():
+        records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        for handler in handlers:
+            handler.addFilter(_is_not_event)
+        for handler in event_handlers:
+            handler.addFilter(_is_event)
+        _listener = QueueListener(
+            records, *handlers, *event_handlers, respect_handler_level=True
+        )
+        _listener.start()
+        handlers = [_queue_handler(records)]
+        event_handlers = [_queue_handler(records)] if event_handlers else []
+
+    for handler in events.handlers:
+        handler.close()
+    events.handlers = event_handlers
     logging.basicConfig(
         level=level,
         handlers=handlers,
         force=True,  # IMPORTANT: overrides existing configs
     )
+
+
+def _queue_handler(records: queue.SimpleQueue) -> QueueHandler:
+    handler = QueueHandler(records)
+    # Only merges the arguments (and traceback) into the message; the
+    # listener's handlers apply the real format
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+
+def stop_logging():
+    """
+    Writes out the queued records and stops the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _after_fork_in_child():
+    # The listener thread does not survive a fork; write directly
+    global _listener
+    if _listener is None:
+        return
+    handlers = list(_listener.handlers)
+    _listener = None
+    logging.getLogger().handlers = handlers
+    events = logging.getLogger(EVENTS_LOGGER)
+    if events.handlers:
+        events.handlers = handlers
+
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -1,5 +1,86 @@
-def main():
-    print("Hello from ai-healer-framework!")
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from logging_config import setup_logging
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="AI healer framework")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reheal = commands.add_parser(
+        "reheal", help="Re-heal saved failure artifacts without a browser"
+    )
+    reheal.add_argument(
+        "directory",
+        type=Path,
+        help="Artifact store directory or a directory of failure folders",
+    )
+    reheal.add_argument("--out", type=Path, default=None, help="Report path (stdout)")
+    reheal.add_argument("--format", choices=["json", "csv"], default="json")
+    reheal.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (CPU count)"
+    )
+    reheal.add_argument(
+        "--llm", action="store_true", help="Also ask the LLM for candidates"
+    )
+
+    replay = commands.add_parser(
+        "replay", help="Replay failure bundles through the heal pipeline"
+    )
+    replay.add_argument("bundles", type=Path, nargs="+")
+    replay.add_argument(
+        "--llm", action="store_true", help="Include the LLM (not deterministic)"
+    )
+    replay.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit non-zero when a replay heals differently than recorded",
+    )
+
+    bench = commands.add_parser(
+        "bench-locators", help="Benchmark candidate locator construction and sorting"
+    )
+    bench.add_argument("--count", type=int, default=2000)
+    bench.add_argument("--repeat", type=int, default=5)
+
+    args = parser.parse_args(argv)
+    setup_logging(level=logging.INFO)
+
+    if args.command == "reheal":
+        # Imported lazily: loading the heal pipeline reads rules and models
+        from adapter.selfheal.batch_reheal import run
+
+        run(
+            args.directory,
+            out=args.out,
+            fmt=args.format,
+            workers=args.workers,
+            use_llm=args.llm,
+        )
+    elif args.command == "replay":
+        from adapter.selfheal.bundle import load_bundle, replay_bundle
+
+        mismatches = 0
+        for path in args.bundles:
+            result = replay_bundle(load_bundle(path), use_llm=args.llm)
+            replayed = result["replay"]
+            mismatches += not replayed["matches_recording"]
+            print(
+                json.dumps(
+                    {"bundle": str(path), **replayed, "timings": result["timings"]}
+                )
+            )
+        if args.check and mismatches:
+            sys.exit(1)
+    elif args.command == "bench-locators":
+        from adapter.selfheal.locator_bench import format_results, run
+
+        print(format_results(run(args.count, args.repeat), args.count))
 
 
 if __name__ == "__main__":
@@ -1,22 +1,134 @@
-from typing import List, Dict, Any
-from rule_engine.models import Rule, DecisionType, FailureContext
-from rule_engine.match import match_failure, match_when, build_decision
+from typing import List, Dict, Any, Tuple
+import threading
+import time
+from rule_engine.models import Rule, DecisionType, FailureContext, thaw
+from rule_engine.match import (
+    actual_value,
+    build_decision,
+    first_mismatch_failure,
+    first_mismatch_when,
+)
+
+# Indexes into a rule's counters
+HIT, WHEN_MISS, MATCH_MISS = 0, 1, 2
 
 
 class ExecutionEngine:
+    """
+    Evaluates rules in priority order. The rules are frozen at load time
+    and only read here, so one engine is shared by every thread; the
+    counters are updated under a lock, once per evaluation.
+    """
 
     def __init__(self, rules: List[Rule]):
-        self.rules = sorted(rules, key=lambda r: r.priority, reverse=True)
+        self.rules: Tuple[Rule, ...] = tuple(
+            sorted(rules, key=lambda r: r.priority, reverse=True)
+        )
+        # Always-on counters: rule id -> [hits, when misses, match misses]
+        self._counts: Dict[str, List[int]] = {rule.id: [0, 0, 0] for rule in self.rules}
+        self._evaluations = 0
+        self._noop = 0
+        self._lock = threading.Lock()
+
+    def evaluate(self, ctx: FailureContext, trace: bool = False) -> Dict[str, Any]:
+        """
+        Returns the decision of the first (highest priority) matching rule.
+        With ``trace`` the decision carries a ``trace`` list: every rule
+        visited, in order, with the predicate that rejected it and the time
+        spent on it.
+        """
+        if trace:
+            return self._evaluate_traced(ctx)
 
-    def evaluate(self, ctx: FailureContext) -> Dict[str, Any]:
+        # Outcome (counter index) of each rule visited, in order
+        outcomes: List[int] = []
+        decision = None
         for rule in self.rules:
-            if not match_when(rule.when, ctx):
+            if first_mismatch_when(rule.when, ctx) is not None:
+                outcomes.append(WHEN_MISS)
                 continue
 
-            if match_failure(rule.match, ctx):
-                return build_decision(rule)
+            if first_mismatch_failure(rule.match, ctx) is None:
+                outcomes.append(HIT)
+                decision = build_decision(rule)
+                break
+            outcomes.append(MATCH_MISS)
+
+        self._record(outcomes)
+        return decision if decision is not None else self.default_noop()
+
+    def _evaluate_traced(self, ctx: FailureContext) -> Dict[str, Any]:
+        outcomes: List[int] = []
+        visited = []
+        start = time.perf_counter()
+        decision = None
+        for rule in self.rules:
+            rule_start = time.perf_counter()
+            section, expected = "when", rule.when
+            failed = first_mismatch_when(rule.when, ctx)
+            if failed is None:
+                section, expected = "match", rule.match
+                failed = first_mismatch_failure(rule.match, ctx)
+            elapsed_us = (time.perf_counter() - rule_start) * 1e6
+
+            entry = {
+                "rule_id": rule.id,
+                "priority": rule.priority,
+                "matched": failed is None,
+                "failed_predicate": None,
+                "elapsed_us": round(elapsed_us, 1),
+            }
+            if failed is not None:
+                entry["failed_predicate"] = {
+                    "key": f"{section}.{failed}",
+                    "expected": thaw(expected.get(failed)),
+                    "actual": actual_value(section, failed, ctx),
+                }
+                outcomes.append(WHEN_MISS if section == "when" else MATCH_MISS)
+            visited.append(entry)
+            if failed is None:
+                outcomes.append(HIT)
+                decision = build_decision(rule)
+                break
+
+        self._record(outcomes)
+        if decision is None:
+            decision = self.default_noop()
+        decision["trace"] = visited
+        decision["trace_elapsed_us"] = round((time.perf_counter() - start) * 1e6, 1)
+        return decision
+
+    def _record(self, outcomes: List[int]):
+        with self._lock:
+            self._evaluations += 1
+            for rule, outcome in zip(self.rules, outcomes):
+                self._counts[rule.id][outcome] += 1
+            if not outcomes or outcomes[-1] != HIT:
+                self._noop += 1
 
-        return self.default_noop()
+    def stats(self) -> Dict[str, Any]:
+        """
+        Per-rule counters since the engine was built. ``evaluations`` of a
+        rule counts how often evaluation reached it; rules are tried in
+        priority order, so low-priority rules are only reached on misses.
+        """
+        with self._lock:
+            snapshot = {rule_id: list(c) for rule_id, c in self._counts.items()}
+            evaluations, noop = self._evaluations, self._noop
+        return {
+            "evaluations": evaluations,
+            "noop": noop,
+            "rules": {
+                rule_id: {
+                    "evaluations": sum(counts),
+                    "hits": counts[0],
+                    "misses": counts[1] + counts[2],
+                    "when_misses": counts[1],
+                    "match_misses": counts[2],
+                }
+                for rule_id, counts in snapshot.items()
+            },
+        }
 
     @staticmethod
     def default_noop() -> Dict[str, Any]:
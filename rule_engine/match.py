@@ -1,67 +1,110 @@
-from typing import Dict, Any
-from rule_engine.models import Rule, FailureContext
+from typing import Dict, Any, Optional
+from rule_engine.models import Rule, FailureContext, thaw
 
-def match_when(when: Dict[str, Any], ctx: FailureContext) -> bool:
+# Names rules may use in `requires` for the captured artifacts
+ARTIFACT_ALIASES = {
+    "dom": "dom_snapshot",
+    "dom_snapshot": "dom_snapshot",
+    "accessibility_snapshot": "a11y_snapshot",
+    "a11y_snapshot": "a11y_snapshot",
+    "screenshot": "screenshot",
+}
+
+def first_mismatch_when(when: Dict[str, Any], ctx: FailureContext) -> Optional[str]:
+    """
+    Returns the first `when` key the context does not satisfy, or None.
+    """
     for key, expected in when.items():
         actual = getattr(ctx, key, None)
 
-        if isinstance(expected, list):
+        if isinstance(expected, (list, tuple)):
             if actual not in expected:
-                return False
+                return key
         elif isinstance(expected, str):
             if expected != actual:
-                return False
+                return key
         else:
-            return False
+            return key
 
-    return True
+    return None
 
-def match_failure(match: Dict[str, Any], ctx: FailureContext) -> bool:
+def match_when(when: Dict[str, Any], ctx: FailureContext) -> bool:
+    return first_mismatch_when(when, ctx) is None
+
+def first_mismatch_failure(match: Dict[str, Any], ctx: FailureContext) -> Optional[str]:
+    """
+    Returns the first `match` key the failure does not satisfy, or None.
+    """
     failure = ctx.failure
 
     for key, expected in match.items():
         # failure_type
         if key == "failure_type":
             if failure.type != expected:
-                return False
+                return key
 
         # error_contains
         elif key == "error_contains":
-            error = failure.error
-            if isinstance(expected, list):
-                if not any(e in error for e in expected):
-                    return False
-            elif expected not in error:
-                return False
+            message = failure.error.message or ""
+            if isinstance(expected, (list, tuple)):
+                if not any(e in message for e in expected):
+                    return key
+            elif expected not in message:
+                return key
 
         # locator_contains
         elif key == "locator_contains":
             locator = failure.original_locator
-            if expected not in locator:
-                return False
+            if locator is None or expected not in locator.value:
+                return key
 
         # attempts_exhausted
         elif key == "attempts_exhausted":
-            if expected and ctx.attempt < 2:
-                return False
+            if expected and getattr(ctx, "attempt", 0) < 2:
+                return key
 
         # artifact existence
         elif key == "requires":
             for artifact in expected:
-                if not ctx.artifacts.get(artifact, False):
-                    return False
+                field = ARTIFACT_ALIASES.get(artifact, artifact)
+                if not getattr(ctx.artifacts, field, None):
+                    return key
 
         else:
-            return False
+            return key
 
-    return True
+    return None
+
+def match_failure(match: Dict[str, Any], ctx: FailureContext) -> bool:
+    return first_mismatch_failure(match, ctx) is None
+
+def actual_value(section: str, key: str, ctx: FailureContext) -> Any:
+    """
+    The context value a predicate was checked against, for traces.
+    """
+    if section == "when":
+        return getattr(ctx, key, None)
+    failure = ctx.failure
+    if key == "failure_type":
+        return failure.type
+    if key == "error_contains":
+        return failure.error.message
+    if key == "locator_contains":
+        return failure.original_locator.value if failure.original_locator else None
+    if key == "attempts_exhausted":
+        return getattr(ctx, "attempt", 0)
+    if key == "requires":
+        return sorted(
+            name for name in ARTIFACT_ALIASES
+            if getattr(ctx.artifacts, ARTIFACT_ALIASES[name], None)
+        )
+    return None
 
 def build_decision(rule: Rule) -> Dict[str, Any]:
     return {
         "decision": rule.action["type"],
         "rule_id": rule.id,
         "confidence": rule.confidence.get("score", 0.0),
-        "details": rule.action.get("transform"),
+        "details": thaw(rule.action.get("transform")),
         "explain": rule.explain
     }
-
@@ -1,9 +1,11 @@
 from dataclasses import dataclass, field
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
 from enum import Enum
 from playwright.sync_api import Page
 
 from adapter.selfheal.models import ErrorInfo, LocatorDescriptor
+from adapter.selfheal.timing import StageTimer
 
 
 class DecisionType(str, Enum):
@@ -14,13 +16,36 @@ class DecisionType(str, Enum):
     NOOP = "NOOP"
 
 
-@dataclass
+def freeze(value: Any) -> Any:
+    """
+    A read-only copy of a loaded YAML value: mappings become mapping
+    proxies and lists tuples, so rules can be shared between threads.
+    """
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """
+    A plain, mutable copy of a frozen value, for decisions handed out.
+    """
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+@dataclass(frozen=True)
 class Rule:
     id: str
-    when: Dict[str, Any]
-    match: Dict[str, Any]
-    action: Dict[str, Any]
-    confidence: Dict[str, Any]
+    when: Mapping[str, Any]
+    match: Mapping[str, Any]
+    action: Mapping[str, Any]
+    confidence: Mapping[str, Any]
     explain: str
     priority: int = 0
 
@@ -50,3 +75,5 @@ class FailureContext:
     failure: Failure
     artifacts: Artifact
     component: Optional[str] = field(default=None)
+    url: Optional[str] = field(default=None)
+    timer: StageTimer = field(default_factory=StageTimer)
@@ -2,7 +2,10 @@ import yaml
 from typing import List
 from pathlib import Path
 
-from rule_engine.models import Rule, DecisionType
+from rule_engine.models import Rule, DecisionType, freeze
+
+# Resolved from this package, so the rules load from any working directory
+RULES_PATH = Path(__file__).resolve().with_name("rules.yaml")
 
 def load_rules_from_yaml(path: str) -> List[Rule]:
     yaml_path = Path(path)
@@ -46,10 +49,10 @@ def parse_rule(rule_def: dict) -> Rule:
 
     return Rule(
         id=rule_def["id"],
-        when=rule_def["when"],
-        match=rule_def["match"],
-        action=rule_def["action"],
-        confidence=rule_def["confidence"],
+        when=freeze(rule_def["when"]),
+        match=freeze(rule_def["match"]),
+        action=freeze(rule_def["action"]),
+        confidence=freeze(rule_def["confidence"]),
         explain=rule_def["explain"],
         priority=rule_def.get("priority", 0),
     )
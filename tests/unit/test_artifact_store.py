@@ -0,0 +1,37 @@
+"""
+Several artifact stores (one per xdist worker) sharing one directory.
+"""
+
+from pathlib import Path
+
+from adapter.selfheal.artifact_store import ArtifactStore
+
+DOM = b"<html><body><button id='login'>Log in</button></body></html>"
+
+
+def test_blob_evicted_by_another_store_is_written_again(tmp_path):
+    first, second = ArtifactStore(tmp_path), ArtifactStore(tmp_path)
+    path = Path(first.put("f1", "dom", DOM, suffix=".html", background=False))
+
+    # The other worker evicts the only failure using the blob
+    second.evict(["f1"])
+    assert not path.exists()
+
+    # The first store still has the blob indexed, but must not rely on it
+    again = first.put("f2", "dom", DOM, suffix=".html")
+    first.wait_for_pending_writes()
+    assert Path(again) == path
+    assert first.read_bytes(path) == DOM
+    assert ArtifactStore(tmp_path).artifacts_for("f2") == {"dom": str(path)}
+
+
+def test_blob_shared_across_stores_is_kept_while_referenced(tmp_path):
+    first, second = ArtifactStore(tmp_path), ArtifactStore(tmp_path)
+    path = Path(first.put("f1", "dom", DOM, suffix=".html", background=False))
+    assert second.put("f2", "dom", DOM, suffix=".html") == str(path)
+    second.wait_for_pending_writes()
+
+    first.evict(["f1"])
+
+    assert path.exists()
+    assert ArtifactStore(tmp_path).artifacts_for("f2") == {"dom": str(path)}
@@ -0,0 +1,176 @@
+"""
+Merkle diffs of a11y snapshots against their baseline, and baseline
+retention.
+"""
+
+import json
+import os
+
+import pytest
+import yaml
+
+from adapter.selfheal.artifact_store import ArtifactStore
+from adapter.selfheal.baseline import (
+    NAMESPACE,
+    BaselineStore,
+    build_tree,
+    diff_trees,
+    find_path,
+    pruned_snapshot,
+)
+from adapter.selfheal.retention import RetentionManager, RetentionPolicy
+from adapter.selfheal.shared_state import SharedState
+import adapter.selfheal.baseline as baseline_module
+
+BASELINE = """
+- navigation "Main":
+  - link "Home"
+  - link "Account"
+- main:
+  - heading "Orders" [level=1]
+  - list:
+    - listitem: Milk
+    - listitem: Bread
+  - button "Save"
+- contentinfo:
+  - text: Footer
+"""
+
+# Account link removed, Bread changed to Butter, Cancel button added
+CURRENT = """
+- navigation "Main":
+  - link "Home"
+- main:
+  - heading "Orders" [level=1]
+  - list:
+    - listitem: Milk
+    - listitem: Butter
+  - button "Save"
+  - button "Cancel"
+- contentinfo:
+  - text: Footer
+"""
+
+
+def _tree(snapshot: str):
+    return build_tree(yaml.safe_load(snapshot))
+
+
+def _changed(diff):
+    return [
+        ([a.label for a in ancestors], node.label) for ancestors, node in diff.changed
+    ]
+
+
+def test_equal_snapshots_have_no_diff():
+    diff = diff_trees(_tree(BASELINE), _tree(BASELINE))
+
+    assert (diff.changed, diff.removed) == ([], [])
+    # Equal root hashes: nothing below the root is visited
+    assert diff.visited == 1
+
+
+def test_added_removed_and_changed_subtrees():
+    diff = diff_trees(_tree(BASELINE), _tree(CURRENT))
+
+    assert _changed(diff) == [
+        (["", "main", "list"], "listitem: Butter"),
+        (["", "main"], 'button "Cancel"'),
+    ]
+    assert [node.label for node in diff.removed] == [
+        'link "Account"',
+        "listitem: Bread",
+    ]
+    # Root, navigation, main and list; the unchanged footer is skipped
+    assert diff.visited == 4
+
+
+def test_reordered_children_are_unchanged():
+    reordered = """
+- contentinfo:
+  - text: Footer
+- navigation "Main":
+  - link "Home"
+  - link "Account"
+- main:
+  - heading "Orders" [level=1]
+  - list:
+    - listitem: Milk
+    - listitem: Bread
+  - button "Save"
+"""
+    diff = diff_trees(_tree(BASELINE), _tree(reordered))
+
+    assert (diff.changed, diff.removed) == ([], [])
+
+
+def test_changed_subtree_whose_label_changed_is_added_and_removed():
+    renamed = BASELINE.replace('navigation "Main"', 'navigation "Primary"')
+
+    diff = diff_trees(_tree(BASELINE), _tree(renamed))
+
+    assert _changed(diff) == [([""], 'navigation "Primary"')]
+    assert [node.label for node in diff.removed] == ['navigation "Main"']
+
+
+def test_pruned_snapshot_keeps_changes_and_their_ancestors():
+    current = _tree(CURRENT)
+    diff = diff_trees(_tree(BASELINE), current)
+
+    assert pruned_snapshot(current, diff.changed) == [
+        {"main": [{"list": [{"listitem": "Butter"}]}, 'button "Cancel"']}
+    ]
+
+
+def test_find_path():
+    root = _tree(BASELINE)
+
+    path = find_path(root, 'button "Save"')
+
+    assert [node.label for node in path] == ["", "main", 'button "Save"']
+    assert find_path(root, 'button "Delete"') is None
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    state = SharedState(tmp_path / "shared")
+    monkeypatch.setattr(baseline_module, "shared_state", state)
+    yield state
+    state.close()
+
+
+def _snapshot(baselines: BaselineStore, digest: str, age_s: float):
+    path = baselines.snapshot_path(digest)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * 10)
+    mtime = path.stat().st_mtime - age_s
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_deletes_unreferenced_snapshots(tmp_path, state):
+    baselines = BaselineStore(tmp_path / "baselines")
+    live = _snapshot(baselines, "aa11", age_s=7200)
+    orphan = _snapshot(baselines, "bb22", age_s=7200)
+    fresh = _snapshot(baselines, "cc33", age_s=0)
+    state.put(
+        NAMESPACE,
+        baselines._key("https://app/", 'page.locator("#a")'),
+        json.dumps({"digest": "aa11"}),
+    )
+    state.flush()
+
+    assert baselines.prune() == 10
+
+    assert live.exists()
+    assert not orphan.exists()
+    # Possibly the snapshot of an entry another worker has not flushed yet
+    assert fresh.exists()
+
+
+def test_pruners_run_on_the_full_retention_pass_only(tmp_path):
+    retention = RetentionManager(ArtifactStore(tmp_path), RetentionPolicy())
+    retention.add_pruner(lambda: 10)
+
+    assert retention.enforce(budget=200) == 0
+    assert retention.enforce() == 10
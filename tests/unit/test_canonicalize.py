@@ -0,0 +1,160 @@
+"""
+Canonicalization and deduplication of heal candidates.
+"""
+
+import pytest
+
+from adapter.selfheal.canonicalize import (
+    CandidateSet,
+    canonicalize,
+    dedupe_candidates,
+)
+from adapter.selfheal.locator_parser import parse_playwright_locator
+from adapter.selfheal.models import CoreLocator
+
+
+def _candidate(code, confidence=0.5, source="llm:fast") -> CoreLocator:
+    return CoreLocator.from_descriptor(
+        parse_playwright_locator(code), confidence=confidence, source=source
+    )
+
+
+@pytest.mark.parametrize(
+    "spellings, canonical",
+    [
+        (
+            [
+                "page.get_by_role('button', name='Log in')",
+                'page.get_by_role("BUTTON", name="Log  in")',
+                'page.get_by_role("button", name=" Log in ", exact=False)',
+            ],
+            'page.get_by_role("button", name="Log in")',
+        ),
+        (
+            [
+                "page.get_by_label('E-mail\\naddress')",
+                'page.get_by_label("E-mail address")',
+            ],
+            'page.get_by_label("E-mail address")',
+        ),
+        (
+            ["page.locator('[name=\"q\"]')", "page.locator(\"[name='q']\")"],
+            "page.locator(\"[name='q']\")",
+        ),
+        (
+            [
+                "page.locator('//input[@name=\"q\"]')",
+                "page.locator(\"//input[@name='q']\")",
+            ],
+            "page.locator(\"//input[@name='q']\")",
+        ),
+        (
+            [
+                'page.locator("form").get_by_role("Button", name="Save")',
+                'page.locator("form").get_by_role("button", name="Save", exact=False)',
+            ],
+            'page.locator("form").get_by_role("button", name="Save")',
+        ),
+    ],
+)
+def test_equivalent_spellings_collapse(spellings, canonical):
+    candidates = [
+        _candidate(code, confidence=0.5 + i * 0.1) for i, code in enumerate(spellings)
+    ]
+
+    merged = dedupe_candidates(candidates)
+
+    assert [loc.canonical for loc in merged] == [canonical]
+    assert merged[0].confidence == max(loc.confidence for loc in candidates)
+
+
+def test_canonical_form_is_stable():
+    loc = canonicalize(_candidate('page.get_by_role("BUTTON", name="  Log\tin ")'))
+
+    assert canonicalize(loc) == loc
+    assert canonicalize(parse_playwright_locator(loc.canonical)).canonical == (
+        loc.canonical
+    )
+
+
+def test_near_duplicates_stay_distinct():
+    codes = [
+        'page.get_by_text("Log in")',
+        'page.get_by_text("Log in", exact=True)',
+        'page.get_by_text("log in")',
+        'page.get_by_text("Log in").first',
+        'page.get_by_text("Log in").nth(1)',
+        'page.locator("form").get_by_text("Log in")',
+        'page.get_by_label("Log in")',
+        'page.get_by_role("link", name="Log in")',
+        'page.get_by_role("button", name="Log in")',
+        'page.get_by_role("button", name="Log in", exact=True)',
+        'page.locator("#Login")',
+        'page.locator("#login")',
+        'page.locator("div p")',
+        'page.locator("div > p")',
+    ]
+
+    merged = dedupe_candidates(_candidate(code) for code in codes)
+
+    assert [loc.canonical for loc in merged] == codes
+
+
+def test_exact_text_candidate_keeps_exact_in_its_key():
+    # As built by the fuzzy matcher; build_locator matches it exactly
+    loc = canonicalize(
+        CoreLocator(strategy="text", value="Log in", exact=True, source="fuzzy")
+    )
+
+    assert loc.canonical == 'page.get_by_text("Log in", exact=True)'
+    assert parse_playwright_locator(loc.canonical).exact is True
+
+
+def test_merge_keeps_the_best_variant_and_every_source():
+    candidates = CandidateSet(limit=0)
+    first = candidates.merge(
+        [
+            _candidate("page.get_by_text('Save')", 0.6, "transformer"),
+            _candidate('page.get_by_text(" Save ")', 0.9, "llm:fast"),
+        ]
+    )
+
+    assert [(loc.canonical, loc.confidence) for loc in first] == [
+        ('page.get_by_text("Save")', 0.9)
+    ]
+    assert first[0].source == "llm:fast"
+
+    # Seen in an earlier batch: not handed out again, but its source counts
+    assert (
+        candidates.merge([_candidate('page.get_by_text("Save")', 1.0, "fuzzy")]) == []
+    )
+    assert candidates.duplicates == 2
+    assert candidates.provenance() == {
+        'page.get_by_text("Save")': ["transformer", "llm:fast", "fuzzy"]
+    }
+
+
+def test_take_spends_the_validation_budget_across_batches():
+    candidates = CandidateSet(limit=3)
+    ranked = candidates.merge(
+        _candidate(f'page.get_by_test_id("b{i}")') for i in range(2)
+    )
+    assert candidates.take(ranked) == ranked
+    assert not candidates.exhausted
+
+    ranked = candidates.merge(
+        _candidate(f'page.get_by_test_id("c{i}")') for i in range(2)
+    )
+    assert candidates.take(ranked) == ranked[:1]
+    assert candidates.exhausted
+    assert candidates.take(ranked) == []
+
+
+def test_no_budget_takes_everything():
+    candidates = CandidateSet(limit=0)
+    ranked = candidates.merge(
+        _candidate(f'page.get_by_test_id("b{i}")') for i in range(20)
+    )
+
+    assert candidates.take(ranked) == ranked
+    assert not candidates.exhausted
@@ -0,0 +1,236 @@
+"""
+The LLM circuit breaker and its call pool.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from adapter.selfheal.candidate_sources import CandidateRace, CandidateSource
+from analyzer.circuit_breaker import (
+    BreakerConfig,
+    CallPool,
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    LLMTimeoutError,
+    ModelBreakers,
+)
+from analyzer.model_router import ModelRouter, ModelTier
+import analyzer.model_router as model_router_module
+
+TIER = ModelTier(name="fast", model="slow-model", timeout_s=30)
+CONFIG = BreakerConfig(
+    timeout_s=5, window=10, min_calls=4, slow_ms=50, cooldown_s=60, max_workers=1
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _breaker(clock=None) -> CircuitBreaker:
+    return CircuitBreaker(CONFIG, clock or Clock())
+
+
+def _fail():
+    raise RuntimeError("model not found")
+
+
+def _calls(breaker: CircuitBreaker, *outcomes: bool):
+    for ok in outcomes:
+        try:
+            breaker.call(lambda: "[]" if ok else _fail())
+        except RuntimeError:
+            pass
+
+
+def _open(breaker: CircuitBreaker):
+    _calls(breaker, False, False, False, False)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_opens_on_error_rate():
+    breaker = _breaker()
+    _calls(breaker, True, False, True)
+    assert breaker.state == CircuitState.CLOSED
+
+    _calls(breaker, False)
+
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "[]")
+    assert breaker.snapshot()["trips"] == 1
+    assert breaker.snapshot()["rejected"] == 1
+
+
+def test_opens_on_slow_rate():
+    breaker = _breaker()
+    for latency_ms in (100, 100, 100, 10):
+        breaker.record(True, latency_ms, breaker.allow())
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker.record(True, 100, breaker.allow())
+
+    # Four of five calls slow, none failed
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_half_opens_after_the_cooldown():
+    clock = Clock()
+    breaker = _breaker(clock)
+    _open(breaker)
+
+    clock.now = CONFIG.cooldown_s - 1
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.snapshot()["retry_in_s"] == 1.0
+    clock.now = CONFIG.cooldown_s
+    assert breaker.state == CircuitState.HALF_OPEN
+
+
+def test_probe_success_closes():
+    clock = Clock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now = CONFIG.cooldown_s
+
+    probe = breaker.allow()
+    assert probe.state == CircuitState.HALF_OPEN
+    # One probe at a time
+    assert breaker.allow() is None
+
+    breaker.record(True, 10, probe)
+
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.snapshot()["calls"] == 0
+
+
+@pytest.mark.parametrize("ok, latency_ms", [(False, 10), (True, 100)])
+def test_failed_or_slow_probe_reopens(ok, latency_ms):
+    clock = Clock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now = CONFIG.cooldown_s
+
+    breaker.record(ok, latency_ms, breaker.allow())
+
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.snapshot()["trips"] == 2
+    assert breaker.snapshot()["retry_in_s"] == CONFIG.cooldown_s
+
+
+def test_call_admitted_while_closed_is_not_a_probe():
+    clock = Clock()
+    breaker = _breaker(clock)
+    late = breaker.allow()
+    _open(breaker)
+    clock.now = CONFIG.cooldown_s
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    # Finishes after the breaker half-opened; it says nothing about now
+    breaker.record(True, 10, late)
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    breaker.record(False, 10, breaker.allow())
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_saturated_pool_fails_fast_without_tripping():
+    breaker = CircuitBreaker(CONFIG, Clock(), CallPool(1))
+    release = threading.Event()
+    busy = threading.Thread(target=breaker.call, args=(release.wait,))
+    busy.start()
+    try:
+        while breaker._pool.slots.acquire(blocking=False):
+            breaker._pool.slots.release()
+            time.sleep(0.01)
+        with pytest.raises(LLMTimeoutError, match="No free LLM worker"):
+            breaker.call(lambda: "[]", timeout=0.05)
+    finally:
+        release.set()
+        busy.join()
+
+    snapshot = breaker.snapshot()
+    assert snapshot["saturated"] == 1
+    assert snapshot["state"] == CircuitState.CLOSED.value
+    assert snapshot["calls"] == 1
+
+
+class HangingClient:
+    """
+    A model that never answers; records whether its request was aborted.
+    """
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.aborted = threading.Event()
+
+    async def ainvoke(self, messages):
+        self.started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.aborted.set()
+            raise
+
+
+@pytest.fixture
+def breakers(monkeypatch):
+    breakers = ModelBreakers(BreakerConfig(max_workers=1))
+    monkeypatch.setattr(model_router_module, "llm_breakers", breakers)
+    return breakers
+
+
+def test_cancelled_race_releases_its_pool_slot(breakers, monkeypatch):
+    router = ModelRouter([TIER])
+    client = HangingClient()
+    monkeypatch.setattr(router, "client", lambda tier, timeout: client)
+
+    def llm(context, cancelled):
+        router.invoke(TIER, [], cancelled)
+        return []
+
+    race = CandidateRace([CandidateSource("llm", llm)]).start(None)
+    assert client.started.wait(5)
+    assert not breakers.pool.slots.acquire(blocking=False)
+
+    start = time.perf_counter()
+    race.cancel()
+
+    # The request is aborted and its worker freed well before the timeout
+    assert breakers.pool.slots.acquire(timeout=5)
+    assert time.perf_counter() - start < 2
+    assert client.aborted.is_set()
+    # Cancelling is not an LLM failure
+    assert breakers.for_model(TIER.model).snapshot()["calls"] == 0
+
+
+def test_warming_model_gets_its_load_time_in_the_http_timeout(breakers, monkeypatch):
+    router = ModelRouter([TIER])
+    timeouts = []
+
+    class Answer:
+        content = "[]"
+
+    class Client:
+        async def ainvoke(self, messages):
+            return Answer()
+
+    def client(tier, timeout):
+        timeouts.append(timeout)
+        return Client()
+
+    monkeypatch.setattr(router, "client", client)
+    monkeypatch.setattr(model_router_module.warmup, "remaining_s", lambda model: 12.0)
+    monkeypatch.setattr(
+        model_router_module.shared_state, "record_timing", lambda *a: None
+    )
+
+    assert router.invoke(TIER, []) == "[]"
+    assert timeouts == [TIER.timeout_s + 12.0]
@@ -0,0 +1,195 @@
+"""
+Concurrent heals against recorded pages, without a browser: heals of
+different pages run at the same time, identical heals run once and heals
+of one page never overlap.
+"""
+
+from pathlib import Path
+import threading
+import time
+
+import pytest
+
+from adapter.selfheal.bundle import RecordedPage, context_from_bundle, locator_key
+from adapter.selfheal.candidate_sources import CandidateSource, llm_source
+from adapter.selfheal.concurrency import PageLocks
+from adapter.selfheal.heal_report import heal_status
+from adapter.selfheal.locator_parser import parse_playwright_locator
+from adapter.selfheal.models import CoreLocator, LocatorDescriptor
+from adapter.selfheal.orchestrator import manage_failure
+from adapter.selfheal.shared_state import SharedState
+import adapter.selfheal.candidate_sources as candidate_sources
+import adapter.selfheal.orchestrator as orchestrator
+import analyzer.llm_analyzer as llm_analyzer
+import analyzer.model_router as model_router
+from rule_engine.execution_engine import ExecutionEngine
+
+# Per validation, standing in for a browser round trip
+VALIDATION_S = 0.05
+SOURCE_S = 0.15
+PAGES = 8
+
+A11Y = '- main:\n  - form "Login":\n    - textbox "Email"\n    - button "Log in"\n'
+HEALED = 'page.get_by_role("button", name="Log in", exact=True)'
+
+# (url, start, end) of every source run
+source_calls = []
+_calls_lock = threading.Lock()
+
+
+def _slow_source(context, cancelled):
+    start = time.perf_counter()
+    time.sleep(SOURCE_S)
+    with _calls_lock:
+        source_calls.append((context.url, start, time.perf_counter()))
+    return [
+        CoreLocator.from_descriptor(
+            parse_playwright_locator(HEALED), confidence=0.95, source="slow"
+        )
+    ]
+
+
+SOURCES = [CandidateSource("slow", _slow_source)]
+
+
+class SlowRecordedPage(RecordedPage):
+    def count(self, parts: tuple) -> int:
+        time.sleep(VALIDATION_S)
+        return super().count(parts)
+
+
+def _bundle(url: str) -> dict:
+    healed = parse_playwright_locator(HEALED)
+    return {
+        "failure_id": f"failure-{url}",
+        "failure_type": "LOCATOR_NOT_FOUND",
+        "test_name": "test_concurrency",
+        "test_type": "REGRESSION",
+        "environment": "QA",
+        "url": url,
+        "error": {
+            "type": "TimeoutError",
+            "subtype": None,
+            "message": 'waiting for locator("//button[@id=\'login\']")',
+        },
+        "original_locator": LocatorDescriptor(
+            strategy="xpath", value="//button[@id='login']"
+        ).model_dump(),
+        "candidate_counts": {locator_key(healed): {"count": 1, "error": None}},
+        "artifacts": {"a11y": A11Y},
+    }
+
+
+def _contexts(tmp_path: Path, urls):
+    contexts = []
+    for i, url in enumerate(urls):
+        workdir = tmp_path / str(i)
+        workdir.mkdir(parents=True)
+        ctx, _ = context_from_bundle(_bundle(url), workdir)
+        ctx.page = SlowRecordedPage(_bundle(url))
+        contexts.append(ctx)
+    return contexts
+
+
+def _heal_all(contexts):
+    """
+    Heals every context on its own thread, all starting together. Returns
+    the results, in order.
+    """
+    results = [None] * len(contexts)
+    barrier = threading.Barrier(len(contexts))
+
+    def heal(i):
+        barrier.wait()
+        results[i] = manage_failure(contexts[i], sources=SOURCES)
+
+    threads = [threading.Thread(target=heal, args=(i,)) for i in range(len(contexts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.fixture(autouse=True)
+def _isolated(tmp_path, monkeypatch):
+    """
+    Keeps the heals' timings, rule counters and cache entries out of the
+    session's shared state, and heal events and reports out of
+    test_artifacts.
+    """
+    monkeypatch.setenv("HEALER_EVENTS", "0")
+    monkeypatch.setenv("HEALER_REPORT", "0")
+    state = SharedState(tmp_path / "shared")
+    for module in (orchestrator, candidate_sources, model_router, llm_analyzer):
+        monkeypatch.setattr(module, "shared_state", state)
+    monkeypatch.setattr(orchestrator, "engine", ExecutionEngine(orchestrator.rules))
+    source_calls.clear()
+    yield
+    state.close()
+
+
+def test_heals_of_different_pages_overlap(tmp_path):
+    urls = [f"https://app/user/{i}" for i in range(PAGES)]
+    results = _heal_all(_contexts(tmp_path, urls))
+
+    assert all(r["healed_locator"].to_playwright() == HEALED for r in results)
+    assert not any(r.get("coalesced") for r in results)
+    # Every page's heal was still running when the last one started;
+    # serialized heals would not overlap at all
+    assert sorted(url for url, _, _ in source_calls) == sorted(urls)
+    assert max(start for _, start, _ in source_calls) < min(
+        end for _, _, end in source_calls
+    )
+    # Rule counters are not lost to concurrent updates
+    assert orchestrator.engine.stats()["evaluations"] == PAGES
+
+
+def test_identical_heals_coalesce(tmp_path):
+    results = _heal_all(_contexts(tmp_path, ["https://app/shared"] * PAGES))
+
+    assert len(source_calls) == 1
+    assert all(r["healed_locator"].to_playwright() == HEALED for r in results)
+    coalesced = [r for r in results if r.get("coalesced")]
+    assert len(coalesced) == PAGES - 1
+    # Followers confirm the shared locator on their own page
+    assert all(len(r["validations"]) == 1 for r in coalesced)
+    assert all(r["validations"][0].is_unique for r in coalesced)
+
+
+def test_heals_of_one_page_are_serialized():
+    locks = PageLocks()
+    shared, other = SlowRecordedPage(_bundle("a")), SlowRecordedPage(_bundle("b"))
+    spans = {}
+
+    def hold(name, page):
+        with locks.hold(page):
+            start = time.perf_counter()
+            time.sleep(0.1)
+            spans[name] = (start, time.perf_counter())
+
+    threads = [
+        threading.Thread(target=hold, args=(name, page))
+        for name, page in (("first", shared), ("second", shared), ("other", other))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    first, second = sorted((spans["first"], spans["second"]))
+    assert first[1] <= second[0]
+    # A different page is not held up
+    assert spans["other"][0] < first[1]
+
+
+def test_failure_without_a_locator_is_not_found(tmp_path):
+    bundle = dict(_bundle("https://app/"), original_locator=None)
+    context, _ = context_from_bundle(bundle, tmp_path)
+    context.page = SlowRecordedPage(bundle)
+
+    result = manage_failure(context, sources=[CandidateSource("llm", llm_source)])
+
+    assert result["original_locator"] is None
+    assert result["healed_locator"] is None
+    assert heal_status(result, healed=False) == "not_found"
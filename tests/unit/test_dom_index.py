@@ -0,0 +1,63 @@
+"""
+DOM index candidates and match counts: selectors stay valid for any
+attribute value, and case-sensitive attributes are counted exactly.
+"""
+
+from adapter.selfheal.dom_index import DomIndex, css_string
+from adapter.selfheal.models import LocatorDescriptor
+from adapter.selfheal.selector_hints import SelectorHints
+
+HTML = """
+<form>
+  <button id="it's">Save</button>
+  <input name="a\\b" title="first line&#10;second line">
+  <div id="Submit">Submit</div>
+  <div id="submit">submit</div>
+  <span data-testid="Cart"></span>
+  <span data-testid="cart"></span>
+</form>
+"""
+
+
+def _index() -> DomIndex:
+    return DomIndex.from_html(HTML)
+
+
+def test_css_string_escapes_quotes_backslashes_and_newlines():
+    assert css_string("plain") == "'plain'"
+    assert css_string("it's") == "'it\\'s'"
+    assert css_string("a\\b") == "'a\\\\b'"
+    assert css_string("one\ntwo") == "'one\\a two'"
+
+
+def test_attribute_selectors_are_escaped():
+    index = _index()
+    selectors = {
+        loc.value
+        for loc in index.candidates(
+            SelectorHints(attributes={"id": ["it's"], "name": ["a\\b"]})
+        )
+    }
+
+    assert "[id='it\\'s']" in selectors
+    assert "input[name='a\\\\b']" in selectors
+
+
+def test_ids_and_test_ids_are_counted_case_sensitively():
+    index = _index()
+
+    assert index.count_matches(LocatorDescriptor(strategy="css", value="#Submit")) == 1
+    assert index.count_matches(LocatorDescriptor(strategy="css", value="#SUBMIT")) == 0
+    assert index.count_matches(LocatorDescriptor(strategy="test_id", value="cart")) == 1
+
+
+def test_ids_differing_in_case_are_not_duplicates():
+    index = _index()
+    (loc,) = [
+        loc
+        for loc in index.candidates(SelectorHints(attributes={"id": ["Submit"]}))
+        if loc.value == "#Submit"
+    ]
+
+    # A shared value would cost confidence; these two ids are different
+    assert loc.confidence == 1.0
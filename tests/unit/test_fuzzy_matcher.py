@@ -0,0 +1,52 @@
+"""
+Fuzzy candidates for raw selectors: only a name that matches a selector
+hint outright is healed without review.
+"""
+
+import pytest
+import yaml
+
+from adapter.selfheal.candidate_sources import meets_threshold
+from adapter.selfheal.locator_transformer import LocatorTransformer
+from adapter.selfheal.models import LocatorDescriptor
+from adapter.selfheal.score_engine import rank_locators
+
+SNAPSHOT = yaml.safe_load(
+    """
+- main:
+  - form "Feedback":
+    - textbox "Message"
+    - button "Submit feedback"
+  - button "Logout"
+"""
+)
+
+
+def _ranked(strategy: str, value: str, snapshot=SNAPSHOT):
+    original = LocatorDescriptor(strategy=strategy, value=value)
+    candidates = LocatorTransformer().transform(original=original, snapshot=snapshot)
+    return rank_locators(candidates)
+
+
+@pytest.mark.parametrize(
+    "strategy, value",
+    [
+        ("xpath", "//button[@id='submit-order']"),
+        ("css", "#submitOrder"),
+        ("xpath", "//button[text()='Log']"),
+    ],
+)
+def test_dissimilar_names_are_not_auto_accepted(strategy, value):
+    candidates = _ranked(strategy, value)
+
+    assert candidates
+    assert all(loc.source == "fuzzy" for loc in candidates)
+    assert not any(meets_threshold(loc) for loc in candidates)
+
+
+def test_matching_name_is_accepted():
+    snapshot = SNAPSHOT + [{"main": ['button "Submit order"']}]
+    best = _ranked("xpath", "//button[@id='submit-order']", snapshot)[0]
+
+    assert best.name == "Submit order"
+    assert meets_threshold(best)
@@ -0,0 +1,43 @@
+"""
+The end-of-session heal report.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from adapter.selfheal.heal_report import FIELDS, HealReportPlugin
+import adapter.selfheal.heal_report as heal_report_module
+
+
+@pytest.fixture
+def written(monkeypatch):
+    written = []
+    monkeypatch.setenv("HEALER_REPORT", "1")
+    monkeypatch.setattr(heal_report_module.shared_state, "flush", lambda: None)
+    monkeypatch.setattr(heal_report_module, "write_report", written.append)
+    return written
+
+
+def _finish(monkeypatch, entries):
+    monkeypatch.setattr(heal_report_module.heal_report, "entries", lambda: entries)
+    plugin = HealReportPlugin()
+    plugin.pytest_sessionstart(None)
+    plugin.pytest_sessionfinish(SimpleNamespace(config=SimpleNamespace()))
+
+
+def test_session_without_heals_writes_no_report(written, monkeypatch):
+    _finish(monkeypatch, [])
+
+    assert written == []
+
+
+def test_session_with_heals_writes_the_report(written, monkeypatch):
+    entry = dict.fromkeys(FIELDS)
+    entry.update(
+        test="test_login", ts=1.0, status="healed", heal_ms=12.0, worker="main"
+    )
+
+    _finish(monkeypatch, [entry])
+
+    assert [report["summary"]["heals"] for report in written] == [1]
@@ -0,0 +1,166 @@
+"""
+The locator parser: Playwright error messages and LLM candidates to
+descriptors, including the strings the regex parsing it replaced handled.
+"""
+
+import pytest
+
+from adapter.selfheal.locator_parser import (
+    LocatorSyntaxError,
+    parse_playwright_error,
+    parse_playwright_locator,
+)
+
+
+@pytest.mark.parametrize(
+    "code, strategy, value",
+    [
+        # LLM answers, single quotes as the prompt asks for
+        ("page.get_by_role('button', name='Log in')", "role", "Log in"),
+        ("page.get_by_text('Forgot password?')", "text", "Forgot password?"),
+        ("page.get_by_label('Email')", "label", "Email"),
+        ("page.get_by_placeholder('Search')", "placeholder", "Search"),
+        ("page.get_by_test_id('submit')", "test_id", "submit"),
+        ("page.locator('#login')", "css", "#login"),
+        ("page.locator('//button[@id=\"login\"]')", "xpath", '//button[@id="login"]'),
+        # Single quotes nested in a single-quoted selector
+        (
+            "page.locator('//button[@type='submit']')",
+            "xpath",
+            "//button[@type='submit']",
+        ),
+        ('  page.get_by_text("Sign up")  ', "text", "Sign up"),
+    ],
+)
+def test_single_calls(code, strategy, value):
+    loc = parse_playwright_locator(code)
+
+    assert (loc.strategy, loc.value) == (strategy, value)
+    assert loc.chain is None
+
+
+def test_role_name_and_exact():
+    loc = parse_playwright_locator(
+        'page.get_by_role("button", name="Save", exact=True)'
+    )
+
+    assert (loc.role, loc.name, loc.exact) == ("button", "Save", True)
+    assert loc.to_playwright() == 'page.get_by_role("button", name="Save", exact=True)'
+    assert (
+        parse_playwright_locator("page.get_by_text('Save', exact=False)").exact is False
+    )
+
+
+@pytest.mark.parametrize(
+    "code, value",
+    [
+        ('page.get_by_text("Say \\"hi\\"")', 'Say "hi"'),
+        ("page.get_by_label('It\\'s me')", "It's me"),
+        ('page.get_by_text("It\'s")', "It's"),
+        ("page.get_by_text('a\\\\b')", "a\\b"),
+        ('page.get_by_text("one\\ntwo")', "one\ntwo"),
+        ('page.get_by_text(r"one\\ntwo")', "one\\ntwo"),
+    ],
+)
+def test_quotes_and_escapes(code, value):
+    loc = parse_playwright_locator(code)
+
+    assert loc.value == value
+    # The rendered expression reads back to the same locator
+    assert parse_playwright_locator(loc.to_playwright()) == loc
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        'page.locator("form").get_by_role("button", name="Save")',
+        'page.frame_locator("iframe").get_by_text("Pay")',
+        'page.get_by_role("listitem").nth(1)',
+        'page.get_by_role("listitem").nth(-1)',
+        'page.get_by_role("listitem").first',
+        'page.get_by_role("listitem").last',
+        'page.get_by_test_id("cart").filter(has_text="x")',
+        'page.locator("li").filter(has=page.get_by_text("Milk"))',
+    ],
+)
+def test_chains_are_kept(code):
+    loc = parse_playwright_locator(code)
+
+    assert loc.chain is not None
+    assert loc.to_playwright() == code
+
+
+def test_chain_target_is_the_last_locator_call():
+    loc = parse_playwright_locator(
+        'page.locator("form").get_by_role("button", name="Save").nth(0)'
+    )
+
+    assert (loc.strategy, loc.role, loc.name) == ("role", "button", "Save")
+    assert [step.method for step in loc.chain] == ["locator", "get_by_role", "nth"]
+    assert loc.chain[-1].args == (0,)
+    assert loc.chain[-1].call
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "",
+        "page.get_by_text(",
+        'page.get_by_text("a"',
+        "page.get_by_text()",
+        "page.get_by_text(1)",
+        'page.click("#a")',
+        'page.get_by_text("a") and more',
+        'page.get_by_role("button", name=1)',
+        "page.first",
+    ],
+)
+def test_malformed_input_is_rejected(code):
+    with pytest.raises(LocatorSyntaxError):
+        parse_playwright_locator(code)
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        (
+            "Locator.click: Timeout 30000ms exceeded.\nCall log:\n"
+            "  - waiting for locator(\"//button[@id='login']\")\n",
+            "page.locator(\"//button[@id='login']\")",
+        ),
+        (
+            "TimeoutError: Locator.fill: Timeout 5000ms exceeded.\n"
+            '  - waiting for get_by_role("textbox", name="Email")',
+            'page.get_by_role("textbox", name="Email")',
+        ),
+        (
+            "Timeout 30000ms exceeded.\n  - waiting for "
+            "page.get_by_role('button', name='Log in', exact=True)",
+            'page.get_by_role("button", name="Log in", exact=True)',
+        ),
+        (
+            'Error: strict mode violation: get_by_role("button") resolved to 2 elements',
+            'page.get_by_role("button")',
+        ),
+        # Prose after the expression is not part of it
+        ('waiting for locator("#a"). Retrying', 'page.locator("#a")'),
+        (
+            'waiting for frame_locator("iframe").get_by_text("Pay").first',
+            'page.frame_locator("iframe").get_by_text("Pay").first',
+        ),
+    ],
+)
+def test_error_messages(message, expected):
+    assert parse_playwright_error(message).to_playwright() == expected
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "Timeout 30000ms exceeded.",
+        'waiting for navigation to "https://app/"',
+        "waiting for locator(",
+    ],
+)
+def test_error_messages_without_a_locator(message):
+    assert parse_playwright_error(message) is None
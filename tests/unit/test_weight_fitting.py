@@ -0,0 +1,130 @@
+"""
+Scoring features, and the heal history rows and labels the weights are
+fitted on.
+"""
+
+from types import SimpleNamespace
+import sqlite3
+
+from adapter.selfheal.bundle import context_from_bundle
+from adapter.selfheal.heal_history import (
+    CANDIDATE_COLUMNS,
+    HEAL_COLUMNS,
+    SCHEMA,
+    HealHistoryStore,
+    build_rows,
+)
+from adapter.selfheal.models import CoreLocator, ValidationResult
+from adapter.selfheal.score_engine import ScoringModel
+from adapter.selfheal.weight_fitting import load_outcomes
+
+
+def test_llm_candidates_get_the_llm_source_weight():
+    model = ScoringModel.from_dict({"weights": {"source": {"llm": 7, "fuzzy": 3}}})
+    candidates = [
+        SimpleNamespace(source=source)
+        for source in ("llm:fast", "llm:large", "llm", "fuzzy", "cache")
+    ]
+
+    assert model.score(candidates).tolist() == [7, 7, 7, 3, 0]
+
+
+def _heal(failure_id, test_name, healed):
+    heal = dict.fromkeys(HEAL_COLUMNS)
+    heal.update(
+        recorded_at=1.0,
+        failure_id=failure_id,
+        test_name=test_name,
+        healed=int(healed),
+        llm_used=0,
+    )
+    return tuple(heal[c] for c in HEAL_COLUMNS)
+
+
+def _candidate(failure_id, name, is_unique, chosen):
+    candidate = dict.fromkeys(CANDIDATE_COLUMNS)
+    candidate.update(
+        failure_id=failure_id,
+        locator=name,
+        strategy="text",
+        name=name,
+        source="llm:fast",
+        is_unique=int(is_unique),
+        chosen=int(chosen),
+    )
+    return tuple(candidate[c] for c in CANDIDATE_COLUMNS)
+
+
+def test_accepted_heals_are_labelled_by_the_test_outcome(tmp_path):
+    db = tmp_path / "history.sqlite3"
+    conn = sqlite3.connect(db)
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        f"INSERT INTO heals ({', '.join(HEAL_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(HEAL_COLUMNS))})",
+        [
+            _heal("f1", "test_a", healed=True),
+            _heal("f2", "test_b", healed=True),
+            _heal("f3", "test_c", healed=False),
+            _heal("f4", "test_d", healed=True),
+        ],
+    )
+    conn.executemany(
+        f"INSERT INTO heal_candidates ({', '.join(CANDIDATE_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(CANDIDATE_COLUMNS))})",
+        [
+            _candidate("f1", "passed", is_unique=True, chosen=True),
+            _candidate("f1", "not tried", is_unique=True, chosen=False),
+            _candidate("f1", "ambiguous", is_unique=False, chosen=False),
+            _candidate("f2", "wrong element", is_unique=True, chosen=True),
+            # Suggested for review, never used by a test
+            _candidate("f3", "suggested", is_unique=True, chosen=True),
+            # Test outcome not recorded
+            _candidate("f4", "unknown", is_unique=True, chosen=True),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    store = HealHistoryStore(db)
+    store.record_outcome("test_a", "passed")
+    store.record_outcome("test_b", "failed")
+    # Only the first outcome of a test counts
+    store.record_outcome("test_b", "passed")
+    store.close()
+
+    candidates, labels = load_outcomes(db)
+
+    assert sorted(zip((c.name for c in candidates), labels.tolist())) == [
+        ("ambiguous", 0.0),
+        ("passed", 1.0),
+        ("wrong element", 0.0),
+    ]
+
+
+def test_chosen_candidate_is_matched_by_expression(tmp_path):
+    bundle = {
+        "failure_id": "f1",
+        "failure_type": "LOCATOR_NOT_FOUND",
+        "test_name": "test_login",
+        "error": {"type": "TimeoutError", "subtype": None, "message": ""},
+        "original_locator": None,
+        "candidate_counts": {},
+        "artifacts": {},
+    }
+    context, _ = context_from_bundle(bundle, tmp_path)
+    validated = [
+        CoreLocator(strategy="text", value=value, exact=True)
+        for value in ("Log in", "Sign in")
+    ]
+    result = {
+        # The same locator with another rank: a different object
+        "healed_locator": validated[0].replace(rank=120.0),
+        "validations": [
+            ValidationResult(locator, 100.0, 1, True) for locator in validated
+        ],
+    }
+
+    _, candidates = build_rows(context, result, healed=True)
+
+    assert [c["chosen"] for c in candidates] == [1, 0]